@@ -0,0 +1,9 @@
+"""
+ชุด benchmark สำหรับวัดประสิทธิภาพของระบบลงทะเบียนเรียน
+
+รันจากโฟลเดอร์โปรเจกต์ เช่น
+    python -m benchmarks.bench_public_section_list
+
+ทุกสคริปต์จะสร้างฐานข้อมูลทดสอบแยกต่างหาก (แบบเดียวกับ test runner)
+ใส่ข้อมูลจำลอง วัดผล แล้วลบฐานข้อมูลทดสอบทิ้งเมื่อจบ
+"""
@@ -0,0 +1,175 @@
+"""
+เปรียบเทียบ requests/sec และ latency (p50/p99) ของหน้าที่นิสิตเปิดบ่อย ระหว่าง WSGI กับ ASGI
+ที่ client พร้อมกันจำนวนมาก (ค่าเริ่มต้น 500) บนฐานข้อมูลในเครื่อง
+
+    python -m benchmarks.bench_asgi --scale small --clients 500 --threads 32
+
+วัดใน process เดียวโดยเรียก handler ของ Django โดยตรง (ไม่ผ่าน network หรือ server ภายนอก)
+- WSGI: จำลอง server แบบ thread ต่อ request ด้วย thread pool ขนาด --threads
+  client ที่เกินจำนวน thread ต้องรอคิว (latency รวมเวลารอ)
+- ASGI: ทุก client เป็น coroutine ใน event loop เดียว เรียก application ของ asgi.py
+ตัวเลขจึงใช้เปรียบเทียบระหว่างสองแบบ ไม่ใช่ความสามารถของ server จริง (ควรวัดซ้ำด้วย gunicorn/uvicorn)
+"""
+import argparse
+import asyncio
+import io
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.harness import benchmark_database, percentile, print_table, setup_django
+
+HOST = 'testserver'
+
+
+def _wsgi_environ(path, cookie):
+    return {
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': path,
+        'QUERY_STRING': '',
+        'SCRIPT_NAME': '',
+        'SERVER_NAME': HOST,
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_HOST': HOST,
+        'HTTP_COOKIE': cookie,
+        'REMOTE_ADDR': '127.0.0.1',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': io.BytesIO(),
+        'wsgi.errors': io.StringIO(),
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+
+
+def _asgi_scope(path, cookie):
+    return {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': b'',
+        'root_path': '',
+        'headers': [(b'host', HOST.encode()), (b'cookie', cookie.encode())],
+        'client': ('127.0.0.1', 0),
+        'server': (HOST, 80),
+    }
+
+
+def call_wsgi(application, path, cookie):
+    status = []
+    body = application(_wsgi_environ(path, cookie), lambda value, headers, exc_info=None: status.append(value))
+    try:
+        for _ in body:
+            pass
+    finally:
+        if hasattr(body, 'close'):
+            body.close()
+    return int(status[0].split()[0])
+
+
+async def call_asgi(application, path, cookie):
+    status = []
+    request_sent = False
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        # client ไม่ตัดการเชื่อมต่อ: รอจนกว่า handler จะยกเลิกเมื่อส่ง response เสร็จ
+        await asyncio.Future()
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status.append(message['status'])
+
+    await application(_asgi_scope(path, cookie), receive, send)
+    return status[0]
+
+
+async def run_clients(clients, requests_per_client, request):
+    """client แต่ละรายส่ง request ต่อกัน requests_per_client ครั้ง คืนค่า (latency ทุกครั้งเป็น ms, วินาทีรวม)"""
+    latencies = []
+    errors = 0
+
+    async def client():
+        nonlocal errors
+        for _ in range(requests_per_client):
+            started = time.perf_counter()
+            status = await request()
+            latencies.append((time.perf_counter() - started) * 1000)
+            if status != 200:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(clients)))
+    return latencies, time.perf_counter() - started, errors
+
+
+def summarize(case, path, latencies, elapsed, errors):
+    return {
+        'case': case,
+        'path': path,
+        'requests': len(latencies),
+        'errors': errors,
+        'req_per_sec': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 50), 1),
+        'p99_ms': round(percentile(latencies, 99), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--scale', default='small', choices=['small', 'medium', 'full'])
+    parser.add_argument('--clients', type=int, default=500)
+    parser.add_argument('--requests', type=int, default=4, help='จำนวน request ต่อ client')
+    parser.add_argument('--threads', type=int, default=32, help='จำนวน thread ของ WSGI server จำลอง')
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.core.asgi import get_asgi_application
+    from django.core.wsgi import get_wsgi_application
+    from django.test import Client
+    from django.urls import reverse
+
+    from benchmarks.seed import SeedScale, seed_semester
+
+    with benchmark_database():
+        _, students = seed_semester(SeedScale.named(args.scale))
+        client = Client()
+        client.force_login(students[0])
+        cookie = f'{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}'
+        paths = [reverse('core:index'), reverse('courses:public-section-list'), reverse('courses:my-schedule')]
+
+        wsgi_application = get_wsgi_application()
+        asgi_application = get_asgi_application()
+        pool = ThreadPoolExecutor(max_workers=args.threads)
+        rows = []
+        for path in paths:
+            # อุ่นเครื่อง (cache ของภาคเรียนปัจจุบัน, HTML ของแถวกลุ่มเรียน, template)
+            call_wsgi(wsgi_application, path, cookie)
+
+            async def wsgi_request(path=path):
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(pool, call_wsgi, wsgi_application, path, cookie)
+
+            async def asgi_request(path=path):
+                return await call_asgi(asgi_application, path, cookie)
+
+            for case, request in (('WSGI', wsgi_request), ('ASGI', asgi_request)):
+                latencies, elapsed, errors = asyncio.run(run_clients(args.clients, args.requests, request))
+                rows.append(summarize(case, path, latencies, elapsed, errors))
+        pool.shutdown()
+
+        print(f'clients={args.clients} requests/client={args.requests} wsgi_threads={args.threads}')
+        print_table(rows, ['case', 'path', 'requests', 'errors', 'req_per_sec', 'p50_ms', 'p99_ms'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+วัด overhead ของ core.metrics (MetricsMiddleware + template backend ที่จับเวลา) บนหน้า public_section_list
+เป้าหมาย: ช้าลงไม่เกิน 2% (เทียบค่ามัธยฐาน)
+
+    python -m benchmarks.bench_metrics --scale medium --requests 200 --rounds 5
+
+สลับวัดแบบเปิด/ปิดเป็นรอบ ๆ เพื่อลดผลของสภาพเครื่องที่เปลี่ยนไประหว่างการวัด
+ไม่ใช้ tracemalloc (measure() ของ harness) เพราะ overhead ของ tracemalloc ใหญ่กว่าสิ่งที่ต้องการวัด
+"""
+import argparse
+import statistics
+import time
+
+from benchmarks.harness import benchmark_database, percentile, print_table, setup_django
+
+METRICS_MIDDLEWARE = 'core.metrics.MetricsMiddleware'
+METRICS_BACKEND = 'core.metrics.DjangoTemplates'
+
+
+def without_metrics(settings):
+    """ค่า settings ที่ถอด core.metrics ออก (สำหรับ override_settings)"""
+    templates = [
+        {**engine, 'BACKEND': 'django.template.backends.django.DjangoTemplates'}
+        if engine['BACKEND'] == METRICS_BACKEND else engine
+        for engine in settings.TEMPLATES
+    ]
+    middleware = [name for name in settings.MIDDLEWARE if name != METRICS_MIDDLEWARE]
+    return {'TEMPLATES': templates, 'MIDDLEWARE': middleware}
+
+
+def time_requests(client, url, count):
+    client.get(url)  # อุ่นเครื่อง (template ถูกโหลดใหม่เมื่อสลับ settings)
+    timings = []
+    for _ in range(count):
+        started = time.perf_counter()
+        client.get(url)
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--scale', default='small', choices=['small', 'medium', 'full'])
+    parser.add_argument('--requests', type=int, default=100, help='จำนวน request ต่อรอบ')
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.test import Client, override_settings
+    from django.urls import reverse
+
+    from benchmarks.seed import SeedScale, seed_semester
+
+    with benchmark_database():
+        _, students = seed_semester(SeedScale.named(args.scale))
+        url = reverse('courses:public-section-list')
+        timings = {'ปิด metrics': [], 'เปิด metrics': []}
+        for _ in range(args.rounds):
+            with override_settings(**without_metrics(settings)):
+                client = Client()  # client ใหม่เพื่อโหลด MIDDLEWARE ตาม settings ปัจจุบัน
+                client.force_login(students[0])
+                timings['ปิด metrics'].extend(time_requests(client, url, args.requests))
+            client = Client()
+            client.force_login(students[0])
+            timings['เปิด metrics'].extend(time_requests(client, url, args.requests))
+
+        baseline = statistics.median(timings['ปิด metrics'])
+        rows = [
+            {
+                'case': case,
+                'requests': len(values),
+                'p50_ms': round(statistics.median(values), 3),
+                'p95_ms': round(percentile(values, 95), 3),
+                'mean_ms': round(statistics.fmean(values), 3),
+                'overhead': f'{(statistics.median(values) - baseline) / baseline * 100:+.2f}%',
+            }
+            for case, values in timings.items()
+        ]
+        print_table(rows, ['case', 'requests', 'p50_ms', 'p95_ms', 'mean_ms', 'overhead'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""
+เปรียบเทียบหน่วยความจำสูงสุดและจำนวนคิวรีของหน้า public_section_list
+ระหว่างวิธีเดิม (prefetch นิสิตทุกคน) กับวิธีปัจจุบัน (นับที่นั่งใน SQL + ชุด id ของผู้ใช้)
+
+    python -m benchmarks.bench_public_section_list --scale medium
+"""
+import argparse
+
+from benchmarks.harness import benchmark_database, measure, print_table, setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--scale', default='small', choices=['small', 'medium', 'full'])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db.models import F
+    from django.test import Client
+    from django.urls import reverse
+
+    from benchmarks.seed import SeedScale, seed_semester
+    from courses.models import Section
+
+    with benchmark_database():
+        semester, students = seed_semester(SeedScale.named(args.scale))
+        student = students[0]
+
+        def legacy():
+            # จำลองวิธีเดิม: prefetch 'students' แล้วเช็ค request.user in section.students.all
+            sections = (
+                Section.objects.filter(semester=semester, course__is_active=True)
+                .select_related('course', 'room', 'semester')
+                .prefetch_related('instructors', 'students', 'class_times')
+            )
+            for section in sections:
+                student in section.students.all()
+                section.capacity - len(section.students.all())
+
+        def current():
+            sections = (
+                Section.objects.filter(semester=semester, course__is_active=True)
+                .select_related('course', 'room', 'semester')
+                .prefetch_related('instructors', 'class_times')
+                .annotate(seats_left=F('capacity') - F('enrolled_count'))
+            )
+            enrolled_ids = set(
+                Section.students.through.objects.filter(
+                    user_id=student.pk, section__semester=semester,
+                ).values_list('section_id', flat=True)
+            )
+            for section in sections:
+                section.pk in enrolled_ids
+                section.seats_left
+
+        client = Client()
+        client.force_login(student)
+        url = reverse('courses:public-section-list')
+
+        rows = [
+            {'case': 'queryset (prefetch students, เดิม)', **measure(legacy, args.repeat)},
+            {'case': 'queryset (ปัจจุบัน)', **measure(current, args.repeat)},
+            {'case': 'view ทั้งหน้า (ปัจจุบัน)', **measure(lambda: client.get(url), args.repeat)},
+        ]
+        print(f'sections={Section.objects.filter(semester=semester).count()} '
+              f'enrollments={Section.students.through.objects.count()}')
+        print_table(rows, ['case', 'queries', 'peak_kib', 'p50_ms', 'p95_ms'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+"""
+วัดเวลาค้นหารายวิชาด้วย search_courses บนรายวิชาจำนวนมาก
+
+    python -m benchmarks.bench_search --courses 50000
+"""
+import argparse
+import random
+
+from benchmarks.harness import benchmark_database, measure, print_table, setup_django
+
+WORDS = ['การเขียนโปรแกรม', 'โครงสร้างข้อมูล', 'ฟิสิกส์', 'เคมี', 'ชีววิทยา', 'คณิตศาสตร์',
+         'ภาษาไทย', 'ภาษาอังกฤษ', 'การสื่อสาร', 'สถิติ', 'เศรษฐศาสตร์', 'กฎหมาย']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--courses', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django()
+    from courses.models import Course
+    from courses.search import build_search_text, get_search_index, search_courses
+
+    rng = random.Random(2567)
+    with benchmark_database():
+        rows = []
+        for i in range(args.courses):
+            code = f'{100000 + i:06d}'
+            name = f'{rng.choice(WORDS)}{rng.choice(WORDS)} {i}'
+            description = ' '.join(rng.sample(WORDS, 4))
+            rows.append(Course(code=code, name=name, description=description, credits=3,
+                               search_text=build_search_text(code, name, description)))
+        Course.objects.bulk_create(rows, batch_size=2000)
+
+        build = measure(get_search_index, 1)
+        table = [{'query': '(สร้าง index)', **build}]
+        for query in ('1001', '123456', 'โปรแกรม', 'ค่ำ', 'ภาษาไทย สถิติ', 'english'):
+            table.append({'query': query, **measure(lambda: search_courses(query), args.repeat)})
+        print(f'courses={args.courses}')
+        print_table(table, ['query', 'queries', 'p50_ms', 'p95_ms', 'p99_ms'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+เปรียบเทียบความเร็ว (แถวต่อวินาที) ของการสร้างข้อมูลกลุ่มเรียนสำหรับ API
+ระหว่างการอ่านด้วย ORM object (select_related + prefetch_related) กับ values() projection ของ courses.projections
+
+    python -m benchmarks.bench_sections_api --scale medium
+"""
+import argparse
+
+from benchmarks.harness import benchmark_database, measure, print_table, setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--scale', default='small', choices=['small', 'medium', 'full'])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db.models import Prefetch
+    from django.test import Client
+    from django.urls import reverse
+
+    from benchmarks.seed import SeedScale, seed_semester
+    from courses.models import ClassTime, Section, instructors_prefetch
+    from courses.projections import DEFAULT_FIELDS, ORDERING, section_rows, serialize_rows
+    from courses.timetable import DAY_INDEX
+
+    with benchmark_database():
+        semester, _ = seed_semester(SeedScale.named(args.scale))
+        total = Section.objects.filter(semester=semester, course__is_active=True).count()
+
+        def orm_objects():
+            # ข้อมูลเดียวกับ API แต่สร้าง model instance ทุกแถว (รวมคาบเรียนและผู้สอน)
+            sections = (
+                Section.objects.filter(semester=semester, course__is_active=True)
+                .select_related('course__department', 'semester', 'room')
+                .prefetch_related(
+                    Prefetch('class_times', queryset=ClassTime.objects.all()),
+                    instructors_prefetch(),
+                )
+                .order_by(*ORDERING, 'pk')
+            )
+            return [
+                {
+                    'id': section.pk,
+                    'section_number': section.section_number,
+                    'capacity': section.capacity,
+                    'enrolled': section.enrolled_count,
+                    'course': {
+                        'code': section.course.code,
+                        'name': section.course.name,
+                        'credits': section.course.credits,
+                        'department': section.course.department.name if section.course.department else None,
+                    },
+                    'semester': {'id': section.semester.pk, 'year': section.semester.year,
+                                 'semester': section.semester.semester},
+                    'room': f'{section.room.building} {section.room.room_number}' if section.room else None,
+                    'schedule': [
+                        {'day': ct.day, 'start': f'{ct.start_time:%H:%M}', 'end': f'{ct.end_time:%H:%M}'}
+                        for ct in sorted(section.class_times.all(), key=lambda ct: (DAY_INDEX[ct.day], ct.start_time))
+                    ],
+                    'instructors': [
+                        user.profile.display_name or user.username for user in section.instructors.all()
+                    ],
+                }
+                for section in sections
+            ]
+
+        def projection(fields=DEFAULT_FIELDS):
+            rows = list(section_rows(fields, semester.pk).order_by(*ORDERING, 'pk'))
+            return serialize_rows(rows, fields)
+
+        client = Client()
+        url = reverse('api:sections')
+
+        def api_pages():
+            # เดินทุกหน้าผ่าน view (size=100) ตาม next จนจบ
+            next_url = f'{url}?semester={semester.pk}&size=100'
+            while next_url:
+                next_url = client.get(next_url).json()['next']
+
+        rows = []
+        for case, func in (
+            ('ORM object + prefetch', orm_objects),
+            ('values() ทุกฟิลด์', projection),
+            ('values() ?fields=id,course,room', lambda: projection(('id', 'course', 'room'))),
+            ('API ทุกหน้า (size=100)', api_pages),
+        ):
+            result = measure(func, args.repeat)
+            result['rows_per_sec'] = round(total / (result['mean_ms'] / 1000)) if result['mean_ms'] else 0
+            rows.append({'case': case, **result})
+        print(f'sections={total}')
+        print_table(rows, ['case', 'queries', 'peak_kib', 'mean_ms', 'p95_ms', 'rows_per_sec'])
+
+
+if __name__ == '__main__':
+    main()
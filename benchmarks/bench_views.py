@@ -0,0 +1,321 @@
+"""
+วัด latency (p50/p95/p99), จำนวนคิวรี และหน่วยความจำสูงสุดของทุก URL ใน core/urls.py, courses/urls.py,
+users/urls.py (และ API) บนข้อมูลจำลองขนาดใหญ่ แล้วบันทึกผลเป็น JSON เพื่อเทียบกันระหว่างแต่ละรอบ
+
+    python -m benchmarks.bench_views --scale full --output results/views-full.json
+    python -m benchmarks.bench_views --scale small --only enroll --compare results/views-small.json
+
+--scale full ใกล้เคียงข้อมูลจริง (นิสิต 50k, รายวิชา 5k, กลุ่มเรียน 15k, การลงทะเบียน ~300k)
+
+- ทุก URL ต้องมีกรณีใน CASES (หรืออยู่ใน SKIPPED พร้อมเหตุผล) URL ใหม่ที่ยังไม่มีกรณีจะถูกรายงานไว้ใน "uncovered"
+- request ที่ไม่ใช่ GET วัดภายใน transaction ที่ rollback ทุกครั้ง และคืน cookie ของ client กลับเหมือนเดิม
+  ทุกรอบจึงผ่านเส้นทางเดียวกัน (เช่น ลงทะเบียนสำเร็จทุกครั้ง) โดยไม่เปลี่ยนข้อมูลของกรณีถัดไป
+- on_commit callback (เช่น ส่งจำนวนที่นั่งแบบ real-time) จึงไม่ถูกวัด
+"""
+import argparse
+import copy
+import json
+import platform
+import subprocess
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Optional
+
+from benchmarks.harness import benchmark_database, measure, print_table, setup_django
+
+URL_NAMESPACES = ('core', 'courses', 'users', 'api')
+SKIPPED = {
+    'api:seat-stream': 'SSE เปิดการเชื่อมต่อค้างไว้ ไม่มีจุดสิ้นสุดของ response ให้จับเวลา',
+}
+PASSWORD = '123456789'
+
+
+@dataclass(frozen=True)
+class Case:
+    url_name: str
+    user: Optional[str] = 'staff'  # 'staff', 'student' หรือ None (ไม่ล็อกอิน)
+    method: str = 'get'
+    kwargs: Optional[Callable] = None  # fixtures -> kwargs ของ reverse()
+    data: Optional[Callable] = None  # fixtures -> query string / form data
+    prepare: Optional[Callable] = None  # (client, fixtures) เรียกครั้งเดียวก่อนวัด (บันทึกจริง)
+    expected_status: int = 200
+    label: str = ''
+
+    @property
+    def name(self):
+        suffix = f' {self.label}' if self.label else ''
+        return f'{self.method.upper()} {self.url_name}{suffix}'
+
+
+def _post(url_name, **kwargs):
+    def prepare(client, fixtures):
+        from django.urls import reverse
+        client.post(reverse(url_name, kwargs={key: value(fixtures) for key, value in kwargs.items()}))
+    return prepare
+
+
+def _section(fixtures):
+    return {'pk': fixtures.section.pk}
+
+
+def _course(fixtures):
+    return {'pk': fixtures.course.pk}
+
+
+def _class_time(fixtures):
+    return {'pk': fixtures.class_time.pk}
+
+
+CASES = [
+    # --- นิสิต ---
+    Case('core:index', user='student'),
+    Case('courses:public-section-list', user='student'),
+    Case('courses:public-section-list', user='student', data=lambda f: {'q': 'วิชาทดสอบ 1'}, label='q=คำค้น'),
+    Case('courses:my-schedule', user='student'),
+    Case('courses:enroll-section', user='student', method='post', expected_status=302,
+         kwargs=lambda f: {'section_pk': f.open_section.pk}),
+    Case('courses:waitlist-join', user='student', method='post', expected_status=302,
+         kwargs=lambda f: {'section_pk': f.full_section.pk}),
+    Case('courses:waitlist-leave', user='student', method='post', expected_status=302,
+         kwargs=lambda f: {'section_pk': f.full_section.pk},
+         prepare=_post('courses:waitlist-join', section_pk=lambda f: f.full_section.pk)),
+    Case('courses:cart-add', user='student', method='post', expected_status=302,
+         kwargs=lambda f: {'section_pk': f.open_section.pk}),
+    Case('courses:cart', user='student',
+         prepare=_post('courses:cart-add', section_pk=lambda f: f.open_section.pk)),
+    Case('courses:cart-remove', user='student', method='post', expected_status=302,
+         kwargs=lambda f: {'section_pk': f.open_section.pk},
+         prepare=_post('courses:cart-add', section_pk=lambda f: f.open_section.pk)),
+    Case('courses:cart-checkout', user='student', method='post', expected_status=302,
+         prepare=_post('courses:cart-add', section_pk=lambda f: f.open_section.pk)),
+
+    # --- เจ้าหน้าที่ ---
+    Case('courses:course-list'),
+    Case('courses:course-add'),
+    Case('courses:course-edit', kwargs=_course),
+    Case('courses:course-delete', kwargs=_course),
+    Case('courses:catalog-import'),
+    Case('courses:course-roster-export', kwargs=_course),
+    Case('courses:section-list', kwargs=lambda f: {'course_pk': f.course.pk}),
+    Case('courses:section-add', kwargs=lambda f: {'course_pk': f.course.pk}),
+    Case('courses:section-edit', kwargs=_section),
+    Case('courses:section-delete', kwargs=_section),
+    Case('courses:section-roster-export', kwargs=_section),
+    Case('courses:semester-roster-export', kwargs=lambda f: {'pk': f.semester.pk}),
+    Case('courses:time-list', kwargs=lambda f: {'section_pk': f.section.pk}),
+    Case('courses:time-add', kwargs=lambda f: {'section_pk': f.section.pk}),
+    Case('courses:time-edit', kwargs=_class_time),
+    Case('courses:time-delete', kwargs=_class_time),
+    Case('courses:free-rooms', data=lambda f: {'day': 'MON', 'start_time': '08:00', 'end_time': '10:00'}),
+    Case('courses:instructor-autocomplete', data=lambda f: {'q': 'instructor1'}),
+    Case('courses:room-autocomplete', data=lambda f: {'q': 'SC', 'section': f.section.pk}),
+    Case('courses:admission-metrics'),
+    Case('courses:fragment-metrics'),
+    Case('users:student-list'),
+    Case('users:student-detail', kwargs=lambda f: {'pk': f.student.pk}),
+
+    # --- เข้าสู่ระบบ ---
+    Case('users:login', user=None),
+    Case('users:login', user=None, method='post', expected_status=302,
+         data=lambda f: {'username': f.student.username, 'password': PASSWORD}, label='นิสิต'),
+    Case('users:logout', user='student', method='post', expected_status=302),
+
+    # --- API ---
+    Case('api:catalog-current', user=None),
+    Case('api:catalog-current-seats', user=None),
+    Case('api:catalog', user=None, kwargs=lambda f: {'semester_pk': f.semester.pk}),
+    Case('api:catalog-seats', user=None, kwargs=lambda f: {'semester_pk': f.semester.pk}),
+    Case('api:sections', user=None, data=lambda f: {'semester': f.semester.pk}),
+]
+
+
+@dataclass
+class Fixtures:
+    semester: object
+    student: object
+    staff: object
+    course: object
+    section: object
+    class_time: object
+    open_section: object
+    full_section: object
+
+
+def build_fixtures(semester, students):
+    """
+    ข้อมูลเป้าหมายของแต่ละกรณี: กลุ่มเรียนที่มีนิสิตมากที่สุด (roster ใหญ่สุด)
+    กลุ่มเรียนว่างที่นิสิตลงได้โดยไม่ชนเวลา และกลุ่มเรียนที่เต็มแล้วสำหรับคิวรอที่นั่ง
+    """
+    from django.contrib.auth.models import User
+
+    from courses.models import Course, Section
+
+    staff = User.objects.create_user('bench-staff', password=PASSWORD, is_staff=True)
+    section = Section.objects.filter(semester=semester).select_related('course').order_by('-enrolled_count').first()
+    open_course = Course.objects.create(code='900001', name='วิชาเปิดเพิ่ม', credits=3)
+    open_section = Section.objects.create(course=open_course, semester=semester, section_number='1', capacity=50)
+    full_course = Course.objects.create(code='900002', name='วิชาที่เต็มแล้ว', credits=3)
+    full_section = Section.objects.create(course=full_course, semester=semester, section_number='1', capacity=1)
+    full_section.students.add(students[1])
+    Section.objects.filter(pk=full_section.pk).update(enrolled_count=1)
+    return Fixtures(
+        semester=semester, student=students[0], staff=staff, course=section.course, section=section,
+        class_time=section.class_times.first(), open_section=open_section, full_section=full_section,
+    )
+
+
+def url_names(namespaces=URL_NAMESPACES):
+    """ชื่อ URL ทั้งหมด ('namespace:name') ของ namespace ที่กำหนด"""
+    from django.urls import URLResolver, get_resolver
+
+    names = set()
+    for pattern in get_resolver().url_patterns:
+        if isinstance(pattern, URLResolver) and pattern.namespace in namespaces:
+            names.update(f'{pattern.namespace}:{child.name}' for child in pattern.url_patterns if child.name)
+    return names
+
+
+def make_request(case, fixtures):
+    """คืนค่าฟังก์ชันที่ส่ง request ของ case 1 ครั้ง และชุด status code ที่ได้"""
+    from django.db import transaction
+    from django.test import Client
+    from django.urls import reverse
+
+    client = Client()
+    if case.user is not None:
+        client.force_login(getattr(fixtures, case.user))
+    if case.prepare is not None:
+        case.prepare(client, fixtures)
+    url = reverse(case.url_name, kwargs=case.kwargs(fixtures) if case.kwargs else None)
+    data = case.data(fixtures) if case.data else None
+    statuses = set()
+
+    def send():
+        response = getattr(client, case.method)(url, data)
+        if response.streaming:
+            for _ in response.streaming_content:
+                pass
+        statuses.add(response.status_code)
+
+    if case.method == 'get':
+        return url, send, statuses
+
+    def send_rolled_back():
+        cookies = copy.deepcopy(client.cookies)
+        with transaction.atomic():
+            send()
+            transaction.set_rollback(True)
+        client.cookies = cookies
+
+    return url, send_rolled_back, statuses
+
+
+def data_sizes():
+    from django.contrib.auth.models import User
+
+    from courses.models import Course, Section
+
+    return {
+        'users': User.objects.count(),
+        'courses': Course.objects.count(),
+        'sections': Section.objects.count(),
+        'enrollments': Section.students.through.objects.count(),
+    }
+
+
+def git_revision():
+    result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=False)
+    return result.stdout.strip() or None
+
+
+def compare(results, previous_path):
+    """พิมพ์ผลเทียบกับไฟล์ผลลัพธ์ครั้งก่อน (จับคู่ตามชื่อกรณี)"""
+    previous = {row['case']: row for row in json.loads(Path(previous_path).read_text())['results']}
+    rows = []
+    for row in results:
+        before = previous.get(row['case'])
+        if before is None:
+            continue
+        rows.append({
+            'case': row['case'],
+            'p50_ms': f"{before['p50_ms']} -> {row['p50_ms']}",
+            'p50_change': f"{(row['p50_ms'] - before['p50_ms']) / before['p50_ms'] * 100:+.0f}%" if before['p50_ms'] else '',
+            'queries': f"{before['queries']} -> {row['queries']}",
+            'peak_kib': f"{before['peak_kib']} -> {row['peak_kib']}",
+        })
+    print(f'\nเทียบกับ {previous_path}')
+    print_table(rows, ['case', 'p50_ms', 'p50_change', 'queries', 'peak_kib'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', default='small', choices=['small', 'medium', 'full'])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--only', help='วัดเฉพาะกรณีที่ชื่อมีข้อความนี้')
+    parser.add_argument('--output', help='ไฟล์ JSON ของผลลัพธ์ (ค่าเริ่มต้น benchmarks/results/views-<scale>-<เวลา>.json)')
+    parser.add_argument('--compare', help='ไฟล์ JSON ของรอบก่อนที่จะเทียบ')
+    args = parser.parse_args()
+
+    setup_django()
+    import django
+    from django.db import connection
+
+    from benchmarks.seed import SeedScale, seed_semester
+
+    cases = [case for case in CASES if not args.only or args.only in case.name]
+    covered = {case.url_name for case in CASES}
+
+    with benchmark_database():
+        semester, students = seed_semester(SeedScale.named(args.scale))
+        fixtures = build_fixtures(semester, students)
+        uncovered = sorted(url_names() - covered - set(SKIPPED))
+
+        results = []
+        for case in cases:
+            url, send, statuses = make_request(case, fixtures)
+            send()  # อุ่นเครื่อง (template, cache ของภาคเรียนปัจจุบัน, ดัชนีห้องเรียน)
+            stats = measure(send, args.repeat)
+            results.append({
+                'case': case.name,
+                'url_name': case.url_name,
+                'method': case.method.upper(),
+                'path': url,
+                'status': sorted(statuses),
+                'ok': statuses == {case.expected_status},
+                **stats,
+            })
+
+        report = {
+            'benchmark': 'views',
+            'created_at': datetime.now().astimezone().isoformat(timespec='seconds'),
+            'git_revision': git_revision(),
+            'scale': args.scale,
+            'repeat': args.repeat,
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'data': data_sizes(),
+            'uncovered': uncovered,
+            'skipped': SKIPPED,
+            'results': results,
+        }
+
+    output = Path(args.output or f'benchmarks/results/views-{args.scale}-{datetime.now():%Y%m%d-%H%M%S}.json')
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, ensure_ascii=False, indent=2))
+
+    print(' '.join(f'{key}={value}' for key, value in report['data'].items()))
+    print_table(results, ['case', 'status', 'queries', 'peak_kib', 'p50_ms', 'p95_ms', 'p99_ms'])
+    failed = [row['case'] for row in results if not row['ok']]
+    if failed:
+        print(f'\nstatus ไม่ตรงที่คาด: {", ".join(failed)}')
+    if uncovered:
+        print(f'\nURL ที่ยังไม่มีกรณีวัด: {", ".join(uncovered)}')
+    if args.compare:
+        compare(results, args.compare)
+    print(f'\nบันทึกผลที่ {output}')
+
+
+if __name__ == '__main__':
+    main()
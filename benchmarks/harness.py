@@ -0,0 +1,79 @@
+"""เครื่องมือกลางสำหรับ benchmark: ตั้งค่า Django, ฐานข้อมูลทดสอบ และการวัดผล"""
+import contextlib
+import os
+import statistics
+import time
+import tracemalloc
+
+
+def setup_django():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'course_registration_system.settings')
+    import django
+    django.setup()
+
+
+@contextlib.contextmanager
+def benchmark_database(keepdb=False):
+    """สร้างฐานข้อมูลทดสอบ (test_<NAME>) ใช้ระหว่าง benchmark แล้วลบทิ้งเมื่อจบ"""
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=keepdb)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=keepdb)
+        teardown_test_environment()
+
+
+def percentile(values, pct):
+    """คืนค่า percentile แบบ nearest-rank"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+def measure(func, repeat=5):
+    """
+    เรียก func ซ้ำ repeat ครั้ง แล้วคืนค่าสถิติ
+
+    - queries: จำนวน SQL ของการเรียกครั้งสุดท้าย
+    - peak_kib: หน่วยความจำสูงสุดที่ใช้ระหว่างการเรียก (tracemalloc)
+    - p50_ms / p95_ms / p99_ms / mean_ms: เวลาที่ใช้ต่อครั้ง
+    """
+    from django.db import connection, reset_queries
+    from django.test.utils import CaptureQueriesContext
+
+    timings = []
+    peak = 0
+    queries = 0
+    for _ in range(repeat):
+        reset_queries()
+        tracemalloc.start()
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - started) * 1000)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        queries = len(captured)
+    return {
+        'queries': queries,
+        'peak_kib': round(peak / 1024, 1),
+        'mean_ms': round(statistics.fmean(timings), 2),
+        'p50_ms': round(percentile(timings, 50), 2),
+        'p95_ms': round(percentile(timings, 95), 2),
+        'p99_ms': round(percentile(timings, 99), 2),
+    }
+
+
+def print_table(rows, columns):
+    """พิมพ์ผลลัพธ์เป็นตารางอย่างง่าย"""
+    widths = {col: max(len(col), *(len(str(row.get(col, ''))) for row in rows)) for col in columns}
+    print('  '.join(col.ljust(widths[col]) for col in columns))
+    for row in rows:
+        print('  '.join(str(row.get(col, '')).ljust(widths[col]) for col in columns))
@@ -0,0 +1,143 @@
+"""สร้างข้อมูลจำลองขนาดใหญ่ของภาคเรียนปัจจุบันด้วย bulk_create"""
+import random
+from dataclasses import dataclass
+from datetime import time, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.utils import timezone
+
+from courses.enrollment import sync_enrolled_counts
+from courses.search import build_search_text
+from courses.timetable import rebuild_schedule_masks
+from courses.models import Branch, ClassTime, Course, Department, Faculty, Room, Section, Semester
+from courses.tests.tests_login_page.factories import ProfileFactory
+from users.models import Profile
+
+DAYS = [day for day, _ in ClassTime.DAY_CHOICES[:5]]
+SLOTS = [(time(8), time(10)), (time(10), time(12)), (time(13), time(15)), (time(15), time(17))]
+BATCH_SIZE = 2000
+
+
+@dataclass
+class SeedScale:
+    students: int = 2000
+    instructors: int = 100
+    courses: int = 300
+    sections_per_course: int = 3
+    enrollments_per_student: int = 6
+    rooms: int = 60
+
+    @classmethod
+    def named(cls, name):
+        """ขนาดข้อมูลสำเร็จรูป: small สำหรับทดสอบเร็ว, full ใกล้เคียงข้อมูลจริงของมหาวิทยาลัย"""
+        if name == 'full':
+            return cls(students=50000, instructors=2000, courses=5000,
+                       sections_per_course=3, enrollments_per_student=6, rooms=600)
+        if name == 'medium':
+            return cls(students=10000, instructors=500, courses=1500,
+                       sections_per_course=3, enrollments_per_student=6, rooms=200)
+        return cls()
+
+
+def _profiles_for(users, user_type, **extra):
+    """ใช้ ProfileFactory.build เพื่อให้ได้ชื่อภาษาไทยแบบเดียวกับชุดทดสอบ แต่บันทึกด้วย bulk_create"""
+    profiles = []
+    for user in users:
+        profile = ProfileFactory.build(user=user, user_type=user_type, job_title=None)
+        for field, value in extra.items():
+            setattr(profile, field, value(user) if callable(value) else value)
+        # bulk_create ไม่เรียก Profile.save() จึงต้องใส่ display_name เอง
+        profile.display_name = profile.build_display_name()
+        profiles.append(profile)
+    Profile.objects.bulk_create(profiles, batch_size=BATCH_SIZE)
+
+
+def seed_semester(scale=None, seed=2567):
+    """
+    ใส่ข้อมูลภาคเรียนที่ครอบคลุมวันนี้ พร้อมรายวิชา กลุ่มเรียน คาบเรียน อาจารย์ นิสิต และการลงทะเบียน
+    คืนค่า (semester, รายชื่อนิสิต)
+    """
+    scale = scale or SeedScale()
+    rng = random.Random(seed)
+    today = timezone.now().date()
+    password = make_password('123456789')
+
+    semester = Semester.objects.create(
+        year=today.year + 543, semester=1,
+        start_date=today - timedelta(days=30), end_date=today + timedelta(days=150),
+    )
+    faculty = Faculty.objects.create(name='วิทยาศาสตร์')
+    department = Department.objects.create(name='วิทยาการคอมพิวเตอร์', faculty=faculty)
+    branch = Branch.objects.create(name='วิทยาการคอมพิวเตอร์', department=department)
+    rooms = Room.objects.bulk_create(
+        [Room(building=f'SC{i // 50 + 1}', room_number=str(100 + i)) for i in range(scale.rooms)]
+    )
+
+    instructors = User.objects.bulk_create(
+        [User(username=f'instructor{i}', password=password) for i in range(scale.instructors)],
+        batch_size=BATCH_SIZE,
+    )
+    _profiles_for(instructors, Profile.UserType.INSTRUCTOR,
+                  acdemic_title=Profile.AcademicTitle.LECTURER, department=department)
+
+    students = User.objects.bulk_create(
+        [User(username=f'student{i}', password=password) for i in range(scale.students)],
+        batch_size=BATCH_SIZE,
+    )
+    _profiles_for(students, Profile.UserType.STUDENT, branch=branch,
+                  student_status=Profile.StudentStatus.STUDYING,
+                  student_id=lambda user: f'{65000000 + user.pk:08d}')
+
+    # bulk_create ไม่เรียก Course.save() จึงต้องใส่ search_text เอง
+    courses = Course.objects.bulk_create(
+        [Course(code=f'{100000 + i:06d}', name=f'วิชาทดสอบ {i}', department=department, credits=3,
+                search_text=build_search_text(f'{100000 + i:06d}', f'วิชาทดสอบ {i}', ''))
+         for i in range(scale.courses)],
+        batch_size=BATCH_SIZE,
+    )
+
+    capacity = max(10, scale.students * scale.enrollments_per_student
+                   // max(1, scale.courses * scale.sections_per_course) * 2)
+    capacity = min(capacity, 200)
+    sections = Section.objects.bulk_create(
+        [Section(course=course, semester=semester, section_number=str(n + 1),
+                 room=rng.choice(rooms), capacity=capacity)
+         for course in courses for n in range(scale.sections_per_course)],
+        batch_size=BATCH_SIZE,
+    )
+
+    class_times = []
+    instructor_links = []
+    InstructorLink = Section.instructors.through
+    for section in sections:
+        start, end = rng.choice(SLOTS)
+        class_times.append(ClassTime(section=section, day=rng.choice(DAYS), start_time=start, end_time=end))
+        instructor_links.append(InstructorLink(section_id=section.pk, user_id=rng.choice(instructors).pk))
+    ClassTime.objects.bulk_create(class_times, batch_size=BATCH_SIZE)
+    InstructorLink.objects.bulk_create(instructor_links, batch_size=BATCH_SIZE)
+    # bulk_create ไม่ส่ง signal ของ ClassTime จึงต้องคำนวณตารางเรียน (bitmask) เอง
+    rebuild_schedule_masks([section.pk for section in sections])
+
+    # ลงทะเบียนนิสิตแบบสุ่มโดยไม่เกินจำนวนที่รับ และไม่ลงรายวิชาซ้ำ
+    Enrollment = Section.students.through
+    seats = {section.pk: section.capacity for section in sections}
+    by_course = {}
+    for section in sections:
+        by_course.setdefault(section.course_id, []).append(section.pk)
+    course_ids = list(by_course)
+    enrollments = []
+    for student in students:
+        for course_id in rng.sample(course_ids, min(scale.enrollments_per_student, len(course_ids))):
+            open_sections = [pk for pk in by_course[course_id] if seats[pk] > 0]
+            if open_sections:
+                section_pk = rng.choice(open_sections)
+                seats[section_pk] -= 1
+                enrollments.append(Enrollment(section_id=section_pk, user_id=student.pk))
+        if len(enrollments) >= BATCH_SIZE:
+            Enrollment.objects.bulk_create(enrollments)
+            enrollments = []
+    Enrollment.objects.bulk_create(enrollments)
+    sync_enrolled_counts()
+
+    return semester, students
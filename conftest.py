@@ -0,0 +1,21 @@
+import pytest
+from django.core.cache import cache
+
+from core.admission import reset_gates
+from courses.rooms import reset_room_indexes
+from courses.search import reset_search_index
+from courses.semesters import clear_current_semester_cache
+
+
+@pytest.fixture(autouse=True)
+def _clear_process_caches():
+    """ล้างแคชระดับ process ระหว่างแต่ละเทสต์ เพราะการ rollback ของฐานข้อมูลทดสอบไม่ส่ง signal"""
+    clear_current_semester_cache()
+    reset_search_index()
+    reset_room_indexes()
+    reset_gates()
+    cache.clear()
+    yield
+    clear_current_semester_cache()
+    reset_search_index()
+    reset_room_indexes()
@@ -0,0 +1,277 @@
+"""
+การควบคุมจำนวนคำขอที่เข้าถึง view (admission control) พร้อมห้องรอคิวเสมือน
+
+ใช้กับ view ที่แย่งทรัพยากรฐานข้อมูลหนัก ๆ เช่น การลงทะเบียนตอนเปิดระบบ:
+
+    @admission_control('enroll')
+    def enroll_section(request, section_pk): ...
+
+แต่ละ gate มี 2 ชั้น
+- ในแต่ละ worker: token bucket จำกัดอัตราคำขอ และ semaphore จำกัดจำนวน transaction ที่ทำพร้อมกัน
+- ร่วมกันทุก worker (ผ่าน Django cache): ห้องรอคิวแบบบัตรคิว (ticket) เรียงลำดับมาก่อนได้ก่อน
+  บัตรคิวเก็บใน signed cookie จึงตอบหน้า "กำลังรอคิว" ได้โดยไม่แตะฐานข้อมูล
+
+ตั้งค่าแต่ละ gate ได้ที่ settings.ADMISSION_CONTROL เช่น
+    ADMISSION_CONTROL = {'enroll': {'rate': 50, 'burst': 100, 'concurrency': 20}}
+ห้องรอคิวใช้ร่วมกันข้าม process ได้เมื่อ CACHES ชี้ไปยัง cache กลาง (เช่น Redis หรือ Memcached)
+"""
+import threading
+import time
+from dataclasses import dataclass, fields
+from functools import wraps
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.template.loader import render_to_string
+
+COOKIE_SALT = 'core.admission.ticket'
+
+
+@dataclass
+class GateConfig:
+    enabled: bool = True
+    rate: float = 50.0          # คำขอที่ผ่านได้ต่อวินาที ต่อ worker
+    burst: int = 100            # จำนวนคำขอที่ผ่านติดกันได้ทันทีเมื่อ bucket เต็ม
+    concurrency: int = 20       # transaction ที่ทำพร้อมกันได้ ต่อ worker
+    window: int = 50            # บัตรคิวที่อยู่ภายใน N ลำดับแรกมีสิทธิ์เข้า
+    retry_after: int = 3        # วินาทีที่หน้ารอคิวจะส่งคำขอใหม่อัตโนมัติ
+    stall_timeout: float = 10.0  # ไม่มีบัตรคิวได้เข้าเลยนานเท่านี้ ให้ข้ามบัตรที่ถูกทิ้งไป
+    ticket_ttl: int = 900       # อายุของบัตรคิวและตัวนับใน cache (วินาที)
+
+
+def get_gate_config(name):
+    options = getattr(settings, 'ADMISSION_CONTROL', {}).get(name, {})
+    known = {field.name for field in fields(GateConfig)}
+    return GateConfig(**{key: value for key, value in options.items() if key in known})
+
+
+class TokenBucket:
+    """token bucket แบบ thread-safe (เติม token ตามเวลาที่ผ่านไป)"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+
+@dataclass
+class GateStats:
+    """สถิติของ gate ใน worker นี้"""
+    admitted: int = 0
+    queued: int = 0
+    in_flight: int = 0
+    wait_count: int = 0
+    wait_total: float = 0.0
+    wait_max: float = 0.0
+
+
+class Gate:
+    def __init__(self, name, config):
+        self.name = name
+        self.config = config
+        self.bucket = TokenBucket(config.rate, config.burst)
+        self.semaphore = threading.BoundedSemaphore(config.concurrency)
+        self.stats = GateStats()
+        self._stats_lock = threading.Lock()
+
+    # --- คีย์ใน cache ที่ใช้ร่วมกันทุก worker ---
+    @property
+    def _issued_key(self):
+        return f'admission:{self.name}:issued'
+
+    @property
+    def _served_key(self):
+        return f'admission:{self.name}:served'
+
+    @property
+    def _last_admit_key(self):
+        return f'admission:{self.name}:last_admit'
+
+    def _incr(self, key, delta=1):
+        cache.add(key, 0, self.config.ticket_ttl)
+        try:
+            return cache.incr(key, delta)
+        except ValueError:
+            # คีย์หมดอายุระหว่าง add กับ incr
+            cache.add(key, 0, self.config.ticket_ttl)
+            return cache.incr(key, delta)
+
+    def counters(self):
+        """(จำนวนบัตรคิวที่ออกไปแล้ว, จำนวนบัตรคิวที่ได้เข้าแล้ว) ด้วยการอ่าน cache ครั้งเดียว"""
+        values = cache.get_many([self._issued_key, self._served_key])
+        return values.get(self._issued_key, 0), values.get(self._served_key, 0)
+
+    def queue_depth(self):
+        issued, served = self.counters()
+        return max(0, issued - served)
+
+    def issue_ticket(self):
+        return self._incr(self._issued_key)
+
+    def mark_served(self):
+        self._incr(self._served_key)
+        cache.set(self._last_admit_key, time.time(), self.config.ticket_ttl)
+
+    def skip_abandoned_tickets(self):
+        """ถ้าไม่มีบัตรคิวได้เข้าเลยนานเกิน stall_timeout แสดงว่าบัตรช่วงต้นถูกทิ้ง ให้เลื่อนคิวไปหนึ่งช่วง"""
+        last_admit = cache.get(self._last_admit_key)
+        if last_admit is None or time.time() - last_admit > self.config.stall_timeout:
+            cache.set(self._last_admit_key, time.time(), self.config.ticket_ttl)
+            if last_admit is not None:
+                self._incr(self._served_key, self.config.window)
+
+    # --- ชั้นของ worker ---
+    def try_enter(self):
+        if not self.semaphore.acquire(blocking=False):
+            return False
+        if not self.bucket.take():
+            self.semaphore.release()
+            return False
+        with self._stats_lock:
+            self.stats.admitted += 1
+            self.stats.in_flight += 1
+        return True
+
+    def leave(self):
+        with self._stats_lock:
+            self.stats.in_flight -= 1
+        self.semaphore.release()
+
+    def record_queued(self):
+        with self._stats_lock:
+            self.stats.queued += 1
+
+    def record_wait(self, seconds):
+        with self._stats_lock:
+            self.stats.wait_count += 1
+            self.stats.wait_total += seconds
+            self.stats.wait_max = max(self.stats.wait_max, seconds)
+
+    def metrics(self):
+        with self._stats_lock:
+            stats = GateStats(**vars(self.stats))
+        return {
+            'gate': self.name,
+            'queue_depth': self.queue_depth(),
+            'admitted': stats.admitted,
+            'queued': stats.queued,
+            'in_flight': stats.in_flight,
+            'concurrency': self.config.concurrency,
+            'wait_count': stats.wait_count,
+            'wait_avg_seconds': round(stats.wait_total / stats.wait_count, 3) if stats.wait_count else 0.0,
+            'wait_max_seconds': round(stats.wait_max, 3),
+        }
+
+
+_gates = {}
+_gates_lock = threading.Lock()
+
+
+def get_gate(name):
+    gate = _gates.get(name)
+    if gate is None:
+        with _gates_lock:
+            gate = _gates.get(name)
+            if gate is None:
+                gate = _gates[name] = Gate(name, get_gate_config(name))
+    return gate
+
+
+def reset_gates():
+    """ล้าง gate ทั้งหมดของ process (ใช้ในการทดสอบ หรือหลังเปลี่ยน settings)"""
+    with _gates_lock:
+        _gates.clear()
+
+
+def all_gate_metrics():
+    return [gate.metrics() for gate in list(_gates.values())]
+
+
+def _cookie_name(gate):
+    return f'admission_{gate.name}'
+
+
+def _read_ticket(request, gate):
+    """คืนค่า (เลขบัตรคิว, เวลาที่ได้รับบัตร) จาก signed cookie หรือ None"""
+    try:
+        value = request.get_signed_cookie(_cookie_name(gate), salt=COOKIE_SALT, max_age=gate.config.ticket_ttl)
+        ticket, issued_at = value.split(':')
+        return int(ticket), float(issued_at)
+    except (KeyError, ValueError, signing.BadSignature):
+        return None
+
+
+def _queue_response(request, gate, ticket, issued_at, position):
+    """หน้า "กำลังรอคิว" ที่ไม่แตะฐานข้อมูล และส่งคำขอเดิมซ้ำอัตโนมัติเมื่อครบเวลา"""
+    gate.record_queued()
+    context = {
+        'position': max(1, position),
+        'retry_after': gate.config.retry_after,
+        'fields': [(key, value) for key, value in request.POST.items() if key != 'csrfmiddlewaretoken'],
+        'csrf_token': get_token(request),
+    }
+    # render โดยไม่ส่ง request เพื่อข้าม context processor ทั้งหมด (หน้านี้ต้องไม่แตะฐานข้อมูล)
+    response = HttpResponse(render_to_string('core/admission_queue.html', context), status=429)
+    response['Retry-After'] = str(gate.config.retry_after)
+    response.set_signed_cookie(
+        _cookie_name(gate), f'{ticket}:{issued_at}', salt=COOKIE_SALT,
+        max_age=gate.config.ticket_ttl, httponly=True, samesite='Lax',
+    )
+    return response
+
+
+def admission_control(name):
+    """decorator จำกัดจำนวนคำขอที่เข้าถึง view ตามการตั้งค่าของ gate ชื่อ name"""
+    def decorator(view_func):
+        @wraps(view_func)
+        def _wrapped_view(request, *args, **kwargs):
+            gate = get_gate(name)
+            if not gate.config.enabled:
+                return view_func(request, *args, **kwargs)
+
+            issued, served = gate.counters()
+            held = _read_ticket(request, gate)
+            if held is None:
+                # ไม่มีใครรอคิวอยู่และ worker ยังรับได้: เข้าได้ทันทีโดยไม่ต้องรับบัตรคิว
+                if issued <= served and gate.try_enter():
+                    return _run(gate, view_func, request, args, kwargs, waited=None)
+                ticket, issued_at = gate.issue_ticket(), time.time()
+                return _queue_response(request, gate, ticket, issued_at, ticket - served)
+
+            ticket, issued_at = held
+            position = ticket - served
+            if position <= gate.config.window and gate.try_enter():
+                gate.mark_served()
+                return _run(gate, view_func, request, args, kwargs, waited=time.time() - issued_at)
+            gate.skip_abandoned_tickets()
+            return _queue_response(request, gate, ticket, issued_at, position)
+        return _wrapped_view
+    return decorator
+
+
+def _run(gate, view_func, request, args, kwargs, waited):
+    if waited is not None:
+        gate.record_wait(waited)
+    try:
+        response = view_func(request, *args, **kwargs)
+    finally:
+        gate.leave()
+    if waited is not None:
+        # ได้เข้าแล้ว: คืนบัตรคิว
+        response.delete_cookie(_cookie_name(gate), samesite='Lax')
+    return response
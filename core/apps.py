@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from .metrics import install_query_recorder
+
+        # นับคิวรีของทุก connection (รวม connection ของ thread ที่ sync_to_async ใช้) ให้ core.metrics
+        connection_created.connect(install_query_recorder, dispatch_uid='core.metrics.install_query_recorder')
@@ -0,0 +1,322 @@
+"""
+สถิติของแต่ละ view สำหรับ Prometheus (เปิดดูได้ที่ /metrics เฉพาะเจ้าหน้าที่)
+
+ต่อ view (ชื่อ URL เช่น courses:public-section-list):
+- จำนวน request แยกตาม method และ status, histogram ของเวลาตอบสนอง
+- จำนวนคิวรีและเวลาที่ใช้ใน SQL (execute wrapper ที่ติดตั้งกับทุก connection)
+- เวลา render template (template backend ของโมดูลนี้ นับเฉพาะ template ชั้นนอกสุด)
+- ขนาด response (ไม่นับ streaming response และเวลาของ streaming response นับถึงตอนเริ่มส่งเท่านั้น)
+
+เปิดใช้ด้วย MetricsMiddleware (ควรอยู่บนสุดของ MIDDLEWARE) และ
+TEMPLATES[...]['BACKEND'] = 'core.metrics.DjangoTemplates'
+
+ข้อมูลเก็บในหน่วยความจำของ worker แล้วส่งสำเนาไปที่ Django cache ทุก flush_interval วินาที
+/metrics รวมค่าของทุก worker จาก cache (ต้องใช้ cache กลางเช่น Redis เมื่อรันหลาย worker ด้วย gunicorn)
+worker ที่หยุดไปแล้วยังถูกนับจนกว่าสำเนาจะหมดอายุ (ttl) หลังจากนั้น counter จะลดลง ซึ่ง Prometheus
+ถือเป็นการ reset ของ counter ตามปกติ
+
+ตั้งค่าได้ที่ settings.METRICS เช่น METRICS = {'flush_interval': 10, 'ttl': 86400}
+"""
+import bisect
+import contextvars
+import copy
+import os
+import threading
+import time
+from dataclasses import dataclass, fields
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates as BaseDjangoTemplates
+from django.template.backends.django import Template as BaseTemplate
+from django.template.backends.django import reraise
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+UNRESOLVED = '<unresolved>'
+WORKERS_KEY = 'metrics:workers'
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+@dataclass
+class MetricsConfig:
+    flush_interval: float = 10.0  # วินาทีระหว่างการส่งสำเนาของ worker ไปที่ cache
+    ttl: int = 86400              # อายุของสำเนาใน cache (วินาที)
+
+
+def get_metrics_config():
+    options = getattr(settings, 'METRICS', {})
+    known = {field.name for field in fields(MetricsConfig)}
+    return MetricsConfig(**{key: value for key, value in options.items() if key in known})
+
+
+class RequestSample:
+    """ค่าที่สะสมระหว่าง request เดียว (ผ่าน contextvar จึงตามไปถึง thread ของ sync_to_async)"""
+    __slots__ = ('queries', 'query_seconds', 'template_seconds', 'rendering')
+
+    def __init__(self):
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.template_seconds = 0.0
+        self.rendering = False
+
+
+_current = contextvars.ContextVar('metrics_request', default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    """execute wrapper: นับคิวรีและเวลาใน SQL ของ request ปัจจุบัน (นอก request ไม่ทำอะไร)"""
+    sample = _current.get()
+    if sample is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        sample.queries += 1
+        sample.query_seconds += time.perf_counter() - started
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    """รับ signal connection_created: ติดตั้ง record_query ไว้กับ connection ตลอดอายุ (ครั้งเดียว)"""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class Template(BaseTemplate):
+    def render(self, context=None, request=None):
+        sample = _current.get()
+        if sample is None or sample.rendering:
+            return super().render(context, request)
+        sample.rendering = True
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            sample.template_seconds += time.perf_counter() - started
+            sample.rendering = False
+
+
+class DjangoTemplates(BaseDjangoTemplates):
+    """DjangoTemplates ที่จับเวลา render ของแต่ละ request"""
+
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return Template(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
+
+
+def _empty_stats():
+    return {
+        'responses': {},  # (method, status) -> จำนวน
+        'duration_buckets': [0] * (len(DURATION_BUCKETS) + 1),  # ช่องสุดท้ายคือ +Inf (ไม่สะสม)
+        'duration_sum': 0.0,
+        'queries': 0,
+        'query_seconds': 0.0,
+        'template_seconds': 0.0,
+        'response_bytes': 0,
+        'response_count': 0,
+    }
+
+
+def merge_snapshots(snapshots):
+    """รวมสำเนาของหลาย worker ({view: stats}) เป็นสำเนาเดียว"""
+    merged = {}
+    for snapshot in snapshots:
+        for view, stats in snapshot.items():
+            target = merged.setdefault(view, _empty_stats())
+            for key, count in stats['responses'].items():
+                target['responses'][key] = target['responses'].get(key, 0) + count
+            target['duration_buckets'] = [a + b for a, b in zip(target['duration_buckets'], stats['duration_buckets'])]
+            for name in ('duration_sum', 'queries', 'query_seconds', 'template_seconds',
+                         'response_bytes', 'response_count'):
+                target[name] += stats[name]
+    return merged
+
+
+class MetricsRegistry:
+    """สถิติของ worker นี้ (thread-safe)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+        self._pid = os.getpid()
+        self._slot = None
+        self._last_flush = time.monotonic()
+
+    def record(self, view, method, status, duration, sample, response_bytes=None):
+        bucket = bisect.bisect_left(DURATION_BUCKETS, duration)
+        with self._lock:
+            stats = self._views.get(view)
+            if stats is None:
+                stats = self._views[view] = _empty_stats()
+            key = (method, status)
+            stats['responses'][key] = stats['responses'].get(key, 0) + 1
+            stats['duration_buckets'][bucket] += 1
+            stats['duration_sum'] += duration
+            stats['queries'] += sample.queries
+            stats['query_seconds'] += sample.query_seconds
+            stats['template_seconds'] += sample.template_seconds
+            if response_bytes is not None:
+                stats['response_bytes'] += response_bytes
+                stats['response_count'] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return copy.deepcopy(self._views)
+
+    def reset(self):
+        with self._lock:
+            self._views = {}
+        self._slot = None
+
+    def _slot_key(self, slot):
+        return f'metrics:worker:{slot}'
+
+    def flush_due(self, config):
+        return time.monotonic() - self._last_flush >= config.flush_interval
+
+    def flush(self, config):
+        """ส่งสำเนาของ worker นี้ไปที่ cache (แต่ละ worker ได้หมายเลข slot ไม่ซ้ำกันจากตัวนับใน cache)"""
+        self._last_flush = time.monotonic()
+        # process ที่ fork มาต้องได้ slot ใหม่ไม่เขียนทับของ process แม่
+        # และถ้าตัวนับใน cache หายไป (cache ถูกล้าง) ต้องขอใหม่ เพื่อไม่ให้ซ้ำกับ worker ที่เพิ่งได้ slot
+        if self._slot is None or self._pid != os.getpid() or (cache.get(WORKERS_KEY) or 0) < self._slot:
+            self._pid = os.getpid()
+            cache.add(WORKERS_KEY, 0, None)
+            try:
+                self._slot = cache.incr(WORKERS_KEY)
+            except ValueError:
+                cache.add(WORKERS_KEY, 0, None)
+                self._slot = cache.incr(WORKERS_KEY)
+        cache.set(self._slot_key(self._slot), self.snapshot(), config.ttl)
+
+    def collect(self, config):
+        """สถิติรวมของทุก worker: ของ worker นี้อ่านจากหน่วยความจำ ที่เหลืออ่านจาก cache"""
+        self.flush(config)
+        count = cache.get(WORKERS_KEY) or 0
+        others = cache.get_many([self._slot_key(slot) for slot in range(1, count + 1) if slot != self._slot])
+        return merge_snapshots([self.snapshot(), *others.values()])
+
+
+registry = MetricsRegistry()
+
+
+class MetricsMiddleware:
+    """บันทึกสถิติของทุก request ลง registry (ใช้ได้ทั้ง WSGI และ ASGI)"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.config = get_metrics_config()
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        sample = RequestSample()
+        token = _current.set(sample)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self._record(request, response, sample, time.perf_counter() - started)
+        if registry.flush_due(self.config):
+            registry.flush(self.config)
+        return response
+
+    async def __acall__(self, request):
+        sample = RequestSample()
+        token = _current.set(sample)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self._record(request, response, sample, time.perf_counter() - started)
+        if registry.flush_due(self.config):
+            await sync_to_async(registry.flush)(self.config)
+        return response
+
+    def _record(self, request, response, sample, duration):
+        match = request.resolver_match
+        registry.record(
+            match.view_name if match is not None else UNRESOLVED,
+            request.method,
+            response.status_code,
+            duration,
+            sample,
+            None if response.streaming else len(response.content),
+        )
+
+
+# --- รูปแบบข้อความของ Prometheus ---
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_prometheus(snapshot):
+    """แปลงสำเนา ({view: stats}) เป็นข้อความสำหรับ Prometheus (text exposition format 0.0.4)"""
+    views = sorted(snapshot)
+    lines = []
+
+    def metric(name, kind, help_text, samples):
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        lines.extend(f'{sample_name}{labels} {_number(value)}' for sample_name, labels, value in samples)
+
+    metric('django_http_requests_total', 'counter', 'จำนวน request แยกตาม view, method และ status', [
+        ('django_http_requests_total', _labels(view=view, method=method, status=status), count)
+        for view in views
+        for (method, status), count in sorted(snapshot[view]['responses'].items())
+    ])
+
+    duration = []
+    for view in views:
+        stats = snapshot[view]
+        cumulative = 0
+        for bound, count in zip((*DURATION_BUCKETS, '+Inf'), stats['duration_buckets']):
+            cumulative += count
+            duration.append(('django_http_request_duration_seconds_bucket', _labels(view=view, le=bound), cumulative))
+        duration.append(('django_http_request_duration_seconds_sum', _labels(view=view), stats['duration_sum']))
+        duration.append(('django_http_request_duration_seconds_count', _labels(view=view), cumulative))
+    metric('django_http_request_duration_seconds', 'histogram', 'เวลาตอบสนองของ view (วินาที)', duration)
+
+    for name, key, help_text in (
+        ('django_db_queries_total', 'queries', 'จำนวนคิวรี SQL'),
+        ('django_db_query_duration_seconds_total', 'query_seconds', 'เวลาที่ใช้ใน SQL (วินาที)'),
+        ('django_template_render_duration_seconds_total', 'template_seconds', 'เวลา render template รวมคิวรีที่เกิดระหว่าง render (วินาที)'),
+    ):
+        metric(name, 'counter', help_text, [(name, _labels(view=view), snapshot[view][key]) for view in views])
+
+    size = []
+    for view in views:
+        size.append(('django_http_response_size_bytes_sum', _labels(view=view), snapshot[view]['response_bytes']))
+        size.append(('django_http_response_size_bytes_count', _labels(view=view), snapshot[view]['response_count']))
+    metric('django_http_response_size_bytes', 'summary', 'ขนาด response ที่ไม่ใช่ streaming (ไบต์)', size)
+    return '\n'.join(lines) + '\n'
+
+
+def collect_metrics():
+    return registry.collect(get_metrics_config())
+
+
+def reset_metrics():
+    registry.reset()
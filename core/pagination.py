@@ -0,0 +1,183 @@
+"""
+การแบ่งหน้าแบบ keyset (cursor pagination)
+
+แทนที่จะใช้ OFFSET ซึ่งช้าลงเรื่อย ๆ เมื่อหน้าลึกขึ้น จะจำค่าคีย์ของแถวสุดท้ายในหน้า
+แล้วคิวรีหน้าถัดไปด้วยเงื่อนไข "คีย์มากกว่าค่านี้" บนคอลัมน์ที่มี index
+ทำให้หน้าที่ N ใช้เวลาเท่ากับหน้าแรก และ cursor ยังถูกต้องแม้มีการเพิ่มข้อมูลระหว่างการเปิดหน้า
+"""
+from functools import reduce
+from operator import or_
+
+from django.core import signing
+from django.db.models import F, Q
+
+CURSOR_SALT = 'core.pagination.cursor'
+PAGE_SIZE_CHOICES = (10, 25, 50, 100)
+DEFAULT_PAGE_SIZE = 25
+
+
+class KeysetPage:
+    """ผลลัพธ์ของการแบ่งหน้า 1 หน้า ใช้วนลูปใน template ได้เหมือน list"""
+    size_choices = PAGE_SIZE_CHOICES
+
+    def __init__(self, object_list, page_size, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.page_size = page_size
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    @property
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+
+def _key_value(obj, key):
+    """ดึงค่าคีย์จาก object (รองรับ lookup ข้ามความสัมพันธ์ เช่น profile__student_id) หรือ dict จาก values()"""
+    if isinstance(obj, dict):
+        return obj['id'] if key == 'pk' and 'pk' not in obj else obj[key]
+    value = obj
+    for part in key.split('__'):
+        value = getattr(value, part, None)
+        if value is None:
+            break
+    return value
+
+
+def _after(keys, values):
+    """เงื่อนไขของแถวที่อยู่หลัง cursor ตามลำดับ (คีย์เรียงจากน้อยไปมาก และค่า NULL อยู่ท้ายสุด)"""
+    conditions = []
+    equal = Q()
+    for key, value in zip(keys, values):
+        if value is None:
+            # ไม่มีค่าใดอยู่หลัง NULL ในคีย์นี้ จึงต้องไปเทียบคีย์ถัดไป
+            equal &= Q(**{f'{key}__isnull': True})
+            continue
+        conditions.append(equal & (Q(**{f'{key}__gt': value}) | Q(**{f'{key}__isnull': True})))
+        equal &= Q(**{key: value})
+    return reduce(or_, conditions) if conditions else Q(pk__in=[])
+
+
+def _before(keys, values):
+    """เงื่อนไขของแถวที่อยู่ก่อน cursor (กลับทิศของ _after)"""
+    conditions = []
+    equal = Q()
+    for key, value in zip(keys, values):
+        if value is None:
+            conditions.append(equal & Q(**{f'{key}__isnull': False}))
+            equal &= Q(**{f'{key}__isnull': True})
+            continue
+        conditions.append(equal & Q(**{f'{key}__lt': value}))
+        equal &= Q(**{key: value})
+    return reduce(or_, conditions) if conditions else Q(pk__in=[])
+
+
+class KeysetPaginator:
+    """
+    แบ่งหน้า QuerySet ตามคีย์ที่กำหนด เช่น KeysetPaginator(Course.objects.all(), ('code',))
+
+    คีย์ควรเป็นคอลัมน์ที่มี index และ pk จะถูกต่อท้ายเสมอเพื่อให้ลำดับไม่ซ้ำกัน
+    """
+
+    def __init__(self, queryset, ordering, page_size=DEFAULT_PAGE_SIZE):
+        self.queryset = queryset
+        self.keys = tuple(ordering) if 'pk' in ordering else tuple(ordering) + ('pk',)
+        self.page_size = page_size
+
+    def encode_cursor(self, obj, direction):
+        values = [_key_value(obj, key) for key in self.keys]
+        return signing.dumps({'v': values, 'd': direction}, salt=CURSOR_SALT, compress=True)
+
+    def decode_cursor(self, cursor):
+        """คืนค่า (ทิศทาง, ค่าคีย์) หรือ None ถ้า cursor ไม่ถูกต้อง"""
+        try:
+            data = signing.loads(cursor, salt=CURSOR_SALT)
+        except signing.BadSignature:
+            return None
+        if not isinstance(data, dict):
+            return None
+        values = data.get('v')
+        if data.get('d') not in ('n', 'p') or not isinstance(values, list) or len(values) != len(self.keys):
+            return None
+        return data['d'], values
+
+    def _ordered(self, queryset, reverse=False):
+        if reverse:
+            return queryset.order_by(*[F(key).desc(nulls_first=True) for key in self.keys])
+        return queryset.order_by(*[F(key).asc(nulls_last=True) for key in self.keys])
+
+    def _page_queryset(self, cursor):
+        """คืนค่า (ทิศทาง, QuerySet ของหน้านี้ที่ขอเกิน 1 แถว) ทิศทาง None คือหน้าแรก"""
+        decoded = self.decode_cursor(cursor) if cursor else None
+        if decoded is None:
+            return None, self._ordered(self.queryset)[:self.page_size + 1]
+        direction, values = decoded
+        if direction == 'n':
+            return direction, self._ordered(self.queryset.filter(_after(self.keys, values)))[:self.page_size + 1]
+        queryset = self.queryset.filter(_before(self.keys, values))
+        return direction, self._ordered(queryset, reverse=True)[:self.page_size + 1]
+
+    def _build_page(self, direction, rows):
+        size = self.page_size
+        if direction is None:
+            has_next, has_previous = len(rows) > size, False
+            rows = rows[:size]
+        elif direction == 'n':
+            has_next, has_previous = len(rows) > size, True
+            rows = rows[:size]
+        else:
+            has_next, has_previous = True, len(rows) > size
+            rows = rows[:size][::-1]
+
+        return KeysetPage(
+            rows,
+            size,
+            next_cursor=self.encode_cursor(rows[-1], 'n') if rows and has_next else None,
+            previous_cursor=self.encode_cursor(rows[0], 'p') if rows and has_previous else None,
+        )
+
+    def get_page(self, cursor=None):
+        direction, queryset = self._page_queryset(cursor)
+        return self._build_page(direction, list(queryset))
+
+    async def aget_page(self, cursor=None):
+        """get_page สำหรับ async view (ใช้ async ORM)"""
+        direction, queryset = self._page_queryset(cursor)
+        return self._build_page(direction, [row async for row in queryset])
+
+
+def get_page_size(request, default=DEFAULT_PAGE_SIZE):
+    """อ่านขนาดหน้าจากพารามิเตอร์ ?size= (เลือกได้เฉพาะค่าใน PAGE_SIZE_CHOICES)"""
+    try:
+        size = int(request.GET.get('size', default))
+    except (TypeError, ValueError):
+        return default
+    return size if size in PAGE_SIZE_CHOICES else default
+
+
+def paginate_keyset(request, queryset, ordering, default_size=DEFAULT_PAGE_SIZE):
+    """แบ่งหน้าตามพารามิเตอร์ ?cursor= และ ?size= ของ request"""
+    paginator = KeysetPaginator(queryset, ordering, page_size=get_page_size(request, default_size))
+    return paginator.get_page(request.GET.get('cursor'))
+
+
+async def apaginate_keyset(request, queryset, ordering, default_size=DEFAULT_PAGE_SIZE):
+    """paginate_keyset สำหรับ async view"""
+    paginator = KeysetPaginator(queryset, ordering, page_size=get_page_size(request, default_size))
+    return await paginator.aget_page(request.GET.get('cursor'))
@@ -0,0 +1,91 @@
+"""
+เครื่องมือทดสอบจำนวนคิวรี (query budget) ของ view
+
+- query_budget(n): context manager / decorator ที่ fail ถ้ามีคิวรีเกิน n
+- assert_query_budget(send, n, grow): เรียก send ที่ข้อมูล 2 ขนาด (ก่อนและหลัง grow())
+  fail ถ้าเกิน n หรือจำนวนคิวรีเพิ่มตามจำนวนแถว (N+1)
+"""
+from contextlib import ContextDecorator
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def _format_queries(queries):
+    return '\n'.join(f"{index}. {query['sql']}" for index, query in enumerate(queries, start=1))
+
+
+def count_queries(func, using=DEFAULT_DB_ALIAS, rollback=False):
+    """
+    เรียก func แล้วคืนรายการคิวรีที่เกิดขึ้น
+    rollback=True: เรียกภายใน savepoint ที่ rollback ทิ้ง (ข้อมูลกลับเป็นเหมือนก่อนเรียก)
+    """
+    connection = connections[using]
+    if not rollback:
+        with CaptureQueriesContext(connection) as captured:
+            func()
+        return captured.captured_queries
+    with transaction.atomic(using=using):
+        with CaptureQueriesContext(connection) as captured:
+            func()
+        transaction.set_rollback(True, using=using)
+    return captured.captured_queries
+
+
+class query_budget(ContextDecorator):
+    """
+    ใช้ได้ทั้ง `with query_budget(5): ...` และ `@query_budget(5)` ครอบฟังก์ชันทดสอบ
+    ต่างจาก django_assert_num_queries ตรงที่เป็นเพดาน (น้อยกว่าได้) ไม่ใช่จำนวนที่ต้องเท่ากันพอดี
+    """
+
+    def __init__(self, max_queries, using=DEFAULT_DB_ALIAS):
+        self.max_queries = max_queries
+        self.using = using
+        self._captured = None
+
+    def __enter__(self):
+        self._captured = CaptureQueriesContext(connections[self.using])
+        self._captured.__enter__()
+        return self._captured
+
+    def __exit__(self, exc_type, exc, tb):
+        self._captured.__exit__(exc_type, exc, tb)
+        if exc_type is None and len(self._captured) > self.max_queries:
+            raise QueryBudgetExceeded(
+                f'ใช้ {len(self._captured)} คิวรี เกินงบ {self.max_queries}\n'
+                f'{_format_queries(self._captured.captured_queries)}'
+            )
+        return False
+
+
+def assert_query_budget(send, max_queries, grow, using=DEFAULT_DB_ALIAS, rollback=False):
+    """
+    ตรวจว่า send() ใช้คิวรีไม่เกิน max_queries และไม่เพิ่มขึ้นเมื่อข้อมูลมากขึ้น
+
+    - grow(): เพิ่มข้อมูล (แถวที่ view อ่าน) ระหว่างการวัดครั้งแรกและครั้งที่สอง
+    - เรียก send() อุ่นเครื่องก่อนวัดทุกครั้ง เพื่อไม่นับคิวรีของ cache ระดับ process ที่สร้างใหม่
+    - rollback=True สำหรับ view ที่เปลี่ยนข้อมูล ทุกครั้งจะเริ่มจากข้อมูลชุดเดียวกัน
+    คืนค่า (จำนวนคิวรีที่ข้อมูลน้อย, จำนวนคิวรีที่ข้อมูลมาก)
+    """
+    counts = []
+    for scale in ('small', 'large'):
+        if scale == 'large':
+            grow()
+        count_queries(send, using, rollback)
+        queries = count_queries(send, using, rollback)
+        if len(queries) > max_queries:
+            raise QueryBudgetExceeded(
+                f'ข้อมูลขนาด {scale}: ใช้ {len(queries)} คิวรี เกินงบ {max_queries}\n{_format_queries(queries)}'
+            )
+        counts.append(queries)
+    small, large = counts
+    if len(large) > len(small):
+        raise QueryBudgetExceeded(
+            f'จำนวนคิวรีเพิ่มตามข้อมูล ({len(small)} -> {len(large)}) น่าจะเป็น N+1\n'
+            f'--- ข้อมูลน้อย ---\n{_format_queries(small)}\n--- ข้อมูลมาก ---\n{_format_queries(large)}'
+        )
+    return len(small), len(large)
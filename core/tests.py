@@ -1,3 +1,192 @@
-from django.test import TestCase
+import pytest
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.test import AsyncClient
+from django.urls import reverse
+from core.metrics import MetricsRegistry, RequestSample, get_metrics_config, registry, render_prometheus, reset_metrics
+from core.pagination import KeysetPaginator
+from courses.models import Course
+from users.models import Profile
 
-# Create your tests here.
+@pytest.fixture
+def courses(db):
+    return [
+        Course.objects.create(code=f"{100000 + i:06d}", name=f"Course {i}", credits=3)
+        for i in range(7)
+    ]
+
+def walk_forward(paginator):
+    """เดินไปทีละหน้าด้วย next cursor แล้วคืนค่ารายการทั้งหมด"""
+    seen = []
+    page = paginator.get_page()
+    while True:
+        seen.extend(page.object_list)
+        if not page.has_next:
+            return seen
+        page = paginator.get_page(page.next_cursor)
+
+@pytest.mark.django_db
+def test_keyset_walks_every_row_once(courses):
+    paginator = KeysetPaginator(Course.objects.all(), ('code',), page_size=3)
+    assert walk_forward(paginator) == sorted(courses, key=lambda c: c.code)
+
+@pytest.mark.django_db
+def test_keyset_cursor_stable_after_insert(courses):
+    paginator = KeysetPaginator(Course.objects.all(), ('code',), page_size=3)
+    first = paginator.get_page()
+    # เพิ่มรายวิชาที่อยู่ก่อนหน้าปัจจุบัน หน้าถัดไปต้องไม่เลื่อน
+    Course.objects.create(code="000001", name="Inserted", credits=3)
+    second = paginator.get_page(first.next_cursor)
+    assert [c.code for c in second] == ["100003", "100004", "100005"]
+
+@pytest.mark.django_db
+def test_keyset_previous_page(courses):
+    paginator = KeysetPaginator(Course.objects.all(), ('code',), page_size=3)
+    second = paginator.get_page(paginator.get_page().next_cursor)
+    back = paginator.get_page(second.previous_cursor)
+    assert [c.code for c in back] == ["100000", "100001", "100002"]
+    assert not back.has_previous
+    assert back.has_next
+
+@pytest.mark.django_db
+def test_keyset_nullable_key_sorted_last(db):
+    for i, student_id in enumerate(["65000002", None, "65000001", None]):
+        user = User.objects.create_user(username=f"s{i}", password="pass")
+        Profile.objects.create(user=user, user_type='STUDENT', student_id=student_id)
+    queryset = User.objects.select_related('profile')
+    paginator = KeysetPaginator(queryset, ('profile__student_id',), page_size=1)
+    ids = [user.profile.student_id for user in walk_forward(paginator)]
+    assert ids == ["65000001", "65000002", None, None]
+
+@pytest.mark.django_db
+def test_keyset_invalid_cursor_returns_first_page(courses):
+    paginator = KeysetPaginator(Course.objects.all(), ('code',), page_size=3)
+    page = paginator.get_page("not-a-valid-cursor")
+    assert [c.code for c in page] == ["100000", "100001", "100002"]
+
+@pytest.mark.django_db
+def test_keyset_async_pages_match_sync(courses):
+    paginator = KeysetPaginator(Course.objects.all(), ('code',), page_size=3)
+    second = paginator.get_page(paginator.get_page().next_cursor)
+    async_second = async_to_sync(paginator.aget_page)(paginator.get_page().next_cursor)
+    assert list(async_second) == list(second)
+    assert (async_second.next_cursor, async_second.previous_cursor) == (second.next_cursor, second.previous_cursor)
+    back = async_to_sync(paginator.aget_page)(second.previous_cursor)
+    assert [c.code for c in back] == ["100000", "100001", "100002"]
+
+@pytest.mark.django_db
+def test_course_list_page_size(client, courses):
+    staff = User.objects.create_user(username="staff", password="pass", is_staff=True)
+    client.force_login(staff)
+    resp = client.get(reverse('courses:course-list'), {'size': 10})
+    assert len(resp.context['courses']) == 7
+    assert not resp.context['courses'].has_next
+
+@pytest.fixture
+def enroll_gate(settings):
+    from core.admission import reset_gates
+    settings.ADMISSION_CONTROL = {'enroll': {'rate': 1000, 'burst': 1, 'concurrency': 1, 'window': 1}}
+    reset_gates()
+    yield
+    reset_gates()
+
+def test_token_bucket_refills_over_time(monkeypatch):
+    from core import admission
+    now = [100.0]
+    monkeypatch.setattr(admission.time, 'monotonic', lambda: now[0])
+    bucket = admission.TokenBucket(rate=2, burst=2)
+    assert bucket.take() and bucket.take()
+    assert not bucket.take()
+    now[0] += 0.5
+    assert bucket.take()
+    assert not bucket.take()
+
+@pytest.mark.django_db
+def test_admission_queues_when_gate_is_busy(client, enroll_gate, django_assert_num_queries):
+    from core.admission import get_gate
+    from courses.models import Section
+    student = User.objects.create_user(username="student", password="pass")
+    client.force_login(student)
+    url = reverse('courses:enroll-section', args=[999])
+    gate = get_gate('enroll')
+
+    # worker เต็ม (มี transaction ค้างอยู่ 1 รายการ): ได้บัตรคิวและหน้ารอคิวที่ไม่คิวรีข้อมูลลงทะเบียน
+    assert gate.try_enter()
+    with django_assert_num_queries(2):  # session + user ของ login_required เท่านั้น
+        resp = client.post(url)
+    assert resp.status_code == 429
+    assert resp['Retry-After'] == '3'
+    assert "คุณอยู่ในคิวลำดับที่" in resp.content.decode()
+    assert gate.queue_depth() == 1
+
+    # ถึงคิวแล้วและ worker ว่าง: เข้าถึง view จริง (ไม่พบกลุ่มเรียน = 404) และคืนบัตรคิว
+    gate.leave()
+    gate.bucket.take = lambda: True
+    resp = client.post(url)
+    assert resp.status_code == 404
+    assert gate.queue_depth() == 0
+    metrics = gate.metrics()
+    assert metrics['queued'] == 1 and metrics['wait_count'] == 1 and metrics['in_flight'] == 0
+    assert not Section.objects.exists()
+
+@pytest.mark.django_db
+def test_admission_metrics_view(client, enroll_gate):
+    staff = User.objects.create_user(username="staff", password="pass", is_staff=True)
+    client.force_login(staff)
+    client.post(reverse('courses:enroll-section', args=[999]))
+    resp = client.get(reverse('courses:admission-metrics'))
+    assert resp.status_code == 200
+    assert [gate['gate'] for gate in resp.json()['gates']] == ['enroll']
+
+def metric_value(body, line_prefix):
+    """ค่าของ sample แรกที่ขึ้นต้นด้วย line_prefix ในข้อความ Prometheus"""
+    for line in body.splitlines():
+        if line.startswith(line_prefix):
+            return float(line.rsplit(' ', 1)[1])
+    raise AssertionError(f"ไม่พบ {line_prefix}")
+
+@pytest.mark.django_db
+def test_metrics_endpoint_records_views(client, courses):
+    reset_metrics()
+    staff = User.objects.create_user(username="staff", password="pass", is_staff=True)
+    client.force_login(staff)
+    client.get(reverse('courses:course-list'))
+    client.get(reverse('courses:course-list'))
+    async_client = AsyncClient()
+    async_client.force_login(staff)
+    async_to_sync(async_client.get)(reverse('core:index'))
+
+    resp = client.get(reverse('core:metrics'))
+    assert resp.status_code == 200 and resp['Content-Type'].startswith('text/plain; version=0.0.4')
+    body = resp.content.decode()
+    view = 'view="courses:course-list"'
+    assert metric_value(body, f'django_http_requests_total{{{view},method="GET",status="200"}}') == 2
+    assert metric_value(body, f'django_http_request_duration_seconds_bucket{{{view},le="+Inf"}}') == 2
+    assert metric_value(body, f'django_db_queries_total{{{view}}}') >= 2
+    assert metric_value(body, f'django_template_render_duration_seconds_total{{{view}}}') > 0
+    assert metric_value(body, f'django_http_response_size_bytes_count{{{view}}}') == 2
+    # view แบบ async (ASGI): คิวรีใน sync_to_async ถูกนับด้วย
+    assert metric_value(body, 'django_db_queries_total{view="core:index"}') >= 1
+
+    client.force_login(User.objects.create_user(username="student", password="pass"))
+    assert client.get(reverse('core:metrics')).status_code == 403
+
+def test_metrics_merges_worker_snapshots():
+    reset_metrics()
+    config = get_metrics_config()
+    sample = RequestSample()
+    sample.queries = 3
+    registry.record('core:index', 'GET', 200, 0.02, sample, response_bytes=100)
+    # worker อื่นส่งสำเนาของตัวเองไว้ใน cache กลาง
+    other = MetricsRegistry()
+    other.record('core:index', 'GET', 200, 3.0, sample, response_bytes=50)
+    other.record('core:index', 'POST', 405, 0.001, RequestSample())
+    other.flush(config)
+
+    body = render_prometheus(registry.collect(config))
+    assert 'django_http_requests_total{view="core:index",method="GET",status="200"} 2' in body
+    assert 'django_http_requests_total{view="core:index",method="POST",status="405"} 1' in body
+    assert 'django_http_request_duration_seconds_bucket{view="core:index",le="0.025"} 2' in body
+    assert 'django_http_request_duration_seconds_bucket{view="core:index",le="+Inf"} 3' in body
+    assert 'django_db_queries_total{view="core:index"} 6' in body
+    assert 'django_http_response_size_bytes_sum{view="core:index"} 150' in body
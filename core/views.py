@@ -1,24 +1,39 @@
 # core/views.py
+from asgiref.sync import sync_to_async
+from django.contrib.auth.decorators import login_required
+from django.http import HttpResponse
 from django.shortcuts import render
-from django.utils import timezone
-from courses.models import Section, Semester
+from core.metrics import CONTENT_TYPE, collect_metrics, render_prometheus
+from courses.models import Section, instructors_prefetch
+from courses.semesters import aget_current_semester
+from courses.views import staff_required
 
-def index(request):
-    # View สำหรับหน้าแรกของเว็บไซต์
+async def index(request):
+    # View สำหรับหน้าแรกของเว็บไซต์ (async: ไม่ถือ worker thread ระหว่างรอฐานข้อมูลเมื่อรันด้วย ASGI)
     # 1. ตรวจสอบเทอมปัจจุบัน
-    current_date = timezone.now().date()
-    current_semester = Semester.objects.filter(start_date__lte=current_date, end_date__gte=current_date).first() # ดึงเทอมที่มีวันที่ปัจจุบันอยู่ในช่วงเริ่มต้นและสิ้นสุด
+    current_semester = await aget_current_semester() # ดึงเทอมที่มีวันที่ปัจจุบันอยู่ในช่วงเริ่มต้นและสิ้นสุด (แคชไว้ในหน่วยความจำ)
 
     # 2. ดึงข้อมูล Section ที่อยู่ในเทอมปัจจุบัน (ถ้ามี)
     sections = []
     if current_semester:
-        sections = Section.objects.filter(
-            semester=current_semester, # ดึงเฉพาะเทอมปัจจุบัน
-            course__is_active=True # ดึงเฉพาะวิชาที่ยังเปิดใช้งาน
-        ).order_by('course__code')[:6] # เรียงตามรหัสวิชาและจำกัดแค่ 6 รายการ
+        sections = [
+            section async for section in Section.objects.filter(
+                semester=current_semester, # ดึงเฉพาะเทอมปัจจุบัน
+                course__is_active=True # ดึงเฉพาะวิชาที่ยังเปิดใช้งาน
+            ).select_related('course', 'room').prefetch_related(
+                'class_times', instructors_prefetch()
+            ).order_by('course__code')[:6] # เรียงตามรหัสวิชาและจำกัดแค่ 6 รายการ
+        ]
 
     context = {
         'sections': sections,
         'current_semester': current_semester,
     }
-    return render(request, 'core/index.html', context)
\ No newline at end of file
+    # render ใน thread เพราะ context processor อ่าน request.user แบบ sync
+    return await sync_to_async(render)(request, 'core/index.html', context)
+
+@login_required
+@staff_required
+def metrics(request):
+    """สถิติของทุก view (รวมทุก worker) ในรูปแบบข้อความของ Prometheus"""
+    return HttpResponse(render_prometheus(collect_metrics()), content_type=CONTENT_TYPE)
@@ -3,6 +3,16 @@ ASGI config for course_registration_system project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+จำเป็นสำหรับจำนวนที่นั่งแบบ real-time (api/seats/stream/) และ view แบบ async ตัวอย่างการรัน:
+
+    SEAT_STREAM_ENABLED=true gunicorn course_registration_system.asgi:application \
+        -k uvicorn.workers.UvicornWorker --workers 4
+
+(ต้องติดตั้ง gunicorn และ uvicorn) reverse proxy ต้องไม่พัก response ไว้ใน buffer และตั้ง timeout
+ของการเชื่อมต่อให้ยาวกว่า KEEPALIVE_SECONDS ใน courses.api
+LocalSeatBroker ส่งข้อมูลภายใน process เดียว เมื่อรันหลาย worker การลงทะเบียนใน worker หนึ่ง
+จะถึงเฉพาะการเชื่อมต่อใน worker เดียวกัน (ดู courses.seat_events.set_broker)
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
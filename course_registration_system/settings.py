@@ -48,6 +48,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # อยู่บนสุดเพื่อจับเวลาทั้ง request (core.metrics)
+    'core.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -61,7 +63,8 @@ ROOT_URLCONF = 'course_registration_system.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates ที่จับเวลา render ให้ core.metrics
+        'BACKEND': 'core.metrics.DjangoTemplates',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -69,6 +72,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'courses.context_processors.current_semester',
             ],
         },
     },
@@ -98,6 +102,31 @@ DATABASES = {
     }
 }
 
+# Cache กลางที่ทุก worker ใช้ร่วมกัน (เช่น redis://127.0.0.1:6379/1) ค่าเริ่มต้นคือหน่วยความจำของ process
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://'),
+}
+
+# การจำกัดจำนวนคำขอต่อ view (core.admission) ค่าที่ไม่ระบุใช้ค่าเริ่มต้นใน GateConfig
+ADMISSION_CONTROL = {
+    'enroll': {
+        'enabled': env.bool('ENROLL_ADMISSION_ENABLED', default=True),
+        'rate': env.float('ENROLL_ADMISSION_RATE', default=50.0),
+        'burst': env.int('ENROLL_ADMISSION_BURST', default=100),
+        'concurrency': env.int('ENROLL_ADMISSION_CONCURRENCY', default=20),
+    },
+}
+
+# จำนวนที่นั่งแบบ real-time (Server-Sent Events ที่ api/seats/stream/) ต้องรันด้วย ASGI เท่านั้น
+# (ดู course_registration_system/asgi.py) ถ้ารันด้วย WSGI การเชื่อมต่อที่ไม่มีวันจบจะกิน worker ไปตลอด
+# เปิดเมื่อ deploy ด้วย ASGI แล้ว: หน้าลงทะเบียนจะเปิด EventSource และ endpoint จะส่งข้อมูล
+SEAT_STREAM_ENABLED = env.bool('SEAT_STREAM_ENABLED', default=False)
+
+# สถิติของแต่ละ view ที่ /metrics (core.metrics) ค่าที่ไม่ระบุใช้ค่าเริ่มต้นใน MetricsConfig
+METRICS = {
+    'flush_interval': env.float('METRICS_FLUSH_INTERVAL', default=10.0),
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
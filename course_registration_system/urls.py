@@ -20,6 +20,7 @@ from django.urls import path, include
 urlpatterns = [
     path('', include('core.urls')),
     path('manage/courses/', include('courses.urls')),
+    path('api/', include('courses.api_urls')),
     path('users/', include('users.urls', namespace='users')),
     path('admin/', admin.site.urls),
 ]
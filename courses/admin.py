@@ -1,5 +1,14 @@
+from functools import reduce
+from operator import and_, or_
+
+from django import forms
 from django.contrib import admin
-from .models import Faculty, Department, Branch, Course, Section, Room, Semester, ClassTime
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.forms import BaseInlineFormSet
+from .enrollment import sync_enrolled_counts
+from .forms import BaseClassTimeFormSet
+from .models import Faculty, Department, Branch, Course, Section, Room, Semester, ClassTime, WaitlistEntry, instructors_prefetch
 
 
 @admin.register(Faculty)
@@ -37,18 +46,140 @@ class CourseAdmin(admin.ModelAdmin):
     
 class ClassTimeInline(admin.TabularInline):
     model = ClassTime
+    formset = BaseClassTimeFormSet
+    extra = 1
+
+# รายชื่อนิสิตในกลุ่มเรียน: แสดงทีละหน้าและค้นหาได้ (query string roster_q / roster_page)
+# แทน filter_horizontal ที่ต้อง render ผู้ใช้ทุกคนในระบบลงหน้าแก้ไข
+class RosterFormSet(BaseInlineFormSet):
+    per_page = 50
+    search = ''
+    page_number = 1
+    params = None
+    search_lookups = (
+        'user__username__icontains',
+        'user__profile__student_id__icontains',
+        'user__profile__first_name_th__icontains',
+        'user__profile__last_name_th__icontains',
+    )
+
+    def get_queryset(self):
+        if not hasattr(self, '_queryset'):
+            queryset = self.queryset.select_related('user__profile').order_by(
+                'user__profile__student_id', 'user__username', 'pk'
+            )
+            terms = self.search.split()
+            if terms:
+                queryset = queryset.filter(reduce(and_, (
+                    reduce(or_, (Q(**{lookup: term}) for lookup in self.search_lookups)) for term in terms
+                )))
+            self.page = Paginator(queryset, self.per_page).get_page(self.page_number)
+            self._queryset = self.page.object_list
+        return self._queryset
+
+    def page_url(self, number):
+        params = self.params.copy()
+        params['roster_page'] = number
+        return f'?{params.urlencode()}'
+
+    def previous_page_url(self):
+        return self.page_url(self.page.previous_page_number()) if self.page.has_previous() else ''
+
+    def next_page_url(self):
+        return self.page_url(self.page.next_page_number()) if self.page.has_next() else ''
+
+
+class RosterInline(admin.TabularInline):
+    model = Section.students.through
+    formset = RosterFormSet
+    template = 'admin/courses/section/roster_inline.html'
+    fields = ('student_id', 'student_name', 'username')
+    readonly_fields = fields
+    extra = 0
+    max_num = 0  # เพิ่มนิสิตผ่าน RosterAddInline
+    verbose_name = 'นิสิตที่ลงทะเบียน'
+    verbose_name_plural = 'นิสิตที่ลงทะเบียน'
+
+    def get_formset(self, request, obj=None, **kwargs):
+        formset = super().get_formset(request, obj, **kwargs)
+        formset.search = request.GET.get('roster_q', '')
+        formset.page_number = request.GET.get('roster_page', 1)
+        formset.params = request.GET.copy()
+        return formset
+
+    @admin.display(description='รหัสนิสิต')
+    def student_id(self, obj):
+        return getattr(getattr(obj.user, 'profile', None), 'student_id', '') or '-'
+
+    @admin.display(description='ชื่อ-นามสกุล')
+    def student_name(self, obj):
+        profile = getattr(obj.user, 'profile', None)
+        if profile and profile.first_name_th:
+            return f"{profile.first_name_th} {profile.last_name_th}"
+        return obj.user.get_full_name() or '-'
+
+    @admin.display(description='ชื่อผู้ใช้')
+    def username(self, obj):
+        return obj.user.username
+
+
+class RosterAddFormSet(BaseInlineFormSet):
+    def clean(self):
+        super().clean()
+        added = [
+            form for form in self.forms
+            if form.cleaned_data and not form.cleaned_data.get('DELETE') and form.cleaned_data.get('user')
+        ]
+        if not added or not self.instance.pk or self.instance.capacity is None:
+            return
+        # ตรวจก่อนบันทึก เพื่อไม่ให้ไปชน CHECK constraint ของ enrolled_count ในฐานข้อมูล
+        # ล็อกแถวของกลุ่มเรียนไว้จนบันทึกเสร็จ (หน้า admin บันทึกทั้งหมดใน transaction เดียว)
+        # การเพิ่มนิสิตพร้อมกันจากหลายหน้าจะนับและบันทึกทีละรายการ ไม่นับจากข้อมูลก่อนอีกฝั่ง commit
+        Section.objects.select_for_update().filter(pk=self.instance.pk).values_list('pk', flat=True).first()
+        enrolled = Section.students.through.objects.filter(section_id=self.instance.pk).count()
+        if enrolled + len(added) > self.instance.capacity:
+            raise forms.ValidationError('จำนวนนิสิตที่ลงทะเบียนเกินความจุของกลุ่มเรียน')
+
+
+class RosterAddInline(admin.TabularInline):
+    model = Section.students.through
+    formset = RosterAddFormSet
+    fields = ('user',)
+    autocomplete_fields = ('user',)
     extra = 1
+    verbose_name = 'เพิ่มนิสิต'
+    verbose_name_plural = 'เพิ่มนิสิตในกลุ่มเรียน'
+
+    def get_queryset(self, request):
+        # แสดงเฉพาะแถวสำหรับเพิ่มใหม่ (รายชื่อเดิมอยู่ใน RosterInline)
+        return super().get_queryset(request).none()
+
 
 @admin.register(Section)
 class SectionAdmin(admin.ModelAdmin):
-    list_display = ('__str__', 'semester', 'room', 'display_instructors')
+    list_display = ('__str__', 'semester', 'room', 'enrolled_count', 'capacity', 'display_instructors')
     list_filter = ('semester', 'course__department__faculty', 'course', 'room__building')
+    list_select_related = ('course', 'semester', 'room')
     search_fields = ('course__name', 'course__code')
-    filter_horizontal = ('students', 'instructors')
-    inlines = [ClassTimeInline]
+    autocomplete_fields = ('course', 'room', 'instructors')
+    exclude = ('students',)
+    inlines = [ClassTimeInline, RosterInline, RosterAddInline]
+    # ไม่นับจำนวนกลุ่มเรียนทั้งหมด (COUNT อีกครั้ง) เมื่อกรองข้อมูลในหน้ารายการ
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related(instructors_prefetch())
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        # inline บันทึกแถวในตารางลงทะเบียนโดยตรง (ไม่ผ่าน m2m_changed) จึงคำนวณ enrolled_count ใหม่ที่นี่
+        sync_enrolled_counts([form.instance.pk])
 
     def display_instructors(self, obj):
-        return ", ".join([user.profile.first_name_th or user.username for user in obj.instructors.all()])
+        return ", ".join([
+            user.profile.display_name if hasattr(user, 'profile') and user.profile.display_name else user.username
+            for user in obj.instructors.all()
+        ])
     
     display_instructors.short_description = 'อาจารย์ผู้สอน'
     
@@ -58,3 +189,12 @@ class SectionAdmin(admin.ModelAdmin):
             for ct in obj.class_times.all()
         ])
     display_class_times.short_description = 'วัน-เวลาเรียน'
+
+
+@admin.register(WaitlistEntry)
+class WaitlistEntryAdmin(admin.ModelAdmin):
+    list_display = ('section', 'student', 'created_at')
+    list_filter = ('section__semester',)
+    list_select_related = ('section__course', 'student')
+    search_fields = ('section__course__code', 'student__username')
+    raw_id_fields = ('section', 'student')
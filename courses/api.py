@@ -0,0 +1,155 @@
+"""
+JSON API สำหรับแอปมือถือและระบบของภาควิชา (อ่านอย่างเดียว ไม่ต้องเข้าสู่ระบบ)
+
+catalog และ seats มี ETag และรองรับ If-None-Match: ถ้าข้อมูลไม่เปลี่ยนจะตอบ 304 โดยไม่แตะฐานข้อมูล
+seats/stream เป็น Server-Sent Events ของจำนวนที่นั่ง (async view ต้องรันด้วย ASGI และเปิด settings.SEAT_STREAM_ENABLED
+ดู course_registration_system/asgi.py และ courses.seat_events)
+sections แบ่งหน้าด้วย cursor และเลือกฟิลด์ได้ สำหรับระบบที่ต้องการข้อมูลบางส่วน (ดู courses.projections)
+"""
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, HttpResponseNotModified, JsonResponse, StreamingHttpResponse
+from django.utils.http import parse_etags
+from django.views.decorators.http import require_GET
+
+from core.pagination import paginate_keyset
+from .catalog import get_catalog_etag, get_catalog_snapshot, get_seats
+from .forms import SectionApiQueryForm
+from .models import Semester
+from .projections import ORDERING, section_rows, serialize_rows
+from .seat_events import get_broker, seat_counts
+from .semesters import get_current_semester
+
+
+def _not_modified(request, etag):
+    if etag is None:
+        return False
+    etags = parse_etags(request.headers.get('If-None-Match', ''))
+    return '*' in etags or etag in etags
+
+
+def _json_response(request, etag, body):
+    if _not_modified(request, etag):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(body, content_type='application/json')
+    response['ETag'] = etag
+    # ให้ client และ proxy ตรวจกับ server ทุกครั้ง (ด้วย If-None-Match) ก่อนใช้ข้อมูลที่เก็บไว้
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+
+def _semester_id(semester_pk):
+    if semester_pk is not None:
+        return semester_pk
+    semester = get_current_semester()
+    if semester is None:
+        raise Http404('ไม่พบภาคเรียนปัจจุบัน')
+    return semester.pk
+
+
+@require_GET
+def catalog(request, semester_pk=None):
+    """catalog ทั้งภาคเรียน: รายวิชา กลุ่มเรียน ตารางเรียน ห้อง อาจารย์ และจำนวนที่รับ"""
+    semester_id = _semester_id(semester_pk)
+    etag = get_catalog_etag(semester_id)
+    if _not_modified(request, etag):
+        return _json_response(request, etag, b'')
+    try:
+        etag, body = get_catalog_snapshot(semester_id)
+    except Semester.DoesNotExist:
+        raise Http404('ไม่พบภาคเรียน')
+    return _json_response(request, etag, body)
+
+
+@require_GET
+def catalog_seats(request, semester_pk=None):
+    """จำนวนที่นั่งที่ลงทะเบียนแล้วของทุกกลุ่มเรียน (เปลี่ยนบ่อย จึงแยกจาก catalog)"""
+    etag, body = get_seats(_semester_id(semester_pk))
+    return _json_response(request, etag, body)
+
+
+MAX_STREAM_SECTIONS = 200
+KEEPALIVE_SECONDS = 15
+
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+@require_GET
+async def seat_stream(request):
+    """
+    Server-Sent Events ของจำนวนที่นั่ง ?sections=1,2,3 (ไม่เกิน MAX_STREAM_SECTIONS กลุ่ม)
+    ส่งค่าปัจจุบันทั้งหมดก่อน 1 ครั้ง แล้วส่งเฉพาะกลุ่มที่เปลี่ยน ไม่เกิน 1 ครั้งต่อวินาที
+    แต่ละการเชื่อมต่อไม่ถือ thread หรือ connection ของฐานข้อมูลไว้ระหว่างรอ
+
+    ตอบ 204 (EventSource จะไม่เชื่อมต่อใหม่) ถ้าปิด SEAT_STREAM_ENABLED หรือไม่ได้รันด้วย ASGI
+    เพราะ WSGI ต้องอ่าน async generator ที่ไม่มีวันจบใน worker thread ทำให้ worker ถูกใช้ไปตลอด
+    """
+    if not settings.SEAT_STREAM_ENABLED or not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+    raw_ids = [value for value in request.GET.get('sections', '').split(',') if value.strip()]
+    if not raw_ids or not all(value.strip().isdigit() for value in raw_ids):
+        return JsonResponse({'errors': {'sections': ['ระบุ id ของกลุ่มเรียนคั่นด้วยจุลภาค']}}, status=400)
+    section_ids = list(dict.fromkeys(int(value) for value in raw_ids))
+    if len(section_ids) > MAX_STREAM_SECTIONS:
+        return JsonResponse({'errors': {'sections': [f'ติดตามได้ไม่เกิน {MAX_STREAM_SECTIONS} กลุ่มเรียน']}}, status=400)
+
+    async def events():
+        broker = get_broker()
+        # ติดตามก่อนอ่านค่าปัจจุบัน เพื่อไม่ให้พลาดการเปลี่ยนแปลงที่เกิดระหว่างนั้น
+        subscription = broker.subscribe(section_ids)
+        try:
+            yield 'retry: 3000\n\n'
+            initial = await sync_to_async(seat_counts)(section_ids)
+            yield _sse('seats', list(initial.values()))
+            while True:
+                try:
+                    batch = await asyncio.wait_for(subscription.next_batch(), KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ': keepalive\n\n'
+                    continue
+                yield _sse('seats', list(batch.values()))
+        finally:
+            broker.unsubscribe(subscription)
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # ไม่ให้ nginx พักข้อมูลไว้ใน buffer
+    return response
+
+
+def _page_url(request, cursor):
+    if cursor is None:
+        return None
+    params = request.GET.copy()
+    params['cursor'] = cursor
+    return request.build_absolute_uri(f'{request.path}?{params.urlencode()}')
+
+
+@require_GET
+def sections(request):
+    """
+    กลุ่มเรียนทีละหน้า (?cursor= ?size=) กรองด้วย ?semester= ?department= ?day=
+    และเลือกฟิลด์ด้วย ?fields=id,course,schedule (ค่าเริ่มต้นคือทุกฟิลด์)
+    """
+    form = SectionApiQueryForm(request.GET)
+    if not form.is_valid():
+        return JsonResponse({'errors': form.errors}, status=400)
+    semester_id = form.cleaned_data['semester'] or _semester_id(None)
+    fields = form.cleaned_data['fields']
+    rows = section_rows(
+        fields, semester_id, department_id=form.cleaned_data['department'], day=form.cleaned_data['day'],
+    )
+    page = paginate_keyset(request, rows, ORDERING)
+    return JsonResponse({
+        'semester': semester_id,
+        'results': serialize_rows(page.object_list, fields),
+        'next': _page_url(request, page.next_cursor),
+        'previous': _page_url(request, page.previous_cursor),
+    }, json_dumps_params={'ensure_ascii': False})
@@ -0,0 +1,12 @@
+from django.urls import path
+from . import api
+
+app_name = 'api'
+urlpatterns = [
+    path('catalog/', api.catalog, name='catalog-current'),
+    path('catalog/seats/', api.catalog_seats, name='catalog-current-seats'),
+    path('catalog/<int:semester_pk>/', api.catalog, name='catalog'),
+    path('catalog/<int:semester_pk>/seats/', api.catalog_seats, name='catalog-seats'),
+    path('sections/', api.sections, name='sections'),
+    path('seats/stream/', api.seat_stream, name='seat-stream'),
+]
@@ -0,0 +1,91 @@
+"""
+ค้นหาตัวเลือกแบบ autocomplete สำหรับ select2 (อาจารย์ผู้สอน ห้องเรียน)
+
+ฟอร์มกลุ่มเรียน render เฉพาะค่าที่เลือกไว้ (ดู forms.AutocompleteSelectMultiple)
+ตัวเลือกอื่นโหลดผ่าน endpoint เหล่านี้ทีละหน้าตามคำค้น ในรูปแบบที่ select2 ใช้ได้ทันที
+{"results": [{"id": ..., "text": ...}], "pagination": {"more": true/false}}
+"""
+from functools import reduce
+from operator import and_, or_
+
+from django.contrib.auth.models import User
+from django.db.models import Q
+
+from .models import Room
+
+PAGE_SIZE = 20
+MAX_TERMS = 5
+
+
+def _terms(query):
+    return (query or '').split()[:MAX_TERMS]
+
+
+def _match_all_terms(terms, lookups):
+    """ทุกคำค้นต้องพบในฟิลด์ใดฟิลด์หนึ่ง เช่น "สมชาย คอม" = ชื่อมี "สมชาย" และภาควิชามี "คอม" """
+    if not terms:
+        return Q()
+    return reduce(and_, (reduce(or_, (Q(**{lookup: term}) for lookup in lookups)) for term in terms))
+
+
+def _page_number(value):
+    try:
+        return max(int(value), 1)
+    except (TypeError, ValueError):
+        return 1
+
+
+def _paginate(rows, page):
+    """ตัดหน้าด้วย LIMIT (ขอเกิน 1 แถวเพื่อรู้ว่ามีหน้าถัดไปหรือไม่ โดยไม่ต้อง COUNT)"""
+    start = (page - 1) * PAGE_SIZE
+    rows = list(rows[start:start + PAGE_SIZE + 1])
+    return rows[:PAGE_SIZE], len(rows) > PAGE_SIZE
+
+
+INSTRUCTOR_LOOKUPS = (
+    'profile__display_name__icontains',
+    'profile__first_name_th__icontains',
+    'profile__last_name_th__icontains',
+    'profile__department__name__icontains',
+    'username__icontains',
+)
+
+
+def instructor_queryset():
+    return User.objects.filter(profile__user_type='INSTRUCTOR')
+
+
+def search_instructors(query='', page=1):
+    """ค้นหาอาจารย์ตามชื่อภาษาไทย ชื่อผู้ใช้ หรือภาควิชา (คิวรีเดียวต่อหน้า)"""
+    rows = instructor_queryset().filter(_match_all_terms(_terms(query), INSTRUCTOR_LOOKUPS)).order_by(
+        'profile__first_name_th', 'profile__last_name_th', 'username'
+    ).values_list('pk', 'username', 'profile__display_name', 'profile__department__name')
+    rows, more = _paginate(rows, _page_number(page))
+    results = []
+    for pk, username, display_name, department in rows:
+        text = display_name or username
+        if department:
+            text = f'{text} ({department})'
+        results.append({'id': pk, 'text': text})
+    return {'results': results, 'pagination': {'more': more}}
+
+
+ROOM_LOOKUPS = ('building__icontains', 'room_number__icontains')
+
+
+def search_rooms(query='', page=1, busy_room_ids=(), busy_label=''):
+    """ค้นหาห้องตามชื่อตึกหรือเลขห้อง ห้องใน busy_room_ids จะมี "busy": true และต่อท้ายชื่อด้วย busy_label"""
+    rows = Room.objects.filter(_match_all_terms(_terms(query), ROOM_LOOKUPS)).order_by(
+        'building', 'room_number'
+    ).values_list('pk', 'building', 'room_number')
+    rows, more = _paginate(rows, _page_number(page))
+    busy_room_ids = set(busy_room_ids)
+    results = []
+    for pk, building, room_number in rows:
+        # ชื่อเดียวกับ Room.__str__ ที่ใช้แสดงค่าที่เลือกไว้ในฟอร์ม
+        result = {'id': pk, 'text': f'{building} - ห้อง {room_number}'}
+        if pk in busy_room_ids:
+            result['text'] = f"{result['text']} ({busy_label})"
+            result['busy'] = True
+        results.append(result)
+    return {'results': results, 'pagination': {'more': more}}
@@ -0,0 +1,140 @@
+"""
+ข้อมูลรายวิชาที่เปิดสอนทั้งภาคเรียน (catalog snapshot) ในรูป JSON สำเร็จรูป
+
+snapshot ถูกสร้างครั้งเดียวต่อ "เวอร์ชันของ catalog" แล้วเก็บไว้ใน Django cache พร้อม ETag (hash ของเนื้อหา)
+- เวอร์ชันคือ token ใน cache ที่ถูกเปลี่ยนทุกครั้งที่ข้อมูลรายวิชา กลุ่มเรียน คาบเรียน ห้อง
+  หรืออาจารย์เปลี่ยน (ดู courses.signals) การลงทะเบียนไม่เปลี่ยนเวอร์ชัน
+- จำนวนที่นั่งที่ลงทะเบียนแล้วเปลี่ยนบ่อย จึงแยกเป็นเอกสาร seats ขนาดเล็กที่ cache ไว้ไม่กี่วินาที
+
+ถ้า CACHES เป็น cache ของแต่ละ process (locmem) การเปลี่ยนเวอร์ชันจะเห็นเฉพาะ process เดียว
+snapshot จึงมีอายุไม่เกิน CATALOG_SNAPSHOT_TTL เพื่อจำกัดความคลาดเคลื่อน ควรใช้ cache กลางใน production
+"""
+import hashlib
+import json
+import threading
+import uuid
+from collections import defaultdict
+
+from django.core.cache import cache
+
+from .models import ClassTime, Section, Semester
+from .timetable import DAY_INDEX
+
+VERSION_KEY = 'catalog:version'
+CATALOG_SNAPSHOT_TTL = 300  # วินาที
+SEATS_TTL = 2  # วินาที
+
+_build_lock = threading.Lock()
+
+
+def get_catalog_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        version = uuid.uuid4().hex
+        if not cache.add(VERSION_KEY, version, None):
+            version = cache.get(VERSION_KEY, version)
+    return version
+
+
+def bump_catalog_version():
+    """ทำให้ snapshot ทุกภาคเรียนหมดอายุ (เรียกเมื่อข้อมูล catalog เปลี่ยน)"""
+    cache.set(VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def _etag(body):
+    return '"%s"' % hashlib.sha256(body).hexdigest()[:32]
+
+
+def _dumps(data):
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode()
+
+
+def build_catalog(semester):
+    """dict ของ catalog ภาคเรียนนี้ (3 คิวรี ไม่ขึ้นกับจำนวนกลุ่มเรียน)"""
+    sections = Section.objects.filter(semester=semester, course__is_active=True).order_by(
+        'course__code', 'section_number'
+    )
+    schedule = defaultdict(list)
+    class_times = ClassTime.objects.filter(section__in=sections.order_by().values('pk')).values_list(
+        'section_id', 'day', 'start_time', 'end_time'
+    )
+    for section_id, day, start_time, end_time in class_times:
+        schedule[section_id].append((DAY_INDEX[day], start_time, end_time, day))
+    instructors = defaultdict(list)
+    teaching = Section.instructors.through.objects.filter(section__in=sections.order_by().values('pk')).order_by(
+        'section_id', 'user__profile__first_name_th', 'user__username'
+    ).values_list('section_id', 'user__username', 'user__profile__display_name')
+    for section_id, username, display_name in teaching:
+        instructors[section_id].append(display_name or username)
+
+    rows = sections.values_list(
+        'pk', 'course__code', 'course__name', 'course__credits', 'section_number', 'capacity',
+        'room__building', 'room__room_number',
+    )
+    return {
+        'semester': {'id': semester.pk, 'year': semester.year, 'semester': semester.semester, 'label': str(semester)},
+        'sections': [
+            {
+                'id': pk,
+                'course': {'code': code, 'name': name, 'credits': credits},
+                'section_number': section_number,
+                'capacity': capacity,
+                'room': f'{building} {room_number}' if building else None,
+                'instructors': instructors.get(pk, []),
+                'schedule': [
+                    {'day': day, 'start': f'{start_time:%H:%M}', 'end': f'{end_time:%H:%M}'}
+                    for _, start_time, end_time, day in sorted(schedule.get(pk, []))
+                ],
+            }
+            for pk, code, name, credits, section_number, capacity, building, room_number in rows
+        ],
+    }
+
+
+def _snapshot_keys(semester_id, version):
+    return f'catalog:etag:{semester_id}:{version}', f'catalog:body:{semester_id}:{version}'
+
+
+def get_catalog_etag(semester_id):
+    """ETag ของ snapshot ปัจจุบัน (ถ้ามีใน cache) โดยไม่แตะฐานข้อมูล ใช้ตอบ 304 ได้ทันที"""
+    etag_key, _ = _snapshot_keys(semester_id, get_catalog_version())
+    return cache.get(etag_key)
+
+
+def get_catalog_snapshot(semester_id):
+    """
+    คืนค่า (etag, body เป็น bytes) ของ catalog ภาคเรียนนี้ สร้างใหม่เมื่อเวอร์ชันเปลี่ยนหรือหมดอายุ
+    จะ raise Semester.DoesNotExist ถ้าไม่พบภาคเรียน
+    """
+    version = get_catalog_version()
+    etag_key, body_key = _snapshot_keys(semester_id, version)
+    cached = cache.get_many([etag_key, body_key])
+    if len(cached) == 2:
+        return cached[etag_key], cached[body_key]
+    # สร้างทีละ request ต่อ process (request ที่รออยู่จะได้ snapshot ที่เพิ่งสร้างจาก cache)
+    with _build_lock:
+        cached = cache.get_many([etag_key, body_key])
+        if len(cached) == 2:
+            return cached[etag_key], cached[body_key]
+        body = _dumps(build_catalog(Semester.objects.get(pk=semester_id)))
+        etag = _etag(body)
+        cache.set_many({etag_key: etag, body_key: body}, CATALOG_SNAPSHOT_TTL)
+    return etag, body
+
+
+def get_seats(semester_id):
+    """
+    เอกสารจำนวนที่นั่ง {"seats": {section_id: [ลงทะเบียนแล้ว, จำนวนที่รับ]}} ของภาคเรียน
+    คืนค่า (etag, body) และ cache ไว้ SEATS_TTL วินาที ให้ client ที่ poll พร้อมกันใช้คิวรีเดียวกัน
+    """
+    key = f'catalog:seats:{semester_id}'
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+    rows = Section.objects.filter(semester_id=semester_id, course__is_active=True).values_list(
+        'pk', 'enrolled_count', 'capacity'
+    )
+    body = _dumps({'semester': semester_id, 'seats': {pk: [enrolled, capacity] for pk, enrolled, capacity in rows}})
+    result = (_etag(body), body)
+    cache.set(key, result, SEATS_TTL)
+    return result
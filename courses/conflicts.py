@@ -0,0 +1,101 @@
+"""
+ตรวจสอบการชนกันของคาบเรียน (ห้องเรียน อาจารย์ผู้สอน และคาบเรียนในกลุ่มเรียนเดียวกัน)
+
+คาบเรียนที่ชนกันทั้งหมดถูกหาในคิวรีเดียว: กรองด้วยภาคเรียน วัน และช่วงเวลาที่ทับกัน
+(ใช้ index ของ ClassTime บน day/start_time/end_time) แล้วเลือกเฉพาะคาบที่ใช้ห้องเดียวกัน
+หรือมีอาจารย์คนเดียวกัน (EXISTS บนตารางอาจารย์ผู้สอน) จึงไม่ต้องวนโหลดข้อมูลทีละคาบ
+"""
+from dataclasses import dataclass
+
+from django.db.models import Exists, OuterRef, Q
+
+from .models import ClassTime, Section
+
+SECTION = 'section'
+ROOM = 'room'
+INSTRUCTOR = 'instructor'
+
+
+@dataclass(frozen=True)
+class Conflict:
+    """คาบเรียน 1 คาบที่ชนกับช่วงเวลาที่ตรวจสอบ และสาเหตุที่ชน"""
+    kind: str
+    class_time: ClassTime
+
+    @property
+    def message(self):
+        section = self.class_time.section
+        if self.kind == SECTION:
+            return (f'คาบเรียนนี้ซ้ำซ้อนกับคาบเรียนที่มีอยู่แล้ว '
+                    f'({self.class_time.get_day_display()} {self.class_time.start_time:%H:%M}-{self.class_time.end_time:%H:%M})')
+        if self.kind == ROOM:
+            return (f'ห้อง {section.room} ถูกใช้งานในช่วงเวลานี้แล้ว '
+                    f'โดยวิชา {section.course.code} กลุ่ม {section.section_number}')
+        return ('มีอาจารย์ในกลุ่มเรียนนี้มีตารางสอนซ้ำซ้อนกับ '
+                f'วิชา {section.course.code} กลุ่ม {section.section_number}')
+
+
+def find_conflicts(section, day, start_time, end_time, exclude_pk=None):
+    """
+    คืนค่ารายการ Conflict ของทุกคาบเรียนที่ชนกับช่วงเวลานี้ในภาคเรียนเดียวกัน
+    เทียบกับห้องของ section และอาจารย์ของ section ที่บันทึกไว้ในฐานข้อมูล
+    """
+    Teaching = Section.instructors.through
+    room_id = section.room_id
+    instructor_ids = Teaching.objects.filter(section_id=section.pk).values('user_id')
+
+    # ช่วงเวลาทับกันเมื่อ start < end อีกฝั่ง ทั้งสองทาง (คาบที่ต่อกันพอดีไม่นับว่าชน)
+    candidates = (
+        ClassTime.objects.filter(
+            section__semester_id=section.semester_id,
+            day=day,
+            start_time__lt=end_time,
+            end_time__gt=start_time,
+        )
+        .annotate(
+            instructor_clash=Exists(
+                Teaching.objects.filter(section_id=OuterRef('section_id'), user_id__in=instructor_ids)
+            )
+        )
+        .select_related('section__course', 'section__room')
+        .order_by('start_time', 'pk')
+    )
+    if exclude_pk is not None:
+        candidates = candidates.exclude(pk=exclude_pk)
+
+    clash = Q(instructor_clash=True)
+    if section.pk is not None:
+        clash |= Q(section_id=section.pk)
+    if room_id is not None:
+        clash |= Q(section__room_id=room_id)
+
+    conflicts = []
+    for class_time in candidates.filter(clash):
+        if class_time.section_id == section.pk:
+            conflicts.append(Conflict(SECTION, class_time))
+            continue
+        if room_id is not None and class_time.section.room_id == room_id:
+            conflicts.append(Conflict(ROOM, class_time))
+        if class_time.instructor_clash:
+            conflicts.append(Conflict(INSTRUCTOR, class_time))
+    return conflicts
+
+
+def find_conflicts_within(slots):
+    """
+    ตรวจการชนกันระหว่างคาบเรียนที่ส่งมาพร้อมกัน (เช่น หลายแถวใน inline formset ที่ยังไม่บันทึก)
+    slots คือรายการ (day, start_time, end_time) คืนค่ารายการคู่ index ที่ชนกัน
+    """
+    by_day = {}
+    for index, (day, start_time, end_time) in enumerate(slots):
+        by_day.setdefault(day, []).append((start_time, end_time, index))
+    clashes = []
+    for intervals in by_day.values():
+        intervals.sort()
+        # เรียงตามเวลาเริ่มแล้วกวาดครั้งเดียว เทียบกับคาบที่ยังไม่จบเท่านั้น
+        active = []
+        for start_time, end_time, index in intervals:
+            active = [item for item in active if item[0] > start_time]
+            clashes.extend((min(other, index), max(other, index)) for _, other in active)
+            active.append((end_time, index))
+    return sorted(clashes)
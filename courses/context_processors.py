@@ -0,0 +1,6 @@
+from .semesters import get_current_semester
+
+
+def current_semester(request):
+    """ส่ง current_semester ให้ทุก template โดยอัตโนมัติ"""
+    return {'current_semester': get_current_semester()}
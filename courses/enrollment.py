@@ -0,0 +1,303 @@
+"""
+บริการลงทะเบียนเรียน (Enrollment service)
+
+รวมขั้นตอนการจองที่นั่งในกลุ่มเรียนไว้ในที่เดียว เพื่อให้การตรวจสอบและการบันทึก
+เกิดขึ้นภายใน transaction เดียวกัน และป้องกันการลงทะเบียนเกินจำนวนที่รับ
+เมื่อมีนิสิตจำนวนมากกดลงทะเบียนพร้อมกัน
+"""
+import random
+import time
+from dataclasses import dataclass
+
+from django.contrib.auth.models import User
+from django.db import IntegrityError, OperationalError, models, transaction
+from django.db.models import Count, Exists, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Section, WaitlistEntry
+from .seat_events import notify_seat_changes
+from .timetable import first_clash, load_slots, mask_from_bytes, slots_overlap
+
+# รหัสข้อผิดพลาดของ PostgreSQL ที่ควรลองใหม่ (serialization_failure, deadlock_detected)
+RETRYABLE_PGCODES = {'40001', '40P01'}
+
+
+class EnrollmentStatus(models.TextChoices):
+    OK = 'OK', 'ลงทะเบียนสำเร็จ'
+    FULL = 'FULL', 'กลุ่มเรียนเต็มแล้ว'
+    DUPLICATE_COURSE = 'DUPLICATE_COURSE', 'ลงทะเบียนรายวิชานี้ในกลุ่มเรียนอื่นไปแล้ว'
+    ALREADY_ENROLLED = 'ALREADY_ENROLLED', 'ลงทะเบียนกลุ่มเรียนนี้ไปแล้ว'
+    TIME_CLASH = 'TIME_CLASH', 'เวลาเรียนชนกับกลุ่มเรียนที่ลงทะเบียนไว้'
+    NOT_FOUND = 'NOT_FOUND', 'ไม่พบกลุ่มเรียน'
+    BUSY = 'BUSY', 'มีผู้ลงทะเบียนพร้อมกันจำนวนมาก กรุณาลองใหม่อีกครั้ง'
+
+
+@dataclass(frozen=True)
+class EnrollmentResult:
+    """ผลลัพธ์ของการลงทะเบียน 1 ครั้ง"""
+    status: EnrollmentStatus
+    section: Section
+    clash_with: Section = None  # กลุ่มเรียนที่เวลาชนกัน (เฉพาะสถานะ TIME_CLASH)
+
+    @property
+    def ok(self):
+        return self.status == EnrollmentStatus.OK
+
+
+@dataclass(frozen=True)
+class CheckoutResult:
+    """
+    ผลลัพธ์ของการลงทะเบียนหลายกลุ่มเรียนพร้อมกัน (ตะกร้า) เรียงตามลำดับที่ส่งมา
+    status เป็น BUSY เมื่อลองใหม่ครบ max_retries แล้วยังชนกับคำขออื่น (ไม่มีรายการใดถูกตรวจ)
+    """
+    items: tuple
+    committed: bool
+    status: EnrollmentStatus = EnrollmentStatus.OK
+
+    @property
+    def enrolled(self):
+        """กลุ่มเรียนที่ลงทะเบียนสำเร็จจริง"""
+        return [item.section for item in self.items if item.ok] if self.committed else []
+
+    @property
+    def failed(self):
+        return [item for item in self.items if not item.ok]
+
+
+class _BatchConflict(Exception):
+    """จำนวนที่นั่งที่จองได้ไม่ตรงกับที่ตรวจไว้ (มี transaction อื่นแทรก) ให้เริ่มใหม่ทั้งชุด"""
+
+
+def _is_retryable(exc):
+    """ตรวจสอบว่าข้อผิดพลาดเกิดจากการแย่งล็อก/serialization ซึ่งลองใหม่ได้"""
+    cause = exc.__cause__
+    if getattr(cause, 'pgcode', None) in RETRYABLE_PGCODES:
+        return True
+    # SQLite แจ้ง "database is locked" / "database table is locked" เมื่อมีผู้เขียนพร้อมกัน
+    return 'locked' in str(exc)
+
+
+def _enrolled_count_subquery():
+    """Subquery นับจำนวนนิสิตจากตารางลงทะเบียนของแต่ละ Section"""
+    counts = (
+        Section.students.through.objects.filter(section_id=OuterRef('pk'))
+        .order_by()
+        .values('section_id')
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    return Coalesce(Subquery(counts), 0)
+
+
+def sync_enrolled_counts(section_ids=None):
+    """
+    คำนวณ enrolled_count ใหม่จากตารางลงทะเบียนด้วย UPDATE เดียว
+
+    ถ้าไม่ระบุ section_ids จะตรวจทุก Section และแก้เฉพาะแถวที่ค่าไม่ตรง
+    คืนค่าจำนวนแถวที่ถูกแก้ไข
+    """
+    queryset = Section.objects.all()
+    if section_ids is not None:
+        section_ids = list(section_ids)
+        queryset = queryset.filter(pk__in=section_ids)
+    fixed = (
+        queryset.annotate(actual_count=_enrolled_count_subquery())
+        .exclude(enrolled_count=F('actual_count'))
+        .update(enrolled_count=_enrolled_count_subquery())
+    )
+    if fixed:
+        notify_seat_changes(section_ids)
+    return fixed
+
+
+def _lock_student(student):
+    """
+    ล็อกแถว User ของนิสิตจนจบ transaction (ก่อนอ่านกลุ่มเรียนที่ลงไว้แล้วเสมอ)
+    คำขอลงทะเบียนพร้อมกันของนิสิตคนเดียวกัน (เช่น สองแท็บ คนละกลุ่มเรียนของรายวิชาเดียวกัน)
+    จึงตรวจรายวิชาซ้ำและเวลาเรียนชนทีละคำขอ ไม่ใช่จากข้อมูลก่อนอีกคำขอ commit
+    """
+    User.objects.select_for_update().filter(pk=student.pk).values_list('pk', flat=True).first()
+
+
+def _claim_seat(student, section_pk, bypass_waitlist=False):
+    """
+    จองที่นั่งภายใน transaction ที่เปิดอยู่ (ต้องเรียกภายใต้ transaction.atomic)
+
+    ถ้ากลุ่มเรียนมีคิวรอที่นั่งอยู่ ถือว่าเต็มสำหรับการลงทะเบียนปกติ เพื่อไม่ให้แซงคิว
+    ยกเว้นการเลื่อนคิวเอง (bypass_waitlist=True จาก courses.waitlist)
+    """
+    Enrollment = Section.students.through
+
+    _lock_student(student)
+    section = Section.objects.select_related('course').get(pk=section_pk)
+
+    # ดึงกลุ่มเรียนที่นิสิตลงไว้แล้ว ทั้งของรายวิชาเดียวกัน และของภาคเรียนเดียวกัน (พร้อม bitmask) ในคิวรีเดียว
+    enrolled = Enrollment.objects.filter(
+        Q(section__course_id=section.course_id) | Q(section__semester_id=section.semester_id),
+        user_id=student.pk,
+    ).values_list('section_id', 'section__course_id', 'section__semester_id', 'section__schedule_mask')
+    enrolled_in_course = set()
+    semester_masks = []
+    for section_id, course_id, semester_id, mask in enrolled:
+        if course_id == section.course_id:
+            enrolled_in_course.add(section_id)
+        if semester_id == section.semester_id:
+            semester_masks.append((section_id, mask_from_bytes(mask)))
+
+    if section.pk in enrolled_in_course:
+        return EnrollmentResult(EnrollmentStatus.ALREADY_ENROLLED, section)
+    if enrolled_in_course:
+        return EnrollmentResult(EnrollmentStatus.DUPLICATE_COURSE, section)
+
+    # ตารางของนิสิต = OR ของทุกกลุ่มเรียนที่ลงไว้ ชนกันเมื่อ AND กับตารางของกลุ่มเรียนนี้ไม่เป็นศูนย์
+    clash_id = first_clash(section.pk, mask_from_bytes(section.schedule_mask), semester_masks)
+    if clash_id is not None:
+        clash_with = Section.objects.select_related('course').get(pk=clash_id)
+        return EnrollmentResult(EnrollmentStatus.TIME_CLASH, section, clash_with)
+
+    # จองที่นั่งด้วยการเขียนแบบมีเงื่อนไขครั้งเดียว (compare-and-set บนแถวของ Section)
+    # ฐานข้อมูลจะเรียงลำดับ UPDATE ที่แย่งแถวเดียวกัน จึงไม่มีทางจองเกินจำนวนที่รับ
+    seat = Section.objects.filter(pk=section.pk, enrolled_count__lt=F('capacity'))
+    if not bypass_waitlist:
+        seat = seat.exclude(Exists(WaitlistEntry.objects.filter(section_id=OuterRef('pk'))))
+    claimed = seat.update(enrolled_count=F('enrolled_count') + 1)
+    if not claimed:
+        return EnrollmentResult(EnrollmentStatus.FULL, section)
+
+    # ใช้ bulk_create เพื่อไม่ให้ m2m_changed นับซ้ำกับ enrolled_count ที่เพิ่งจองไว้
+    Enrollment.objects.bulk_create([Enrollment(section_id=section.pk, user_id=student.pk)])
+    section.enrolled_count += 1
+    notify_seat_changes([section.pk])
+    return EnrollmentResult(EnrollmentStatus.OK, section)
+
+
+def enroll_student(student, section_pk, max_retries=5):
+    """
+    ลงทะเบียนนิสิตเข้ากลุ่มเรียนแบบ atomic
+
+    คืนค่า EnrollmentResult ที่บอกสถานะ (สำเร็จ / เต็ม / ซ้ำรายวิชา / ลงทะเบียนแล้ว / เวลาเรียนชน)
+    และจะ raise Section.DoesNotExist ถ้าไม่พบกลุ่มเรียน
+    หากฐานข้อมูลแจ้งว่าเกิดการชนกันของ transaction จะลองใหม่ไม่เกิน max_retries ครั้ง
+    """
+    attempt = 0
+    while True:
+        try:
+            with transaction.atomic():
+                return _claim_seat(student, section_pk)
+        except IntegrityError:
+            # กดลงทะเบียนซ้ำพร้อมกัน: แถวแรกบันทึกไปแล้ว ส่วนการจองที่นั่งของครั้งนี้ถูก rollback
+            section = Section.objects.select_related('course').get(pk=section_pk)
+            return EnrollmentResult(EnrollmentStatus.ALREADY_ENROLLED, section)
+        except OperationalError as exc:
+            if attempt >= max_retries or not _is_retryable(exc):
+                raise
+            attempt += 1
+            # หน่วงเวลาแบบ exponential backoff พร้อม jitter เพื่อไม่ให้ชนกันซ้ำ
+            time.sleep(random.uniform(0, 0.01 * (2 ** attempt)))
+
+
+def _claim_seats(student, section_ids, all_or_nothing):
+    """
+    ตรวจและจองที่นั่งหลายกลุ่มเรียนภายใน transaction ที่เปิดอยู่ ด้วยจำนวนคิวรีคงที่ไม่ขึ้นกับจำนวนรายการ:
+    ล็อกกลุ่มเรียนที่เลือก, ดึงกลุ่มเรียนที่ลงไว้แล้ว, UPDATE จำนวนที่ลงทะเบียนครั้งเดียว และ INSERT ครั้งเดียว
+    """
+    Enrollment = Section.students.through
+
+    _lock_student(student)
+    sections = {
+        section.pk: section
+        for section in Section.objects.select_for_update(of=('self',))
+        .filter(pk__in=section_ids)
+        .select_related('course')
+        .annotate(has_waitlist=Exists(WaitlistEntry.objects.filter(section_id=OuterRef('pk'))))
+    }
+    course_ids = {section.course_id for section in sections.values()}
+    semester_ids = {section.semester_id for section in sections.values()}
+    enrolled = list(
+        Section.objects.filter(
+            Q(course_id__in=course_ids) | Q(semester_id__in=semester_ids),
+            students=student,
+        ).select_related('course')
+    )
+    taken_courses = {section.course_id for section in enrolled}
+    enrolled_ids = {section.pk for section in enrolled}
+    # (กลุ่มเรียน, bitmask) ที่นิสิตจะมีหลังลงทะเบียน รวมรายการในตะกร้าที่ผ่านการตรวจแล้ว
+    schedule = [(section, mask_from_bytes(section.schedule_mask)) for section in enrolled]
+    exact_slots = None  # เวลาเรียนจริง โหลดครั้งเดียวเมื่อพบ bitmask ที่ทับกันครั้งแรก (ดู courses.timetable)
+
+    items = []
+    accepted = []
+    for section_id in section_ids:
+        section = sections.get(section_id)
+        if section is None:
+            items.append(EnrollmentResult(EnrollmentStatus.NOT_FOUND, None))
+            continue
+        if section.pk in enrolled_ids:
+            items.append(EnrollmentResult(EnrollmentStatus.ALREADY_ENROLLED, section))
+            continue
+        if section.course_id in taken_courses:
+            items.append(EnrollmentResult(EnrollmentStatus.DUPLICATE_COURSE, section))
+            continue
+        if section.enrolled_count >= section.capacity or section.has_waitlist:
+            items.append(EnrollmentResult(EnrollmentStatus.FULL, section))
+            continue
+        mask = mask_from_bytes(section.schedule_mask)
+        candidates = [
+            other for other, other_mask in schedule
+            if other.semester_id == section.semester_id and mask & other_mask
+        ]
+        if candidates and exact_slots is None:
+            exact_slots = load_slots({*sections, *enrolled_ids})
+        clash_with = next(
+            (other for other in candidates if slots_overlap(exact_slots[section.pk], exact_slots[other.pk])),
+            None,
+        )
+        if clash_with is not None:
+            items.append(EnrollmentResult(EnrollmentStatus.TIME_CLASH, section, clash_with))
+            continue
+        taken_courses.add(section.course_id)
+        schedule.append((section, mask))
+        accepted.append(section)
+        items.append(EnrollmentResult(EnrollmentStatus.OK, section))
+
+    if not accepted or (all_or_nothing and len(accepted) != len(items)):
+        return CheckoutResult(tuple(items), committed=False)
+
+    claimed = Section.objects.filter(
+        pk__in=[section.pk for section in accepted],
+        enrolled_count__lt=F('capacity'),
+    ).update(enrolled_count=F('enrolled_count') + 1)
+    if claimed != len(accepted):
+        # ฐานข้อมูลที่ไม่มี SELECT ... FOR UPDATE (เช่น SQLite) อาจมีการจองแทรกระหว่างตรวจ
+        raise _BatchConflict
+    Enrollment.objects.bulk_create(
+        [Enrollment(section_id=section.pk, user_id=student.pk) for section in accepted]
+    )
+    for section in accepted:
+        section.enrolled_count += 1
+    notify_seat_changes([section.pk for section in accepted])
+    return CheckoutResult(tuple(items), committed=True)
+
+
+def enroll_many(student, section_ids, all_or_nothing=True, max_retries=5):
+    """
+    ลงทะเบียนหลายกลุ่มเรียนใน transaction เดียว (ใช้กับตะกร้าลงทะเบียน)
+
+    ตรวจการลงซ้ำ ที่นั่ง และเวลาเรียนชน (ทั้งกับที่ลงไว้แล้วและระหว่างรายการในตะกร้าเอง)
+    all_or_nothing=True: ถ้ามีรายการใดไม่ผ่าน จะไม่ลงทะเบียนเลย
+    all_or_nothing=False: ลงทะเบียนเฉพาะรายการที่ผ่าน และรายงานผลของแต่ละรายการ
+    ถ้ายังชนกับคำขออื่นหลังลองใหม่ครบ max_retries ครั้ง จะคืนผลที่มี status เป็น BUSY ให้ผู้ใช้ลองใหม่
+    """
+    section_ids = list(dict.fromkeys(int(pk) for pk in section_ids))
+    attempt = 0
+    while True:
+        try:
+            with transaction.atomic():
+                return _claim_seats(student, section_ids, all_or_nothing)
+        except (_BatchConflict, IntegrityError, OperationalError) as exc:
+            if isinstance(exc, OperationalError) and not _is_retryable(exc):
+                raise
+            if attempt >= max_retries:
+                return CheckoutResult((), committed=False, status=EnrollmentStatus.BUSY)
+            attempt += 1
+            time.sleep(random.uniform(0, 0.01 * (2 ** attempt)))
@@ -0,0 +1,135 @@
+"""
+ส่งออกรายชื่อนิสิตที่ลงทะเบียน (roster) เป็น CSV หรือ XLSX
+
+อ่านจากตารางลงทะเบียน (Section.students.through) ด้วย values_list().iterator() ทีละชุด
+- CSV ส่งด้วย StreamingHttpResponse: เริ่มส่งหัวตารางได้ทันทีและใช้หน่วยความจำคงที่ไม่ว่าจะกี่แถว
+- XLSX ใช้ openpyxl โหมด write_only เขียนลงไฟล์ชั่วคราวแล้วส่งด้วย FileResponse
+  (ไฟล์ zip ต้องเขียนจนจบก่อนจึงจะส่งได้ แต่หน่วยความจำยังคงที่) ต้องติดตั้ง openpyxl
+"""
+import csv
+import tempfile
+from collections import defaultdict
+
+from django.http import FileResponse, StreamingHttpResponse
+
+from .models import ClassTime, Section
+from .timetable import DAY_INDEX
+
+CHUNK_SIZE = 2000
+CSV = 'csv'
+XLSX = 'xlsx'
+FORMATS = (CSV, XLSX)
+HEADER = (
+    'รหัสนิสิต', 'ชื่อ-นามสกุล', 'สาขาวิชา', 'ภาคเรียน', 'รหัสวิชา', 'ชื่อวิชา', 'กลุ่มเรียน', 'ห้องเรียน', 'เวลาเรียน',
+)
+DAY_SHORT = {'MON': 'จ.', 'TUE': 'อ.', 'WED': 'พ.', 'THU': 'พฤ.', 'FRI': 'ศ.', 'SAT': 'ส.', 'SUN': 'อา.'}
+
+
+def xlsx_available():
+    try:
+        import openpyxl  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def enrollments(section=None, course=None, semester=None):
+    """แถวลงทะเบียนตามขอบเขตที่ระบุ (กลุ่มเรียน รายวิชา และ/หรือ ภาคเรียน)"""
+    rows = Section.students.through.objects.all()
+    if section is not None:
+        rows = rows.filter(section_id=section.pk)
+    if course is not None:
+        rows = rows.filter(section__course_id=course.pk)
+    if semester is not None:
+        rows = rows.filter(section__semester_id=semester.pk)
+    return rows
+
+
+def _schedules(enrollment_rows):
+    """{section_id: ข้อความเวลาเรียน} ของกลุ่มเรียนในขอบเขต (คิวรีเดียว ขนาดตามจำนวนกลุ่มเรียน)"""
+    slots = defaultdict(list)
+    class_times = ClassTime.objects.filter(
+        section_id__in=enrollment_rows.order_by().values('section_id')
+    ).values_list('section_id', 'day', 'start_time', 'end_time')
+    for section_id, day, start_time, end_time in class_times.iterator(chunk_size=CHUNK_SIZE):
+        slots[section_id].append((DAY_INDEX[day], start_time, day, end_time))
+    return {
+        section_id: ', '.join(
+            f"{DAY_SHORT[day]} {start_time:%H:%M}-{end_time:%H:%M}" for _, start_time, day, end_time in sorted(items)
+        )
+        for section_id, items in slots.items()
+    }
+
+
+def roster_rows(enrollment_rows):
+    """หัวตารางตามด้วยข้อมูลทีละแถว (generator) เรียงตามรหัสวิชา กลุ่มเรียน และรหัสนิสิต"""
+    yield HEADER
+    schedules = _schedules(enrollment_rows)
+    rows = enrollment_rows.order_by(
+        'section__semester__year', 'section__semester__semester', 'section__course__code',
+        'section__section_number', 'user__profile__student_id', 'user_id',
+    ).values_list(
+        'user__profile__student_id', 'user__username', 'user__profile__display_name',
+        'user__first_name', 'user__last_name', 'user__profile__branch__name',
+        'section__semester__year', 'section__semester__semester',
+        'section__course__code', 'section__course__name', 'section__section_number',
+        'section__room__building', 'section__room__room_number', 'section_id',
+    )
+    for (student_id, username, display_name, first_name, last_name, branch,
+         year, semester, code, course_name, section_number, building, room_number,
+         section_id) in rows.iterator(chunk_size=CHUNK_SIZE):
+        name = display_name or f'{first_name} {last_name}'.strip() or username
+        yield (
+            student_id or username, name, branch or '', f'{year}/{semester}', code, course_name,
+            section_number, f'{building} {room_number}' if building else '', schedules.get(section_id, ''),
+        )
+
+
+class Echo:
+    """file-like ที่คืนค่าที่ถูกเขียนกลับมาทันที ให้ csv.writer สร้างข้อความทีละแถวได้"""
+
+    def write(self, value):
+        return value
+
+
+def csv_response(enrollment_rows, filename):
+    writer = csv.writer(Echo())
+
+    def content():
+        rows = roster_rows(enrollment_rows)
+        # ส่งหัวตาราง (พร้อม BOM ให้ Excel อ่านภาษาไทยได้ถูกต้อง) ทันที แล้วรวมข้อมูลเป็นก้อนละ CHUNK_SIZE แถว
+        yield '﻿' + writer.writerow(next(rows))
+        buffer = []
+        for row in rows:
+            buffer.append(writer.writerow(row))
+            if len(buffer) >= CHUNK_SIZE:
+                yield ''.join(buffer)
+                buffer = []
+        if buffer:
+            yield ''.join(buffer)
+
+    response = StreamingHttpResponse(content(), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
+    return response
+
+
+def xlsx_response(enrollment_rows, filename):
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('รายชื่อ')
+    for row in roster_rows(enrollment_rows):
+        sheet.append(row)
+    output = tempfile.TemporaryFile()
+    workbook.save(output)
+    output.seek(0)
+    return FileResponse(
+        output, as_attachment=True, filename=f'{filename}.xlsx',
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    )
+
+
+def roster_response(enrollment_rows, filename, file_format=CSV):
+    if file_format == XLSX:
+        return xlsx_response(enrollment_rows, filename)
+    return csv_response(enrollment_rows, filename)
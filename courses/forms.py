@@ -1,19 +1,75 @@
 from django import forms
 from django.forms import BaseInlineFormSet, inlineformset_factory
-from django.contrib.auth.models import User
-from .models import Course, Section, ClassTime, Room
+from django.urls import reverse
+from .autocomplete import instructor_queryset
+from .projections import InvalidFields, parse_fields
+from .conflicts import find_conflicts_within
+from .models import Course, Section, ClassTime, Room, Semester
+from .rooms import get_room_index
 
 # Form Field สำหรับเลือกอาจารย์
 class InstructorChoiceField(forms.ModelMultipleChoiceField):
     def label_from_instance(self, obj):
-        if hasattr(obj, 'profile') and obj.profile.first_name_th and obj.profile.last_name_th:
-            # ใช้ get_acdemic_title_display() เพื่อดึงค่าภาษาไทย
-            title = obj.profile.get_acdemic_title_display() or ''
-            first_name = obj.profile.first_name_th
-            last_name = obj.profile.last_name_th
-            return f"{title} {first_name} {last_name}".strip()
+        # queryset ต้อง select_related('profile') เพื่อไม่ให้คิวรี profile ทีละตัวเลือก
+        if hasattr(obj, 'profile') and obj.profile.display_name:
+            return obj.profile.display_name
         return obj.username
 
+# Widget ของ select2 แบบ ajax: render เฉพาะตัวเลือกที่ถูกเลือกไว้ ตัวเลือกอื่นโหลดจาก endpoint ใน courses.autocomplete
+class AutocompleteMixin:
+    def __init__(self, url_name, attrs=None, url_params=None):
+        super().__init__(attrs)
+        self.url_name = url_name
+        self.url_params = url_params or {}
+
+    def get_url(self):
+        url = reverse(self.url_name)
+        if self.url_params:
+            url = f"{url}?{'&'.join(f'{key}={value}' for key, value in self.url_params.items())}"
+        return url
+
+    def build_attrs(self, base_attrs, extra_attrs=None):
+        attrs = super().build_attrs(base_attrs, extra_attrs)
+        attrs['data-autocomplete-url'] = self.get_url()
+        return attrs
+
+    def optgroups(self, name, value, attrs=None):
+        # คิวรีเฉพาะค่าที่เลือก (ค่าที่ไม่ใช่ตัวเลขจากฟอร์มที่ส่งผิดรูปแบบจะถูกข้ามไป)
+        selected = [str(v) for v in value if str(v).isdigit()]
+        options = []
+        if not self.allow_multiple_selected:
+            options.append(self.create_option(name, '', '', not selected, 0))
+        if selected:
+            field = self.choices.field
+            for index, obj in enumerate(self.choices.queryset.filter(pk__in=selected), start=len(options)):
+                options.append(self.create_option(name, obj.pk, field.label_from_instance(obj), True, index))
+        return [(None, options, 0)]
+
+
+class AutocompleteSelect(AutocompleteMixin, forms.Select):
+    pass
+
+
+class AutocompleteSelectMultiple(AutocompleteMixin, forms.SelectMultiple):
+    pass
+
+
+# Widget เลือกห้องที่ทำเครื่องหมายห้องที่ไม่ว่างในเวลาเรียนของกลุ่มเรียน
+# (ห้องที่ค้นผ่าน autocomplete ถูกทำเครื่องหมายโดย endpoint เมื่อส่ง section มาด้วย)
+class RoomAvailabilitySelect(AutocompleteSelect):
+    busy_label = 'ไม่ว่างในเวลาเรียนของกลุ่มนี้'
+
+    def __init__(self, url_name='courses:room-autocomplete', attrs=None, busy_room_ids=(), **kwargs):
+        super().__init__(url_name, attrs, **kwargs)
+        self.busy_room_ids = set(busy_room_ids)
+
+    def create_option(self, name, value, label, selected, index, subindex=None, attrs=None):
+        option = super().create_option(name, value, label, selected, index, subindex, attrs)
+        if getattr(value, 'value', value) in self.busy_room_ids:
+            option['label'] = f"{label} ({self.busy_label})"
+            option['attrs']['data-busy'] = 'true'
+        return option
+
 # Form สำหรับ Course
 class CourseForm(forms.ModelForm):
     class Meta:
@@ -81,8 +137,8 @@ class CourseForm(forms.ModelForm):
 # Form สำหรับ Section
 class SectionForm(forms.ModelForm):
     instructors = InstructorChoiceField(
-        queryset=User.objects.filter(profile__user_type='INSTRUCTOR'),
-        widget=forms.SelectMultiple(attrs={
+        queryset=instructor_queryset().select_related('profile'),
+        widget=AutocompleteSelectMultiple('courses:instructor-autocomplete', attrs={
             'class': 'form-select select2',
             'data-placeholder': 'เลือกอาจารย์ผู้สอน'
         }),
@@ -95,7 +151,7 @@ class SectionForm(forms.ModelForm):
     )
     room = forms.ModelChoiceField(
         queryset=Room.objects.all().order_by('building', 'room_number'),
-        widget=forms.Select(attrs={
+        widget=RoomAvailabilitySelect(attrs={
             'class': 'form-select',
             'data-placeholder': 'เลือกห้องเรียน'
         }),
@@ -144,6 +200,11 @@ class SectionForm(forms.ModelForm):
         for field_name, field in self.fields.items():
             if not isinstance(field.widget, (forms.CheckboxInput, forms.CheckboxSelectMultiple)):
                 field.widget.attrs.update({'class': 'form-control'})
+        # กลุ่มเรียนที่มีคาบเรียนแล้ว: บอกว่าห้องใดไม่ว่างในเวลาเรียนของกลุ่มนี้ (จากดัชนีการใช้ห้อง)
+        if self.instance.pk and self.instance.semester_id:
+            index = get_room_index(self.instance.semester_id)
+            self.fields['room'].widget.busy_room_ids = index.busy_room_ids_for_section(self.instance.pk)
+            self.fields['room'].widget.url_params = {'section': self.instance.pk}
                 
     def clean(self):
         cleaned_data = super().clean()
@@ -201,3 +262,68 @@ class ClassTimeForm(forms.ModelForm):
             'start_time': {'required': 'กรุณาระบุเวลาเริ่มต้น'},
             'end_time': {'required': 'กรุณาระบุเวลาสิ้นสุด'}
         }
+
+
+# Formset ของคาบเรียน: ตรวจการชนกันระหว่างแถวที่ส่งมาพร้อมกัน (แต่ละแถวตรวจกับฐานข้อมูลใน ClassTime.clean)
+class BaseClassTimeFormSet(BaseInlineFormSet):
+    def clean(self):
+        super().clean()
+        forms_with_slot = [
+            form for form in self.forms
+            if form.cleaned_data
+            and not form.cleaned_data.get('DELETE')
+            and all(form.cleaned_data.get(field) for field in ('day', 'start_time', 'end_time'))
+        ]
+        slots = [
+            (form.cleaned_data['day'], form.cleaned_data['start_time'], form.cleaned_data['end_time'])
+            for form in forms_with_slot
+        ]
+        if find_conflicts_within(slots):
+            raise forms.ValidationError('มีคาบเรียนในรายการที่ช่วงเวลาซ้ำซ้อนกันเอง')
+
+
+# ฟอร์มสำหรับค้นหาห้องว่างตามวันและช่วงเวลา (ใช้กับ API ห้องว่าง)
+class FreeRoomQueryForm(forms.Form):
+    semester = forms.ModelChoiceField(queryset=Semester.objects.all(), required=False)
+    day = forms.ChoiceField(choices=ClassTime.DAY_CHOICES)
+    start_time = forms.TimeField()
+    end_time = forms.TimeField()
+    section = forms.IntegerField(required=False)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        start_time = cleaned_data.get('start_time')
+        end_time = cleaned_data.get('end_time')
+        if start_time and end_time and end_time <= start_time:
+            self.add_error('end_time', 'เวลาเลิกเรียนต้องอยู่หลังเวลาเริ่มเรียน')
+        return cleaned_data
+
+
+# ฟอร์มตรวจพารามิเตอร์ของ API กลุ่มเรียน (courses.api.sections)
+class SectionApiQueryForm(forms.Form):
+    semester = forms.IntegerField(required=False, min_value=1)
+    department = forms.IntegerField(required=False, min_value=1)
+    day = forms.ChoiceField(choices=ClassTime.DAY_CHOICES, required=False)
+    fields = forms.CharField(required=False)
+
+    def clean_fields(self):
+        try:
+            return parse_fields(self.cleaned_data['fields'])
+        except InvalidFields as exc:
+            raise forms.ValidationError('ไม่รู้จักฟิลด์: %s' % ', '.join(exc.args[0]))
+
+    def clean_day(self):
+        return self.cleaned_data['day'] or None
+
+
+# ฟอร์มอัปโหลดไฟล์นำเข้ารายวิชา/กลุ่มเรียน/คาบเรียน (courses.importer)
+class CatalogImportForm(forms.Form):
+    file = forms.FileField(label='ไฟล์ CSV หรือ XLSX')
+    update = forms.BooleanField(label='ปรับข้อมูลที่มีอยู่แล้วตามไฟล์', required=False)
+    dry_run = forms.BooleanField(label='ตรวจสอบอย่างเดียว (ไม่บันทึก)', required=False)
+
+    def clean_file(self):
+        upload = self.cleaned_data['file']
+        if not upload.name.lower().endswith(('.csv', '.xlsx')):
+            raise forms.ValidationError('รองรับเฉพาะไฟล์ .csv และ .xlsx')
+        return upload
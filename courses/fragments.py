@@ -0,0 +1,100 @@
+"""
+cache ส่วนของแถวกลุ่มเรียนที่แทบไม่เปลี่ยน (รหัส/ชื่อวิชา กลุ่ม ตารางเรียน ห้อง ผู้สอน) ในหน้าลงทะเบียน
+
+HTML ของแต่ละกลุ่มเรียนเก็บใน Django cache ด้วยคีย์ (section id, Section.render_version)
+render_version ถูกเพิ่มค่าทุกครั้งที่กลุ่มเรียน คาบเรียน ห้อง รายวิชา หรือผู้สอนเปลี่ยน (ดู courses.signals)
+คีย์เก่าจึงไม่ถูกใช้อีกโดยไม่ต้องลบ ส่วนที่นั่งคงเหลือและปุ่มลงทะเบียนยัง render ใหม่ทุก request
+
+กลุ่มเรียนที่ cache hit ไม่ต้อง prefetch คาบเรียนและผู้สอนเลย (prefetch เฉพาะที่ miss)
+"""
+import threading
+import time
+from dataclasses import dataclass
+
+from django.core.cache import cache
+from django.db.models import F, QuerySet, prefetch_related_objects
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from .models import Section, instructors_prefetch
+
+TEMPLATE = 'courses/includes/section_row_cells.html'
+TEMPLATE_VERSION = 2  # เปลี่ยนเมื่อแก้ template เพื่อไม่ใช้ HTML ที่ cache ไว้จาก template เดิม
+SEPARATOR = '<!-- live -->'
+FRAGMENT_TTL = 24 * 60 * 60  # วินาที
+
+
+@dataclass
+class FragmentStats:
+    """สถิติของ cache ใน process นี้"""
+    hits: int = 0
+    misses: int = 0
+    render_seconds: float = 0.0
+
+    def as_dict(self):
+        lookups = self.hits + self.misses
+        average = self.render_seconds / self.misses if self.misses else 0.0
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+            'render_seconds': round(self.render_seconds, 4),
+            'render_avg_seconds': round(average, 6),
+            # เวลาที่ประหยัดได้โดยประมาณ = จำนวน hit x เวลา render เฉลี่ยตอน miss
+            'saved_seconds_estimate': round(self.hits * average, 4),
+        }
+
+
+_stats = FragmentStats()
+_stats_lock = threading.Lock()
+
+
+def fragment_stats():
+    with _stats_lock:
+        return _stats.as_dict()
+
+
+def reset_fragment_stats():
+    global _stats
+    with _stats_lock:
+        _stats = FragmentStats()
+
+
+def fragment_key(section_id, render_version):
+    return f'section-row:{TEMPLATE_VERSION}:{section_id}:{render_version}'
+
+
+def attach_section_cells(sections):
+    """
+    กำหนด section.cached_cells = [HTML ก่อนคอลัมน์ที่นั่ง, HTML หลังคอลัมน์ที่นั่ง] ให้ทุกกลุ่มเรียน
+    sections ต้อง select_related('course', 'room') และมี render_version (คิวรี cache ครั้งเดียว)
+    """
+    sections = list(sections)
+    keys = {fragment_key(section.pk, section.render_version): section for section in sections}
+    cached = cache.get_many(keys)
+    misses = [section for key, section in keys.items() if key not in cached]
+    rendered = {}
+    elapsed = 0.0
+    if misses:
+        started = time.perf_counter()
+        prefetch_related_objects(misses, 'class_times', instructors_prefetch())
+        for section in misses:
+            key = fragment_key(section.pk, section.render_version)
+            rendered[key] = render_to_string(TEMPLATE, {'section': section}).split(SEPARATOR)
+        elapsed = time.perf_counter() - started
+        cache.set_many(rendered, FRAGMENT_TTL)
+    cached.update(rendered)
+    for key, section in keys.items():
+        section.cached_cells = [mark_safe(part) for part in cached[key]]
+    with _stats_lock:
+        _stats.hits += len(sections) - len(misses)
+        _stats.misses += len(misses)
+        _stats.render_seconds += elapsed
+    return sections
+
+
+def bump_render_versions(sections):
+    """เพิ่ม render_version ของกลุ่มเรียน (queryset หรือรายการ id) ด้วย UPDATE เดียว"""
+    if not isinstance(sections, QuerySet):
+        sections = Section.objects.filter(pk__in=list(sections))
+    sections.update(render_version=F('render_version') + 1)
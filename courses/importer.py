@@ -0,0 +1,414 @@
+"""
+นำเข้าข้อมูลรายวิชา กลุ่มเรียน และคาบเรียนจากไฟล์ CSV/XLSX ทีละแถว (streaming)
+
+แต่ละแถวคือคาบเรียน 1 คาบ (ข้อมูลรายวิชาและกลุ่มเรียนซ้ำได้ในหลายแถว) โดยมีคอลัมน์
+    course_code, course_name, credits, department, description,
+    semester (เช่น 2567/1), section_number, capacity, building, room_number,
+    instructors (username คั่นด้วย ;), day (MON หรือ วันจันทร์), start_time, end_time
+
+- ตรวจค่าด้วยฟิลด์ของ CourseForm / SectionForm / ClassTimeForm (กฎเดียวกับหน้าเพิ่มข้อมูล)
+- ภาควิชา ห้อง ภาคเรียน อาจารย์ และข้อมูลที่มีอยู่แล้ว ถูกโหลดเป็น dict ครั้งเดียวก่อนเริ่ม
+- เขียนลงฐานข้อมูลด้วย bulk_create/bulk_update ทีละชุด (chunk) หน่วยความจำจึงไม่โตตามขนาดไฟล์
+- ไม่ตรวจห้อง/อาจารย์ชนกันทีละแถว (courses.conflicts) เพราะต้องคิวรีทุกแถว ควรตรวจหลังนำเข้า
+- ผ่อนปรนกว่า SectionForm: ห้องและอาจารย์ไม่บังคับ (กลุ่มเรียนที่ยังไม่จัดห้อง/ผู้สอนนำเข้าได้)
+  เมื่อ update=True คอลัมน์ capacity/building/room_number ที่เว้นว่างจะคงค่าเดิมของกลุ่มเรียน
+  และอาจารย์ในไฟล์จะถูกเพิ่มเข้าไปโดยไม่ลบอาจารย์เดิม
+"""
+import csv
+import io
+from dataclasses import dataclass, field
+from datetime import datetime, time as time_type
+
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from users.models import Profile
+
+from .catalog import bump_catalog_version
+from .forms import ClassTimeForm, CourseForm, SectionForm
+from .fragments import bump_render_versions
+from .models import ClassTime, Course, Department, Room, Section, Semester, validate_class_period
+from .rooms import reset_room_indexes
+from .search import build_search_text, reset_search_index
+from .timetable import rebuild_schedule_masks
+from .waitlist import schedule_promotion
+
+DEFAULT_CHUNK_SIZE = 2000
+MAX_REPORTED_ERRORS = 1000
+COLUMNS = (
+    'course_code', 'course_name', 'credits', 'department', 'description',
+    'semester', 'section_number', 'capacity', 'building', 'room_number',
+    'instructors', 'day', 'start_time', 'end_time',
+)
+DAY_LOOKUP = {
+    **{code: code for code, _ in ClassTime.DAY_CHOICES},
+    **{label: code for code, label in ClassTime.DAY_CHOICES},
+}
+
+
+class ImportFormatError(Exception):
+    """ไฟล์อ่านไม่ได้ หรือไม่มีคอลัมน์ที่จำเป็น"""
+
+
+def _cell_text(value):
+    """แปลงค่าจากเซลล์ (CSV หรือ XLSX) เป็นข้อความ"""
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if isinstance(value, datetime):
+        return value.strftime('%H:%M')
+    if isinstance(value, time_type):
+        return value.strftime('%H:%M')
+    return str(value).strip()
+
+
+def _check_columns(header):
+    missing = [column for column in ('course_code', 'semester', 'section_number') if column not in header]
+    if missing:
+        raise ImportFormatError(f"ไม่พบคอลัมน์ที่จำเป็น: {', '.join(missing)}")
+
+
+def read_csv(binary_file):
+    """อ่าน CSV (UTF-8 หรือ UTF-8 with BOM) ทีละแถว คืนค่า (เลขบรรทัด, dict)"""
+    text = io.TextIOWrapper(binary_file, encoding='utf-8-sig', newline='')
+    reader = csv.reader(text)
+    header = [column.strip().lower() for column in next(reader, [])]
+    _check_columns(header)
+    for values in reader:
+        if any(values):
+            yield reader.line_num, dict(zip(header, (_cell_text(value) for value in values)))
+
+
+def read_xlsx(binary_file):
+    """อ่าน XLSX แบบ read-only ทีละแถว (ต้องติดตั้ง openpyxl)"""
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ImportFormatError('การนำเข้าไฟล์ XLSX ต้องติดตั้งแพ็กเกจ openpyxl')
+    workbook = load_workbook(binary_file, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [_cell_text(column).lower() for column in next(rows, ())]
+        _check_columns(header)
+        for line, values in enumerate(rows, start=2):
+            if any(value not in (None, '') for value in values):
+                yield line, dict(zip(header, (_cell_text(value) for value in values)))
+    finally:
+        workbook.close()
+
+
+def read_rows(binary_file, filename):
+    if filename.lower().endswith('.xlsx'):
+        return read_xlsx(binary_file)
+    return read_csv(binary_file)
+
+
+@dataclass
+class ImportReport:
+    rows: int = 0
+    courses_created: int = 0
+    courses_updated: int = 0
+    sections_created: int = 0
+    sections_updated: int = 0
+    class_times_created: int = 0
+    error_count: int = 0
+    errors: list = field(default_factory=list)  # [(เลขบรรทัด, ข้อความ)] ไม่เกิน MAX_REPORTED_ERRORS รายการ
+    dry_run: bool = False
+
+    def add_error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+
+
+class _RowError(Exception):
+    pass
+
+
+def _clean(form_class, name, value, label):
+    """
+    ตรวจค่าแบบเดียวกับ ModelForm: ฟิลด์ของฟอร์ม (แปลงชนิด/required/ช่วงค่า)
+    แล้วตาม validator ของฟิลด์ในโมเดล (ที่ ModelForm ตรวจตอน _post_clean) คืนค่าที่แปลงแล้ว
+    """
+    try:
+        cleaned = form_class.base_fields[name].clean(value)
+        form_class._meta.model._meta.get_field(name).run_validators(cleaned)
+        return cleaned
+    except ValidationError as exc:
+        raise _RowError(f"{label}: {' '.join(exc.messages)}")
+
+
+class CatalogImporter:
+    """
+    นำเข้าแถวจาก read_rows() โดยโหลดข้อมูลอ้างอิงไว้ใน dict และเขียนลงฐานข้อมูลทีละ chunk_size แถว
+    update=True จะปรับข้อมูลรายวิชา/กลุ่มเรียนที่มีอยู่แล้วตามไฟล์ (ค่าเริ่มต้นคือเพิ่มเฉพาะข้อมูลใหม่)
+    """
+
+    def __init__(self, chunk_size=DEFAULT_CHUNK_SIZE, update=False, dry_run=False):
+        self.chunk_size = chunk_size
+        self.update = update
+        self.report = ImportReport(dry_run=dry_run)
+
+        # ข้อมูลอ้างอิง (ขนาดตามข้อมูลในระบบ ไม่ใช่ขนาดไฟล์)
+        self.departments = dict(Department.objects.values_list('name', 'pk'))
+        self.rooms = {
+            (building, room_number): pk
+            for pk, building, room_number in Room.objects.values_list('pk', 'building', 'room_number')
+        }
+        self.semesters = {
+            f'{year}/{semester}': pk for pk, year, semester in Semester.objects.values_list('pk', 'year', 'semester')
+        }
+        self.instructors = dict(
+            User.objects.filter(profile__user_type=Profile.UserType.INSTRUCTOR).values_list('username', 'pk')
+        )
+        self.course_ids = dict(Course.objects.values_list('code', 'pk'))
+        self.section_ids = {
+            (code, semester_id, number): pk
+            for pk, code, semester_id, number in Section.objects.values_list(
+                'pk', 'course__code', 'semester_id', 'section_number'
+            )
+        }
+        # ค่าปัจจุบันของข้อมูลที่มีอยู่แล้ว ใช้ปรับเฉพาะแถวที่ค่าเปลี่ยนจริง (bulk_update มีต้นทุนต่อแถวสูง)
+        self.course_values = {}
+        self.section_values = {}
+        if update:
+            self.course_values = {
+                code: (name, credits, description or '', department_id)
+                for code, name, credits, description, department_id in Course.objects.values_list(
+                    'code', 'name', 'credits', 'description', 'department_id'
+                ).iterator(chunk_size=5000)
+            }
+            self.section_values = {
+                (code, semester_id, number): (capacity, room_id, enrolled_count)
+                for code, semester_id, number, capacity, room_id, enrolled_count in Section.objects.values_list(
+                    'course__code', 'semester_id', 'section_number', 'capacity', 'room_id', 'enrolled_count'
+                ).iterator(chunk_size=5000)
+            }
+        self._time_values = {}
+        self._class_time_keys = set()
+        self._loaded_semesters = set()
+        self._seen_courses = set()
+        self._seen_sections = set()
+        self._reset_pending()
+
+    def _reset_pending(self):
+        self._new_courses = {}        # code -> Course
+        self._updated_courses = {}    # code -> Course
+        self._new_sections = {}       # section key -> Section (course_id กำหนดตอน flush)
+        self._updated_sections = {}   # section key -> Section
+        self._new_class_times = []    # [(section key, day, start_time, end_time)]
+        self._instructor_links = []   # [(section key, user_id)]
+        self._pending_rows = 0
+
+    def _load_class_time_keys(self, semester_id):
+        """โหลดคาบเรียนที่มีอยู่แล้วของภาคเรียน (ครั้งเดียวต่อภาคเรียน) เพื่อไม่เพิ่มซ้ำ"""
+        if semester_id in self._loaded_semesters:
+            return
+        self._loaded_semesters.add(semester_id)
+        rows = ClassTime.objects.filter(section__semester_id=semester_id).values_list(
+            'section__course__code', 'section__section_number', 'day', 'start_time', 'end_time'
+        )
+        for code, number, day, start_time, end_time in rows.iterator(chunk_size=5000):
+            self._class_time_keys.add(((code, semester_id, number), day, start_time, end_time))
+
+    # --- ตรวจทีละแถว (ยังไม่แก้สถานะของ importer จนกว่าทั้งแถวจะผ่าน) ---
+    def _course(self, row):
+        """คืนค่า (รหัสวิชา, Course ที่ต้องเพิ่ม/ปรับ หรือ None)"""
+        code = _clean(CourseForm, 'code', row.get('course_code', ''), 'รหัสวิชา')
+        if code in self._seen_courses or (code in self.course_ids and not self.update):
+            return code, None
+
+        name = _clean(CourseForm, 'name', row.get('course_name', ''), 'ชื่อวิชา')
+        credits = _clean(CourseForm, 'credits', row.get('credits') or '3', 'หน่วยกิต')
+        description = _clean(CourseForm, 'description', row.get('description', ''), 'คำอธิบายวิชา')
+        department_name = row.get('department', '')
+        department_id = None
+        if department_name:
+            department_id = self.departments.get(department_name)
+            if department_id is None:
+                raise _RowError(f"ไม่พบภาควิชา '{department_name}'")
+
+        if self.course_values.get(code) == (name, credits, description, department_id):
+            return code, None
+        return code, Course(
+            pk=self.course_ids.get(code), code=code, name=name, credits=credits,
+            description=description, department_id=department_id,
+            search_text=build_search_text(code, name, description),
+        )
+
+    def _section(self, row, code):
+        """คืนค่า (คีย์กลุ่มเรียน, Section ที่ต้องเพิ่ม/ปรับ หรือ None, id ของอาจารย์)"""
+        semester_label = row.get('semester', '')
+        semester_id = self.semesters.get(semester_label)
+        if semester_id is None:
+            raise _RowError(f"ไม่พบภาคเรียน '{semester_label}' (รูปแบบ ปีการศึกษา/ภาคเรียน เช่น 2567/1)")
+        number = _clean(SectionForm, 'section_number', row.get('section_number', ''), 'กลุ่มเรียน')
+        key = (code, semester_id, number)
+        if key in self._seen_sections or (key in self.section_ids and not self.update):
+            return key, None, []
+
+        # กลุ่มเรียนที่มีอยู่แล้ว: คอลัมน์ที่เว้นว่างคงค่าเดิมไว้ (ไม่ลบห้องหรือรีเซ็ตจำนวนที่รับ)
+        current = self.section_values.get(key)
+        if current is not None and not row.get('capacity'):
+            capacity = current[0]
+        else:
+            capacity = _clean(SectionForm, 'capacity', row.get('capacity') or '30', 'จำนวนที่รับ')
+        if current is not None and capacity < current[2]:
+            # ตรงกับ CHECK constraint ของ Section ถ้าไม่ตรวจที่นี่ bulk_update จะล้มทั้ง chunk
+            raise _RowError('จำนวนที่รับต้องไม่น้อยกว่าจำนวนที่ลงทะเบียนแล้ว')
+        room_id = None
+        if row.get('building') or row.get('room_number'):
+            room_id = self.rooms.get((row.get('building', ''), row.get('room_number', '')))
+            if room_id is None:
+                raise _RowError(f"ไม่พบห้อง '{row.get('building', '')} {row.get('room_number', '')}'")
+        elif current is not None:
+            room_id = current[1]
+        instructor_ids = []
+        for username in filter(None, (name.strip() for name in row.get('instructors', '').replace(',', ';').split(';'))):
+            if username not in self.instructors:
+                raise _RowError(f"ไม่พบอาจารย์ '{username}'")
+            instructor_ids.append(self.instructors[username])
+
+        if current is not None and current[:2] == (capacity, room_id):
+            return key, None, instructor_ids
+        section = Section(pk=self.section_ids.get(key), semester_id=semester_id, section_number=number,
+                          capacity=capacity, room_id=room_id)
+        return key, section, instructor_ids
+
+    def _clean_time(self, name, value, label):
+        """เวลาในไฟล์ซ้ำกันมาก จึงจำผลการแปลงไว้ (การ parse ด้วย TimeField ใช้เวลาหลายรูปแบบ)"""
+        cleaned = self._time_values.get(value)
+        if cleaned is None:
+            cleaned = self._time_values[value] = _clean(ClassTimeForm, name, value, label)
+        return cleaned
+
+    def _class_time(self, row, key):
+        """คืนค่าคีย์ของคาบเรียน หรือ None ถ้าแถวนี้ไม่มีข้อมูลคาบเรียน"""
+        if not (row.get('day') or row.get('start_time') or row.get('end_time')):
+            return None
+        day = _clean(ClassTimeForm, 'day', DAY_LOOKUP.get(row.get('day', ''), row.get('day', '')), 'วัน')
+        start_time = self._clean_time('start_time', row.get('start_time', ''), 'เวลาเริ่มเรียน')
+        end_time = self._clean_time('end_time', row.get('end_time', ''), 'เวลาเลิกเรียน')
+        try:
+            validate_class_period(start_time, end_time)
+        except ValidationError as exc:
+            raise _RowError(' '.join(exc.messages))
+        return key, day, start_time, end_time
+
+    def add_row(self, line, row):
+        self.report.rows += 1
+        try:
+            code, course = self._course(row)
+            key, section, instructor_ids = self._section(row, code)
+            class_time_key = self._class_time(row, key)
+        except _RowError as exc:
+            self.report.add_error(line, str(exc))
+            return
+
+        if course is not None:
+            (self._updated_courses if course.pk else self._new_courses)[code] = course
+        self._seen_courses.add(code)
+        if section is not None:
+            if section.pk:
+                section.course_id = self.course_ids[code]
+                self._updated_sections[key] = section
+            else:
+                self._new_sections[key] = section
+        self._instructor_links.extend((key, user_id) for user_id in instructor_ids)
+        self._seen_sections.add(key)
+        if class_time_key is not None:
+            self._load_class_time_keys(key[1])
+            if class_time_key not in self._class_time_keys:
+                self._class_time_keys.add(class_time_key)
+                self._new_class_times.append(class_time_key)
+
+        self._pending_rows += 1
+        if self._pending_rows >= self.chunk_size:
+            self.flush()
+
+    # --- เขียนลงฐานข้อมูล ---
+    def flush(self):
+        """เขียนข้อมูลที่ค้างอยู่ทั้งหมดด้วย bulk_create/bulk_update ใน transaction เดียว"""
+        batch = self.chunk_size
+        with transaction.atomic():
+            new_courses = list(self._new_courses.values())
+            Course.objects.bulk_create(new_courses, batch_size=batch)
+            self.course_ids.update((course.code, course.pk) for course in new_courses)
+            if self._updated_courses:
+                Course.objects.bulk_update(
+                    list(self._updated_courses.values()),
+                    ['name', 'credits', 'description', 'department', 'search_text'], batch_size=batch,
+                )
+
+            for (code, _, _), section in self._new_sections.items():
+                section.course_id = self.course_ids[code]
+            Section.objects.bulk_create(list(self._new_sections.values()), batch_size=batch)
+            self.section_ids.update((key, section.pk) for key, section in self._new_sections.items())
+            if self._updated_sections:
+                Section.objects.bulk_update(
+                    list(self._updated_sections.values()), ['capacity', 'room'], batch_size=batch,
+                )
+
+            ClassTime.objects.bulk_create(
+                [ClassTime(section_id=self.section_ids[key], day=day, start_time=start_time, end_time=end_time)
+                 for key, day, start_time, end_time in self._new_class_times],
+                batch_size=batch,
+            )
+            Teaching = Section.instructors.through
+            Teaching.objects.bulk_create(
+                [Teaching(section_id=self.section_ids[key], user_id=user_id) for key, user_id in self._instructor_links],
+                batch_size=batch, ignore_conflicts=True,
+            )
+            # bulk_create ไม่ส่ง signal ของ ClassTime จึงต้องคำนวณตารางเรียน (bitmask) ของกลุ่มเรียนที่เปลี่ยนเอง
+            rebuild_schedule_masks({self.section_ids[key] for key, *_ in self._new_class_times})
+            # และทำให้ HTML ของกลุ่มเรียนที่ข้อมูลแสดงผลเปลี่ยนที่ cache ไว้ใช้ไม่ได้ (courses.fragments)
+            changed_keys = (
+                set(self._updated_sections)
+                | {key for key, *_ in self._new_class_times}
+                | {key for key, _ in self._instructor_links}
+            ) - set(self._new_sections)
+            bump_render_versions(self.section_ids[key] for key in changed_keys)
+            # bulk_update ไม่ส่ง post_save: จำนวนที่รับที่เพิ่มขึ้นต้องเลื่อนคิวรอที่นั่งเอง
+            schedule_promotion(section.pk for section in self._updated_sections.values())
+            if self._updated_courses:
+                bump_render_versions(Section.objects.filter(
+                    course_id__in=[course.pk for course in self._updated_courses.values()]
+                ))
+
+        self.report.courses_created += len(new_courses)
+        self.report.courses_updated += len(self._updated_courses)
+        self.report.sections_created += len(self._new_sections)
+        self.report.sections_updated += len(self._updated_sections)
+        self.report.class_times_created += len(self._new_class_times)
+        self._reset_pending()
+
+    def _add_rows(self, rows):
+        for line, row in rows:
+            self.add_row(line, row)
+        self.flush()
+
+    def run(self, rows):
+        """
+        นำเข้าทุกแถวจาก iterator แล้วคืนค่า ImportReport
+        แต่ละ chunk commit แยกกัน (flush) ไฟล์ใหญ่จึงไม่ถือ lock ไว้ตลอดการนำเข้า
+        ส่วน dry_run ครอบทั้งไฟล์ด้วย transaction เดียวแล้ว rollback ในตอนท้าย
+        """
+        if self.report.dry_run:
+            with transaction.atomic():
+                self._add_rows(rows)
+                transaction.set_rollback(True)
+        else:
+            self._add_rows(rows)
+        # index ในหน่วยความจำไม่ได้รับ signal จาก bulk_create ให้สร้างใหม่เมื่อใช้งานครั้งถัดไป
+        reset_search_index()
+        reset_room_indexes()
+        if not self.report.dry_run:
+            bump_catalog_version()
+        return self.report
+
+
+def import_catalog(binary_file, filename, **options):
+    """นำเข้าไฟล์ที่เปิดแบบ binary (ชื่อไฟล์ใช้แยก CSV/XLSX) คืนค่า ImportReport"""
+    return CatalogImporter(**options).run(read_rows(binary_file, filename))
@@ -0,0 +1,43 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from courses.importer import DEFAULT_CHUNK_SIZE, ImportFormatError, import_catalog
+
+
+class Command(BaseCommand):
+    help = 'นำเข้ารายวิชา กลุ่มเรียน และคาบเรียนจากไฟล์ CSV หรือ XLSX (หนึ่งแถวต่อหนึ่งคาบเรียน)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='ไฟล์ .csv หรือ .xlsx')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                            help='จำนวนแถวที่บันทึกลงฐานข้อมูลต่อครั้ง')
+        parser.add_argument('--update', action='store_true',
+                            help='ปรับข้อมูลรายวิชา/กลุ่มเรียนที่มีอยู่แล้วตามไฟล์')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='ตรวจสอบและจำลองการนำเข้าโดยไม่บันทึกจริง')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.exists(path):
+            raise CommandError(f'ไม่พบไฟล์ {path}')
+        try:
+            with open(path, 'rb') as binary_file:
+                report = import_catalog(
+                    binary_file, path,
+                    chunk_size=options['chunk_size'], update=options['update'], dry_run=options['dry_run'],
+                )
+        except ImportFormatError as exc:
+            raise CommandError(str(exc))
+
+        for line, message in report.errors:
+            self.stderr.write(f'บรรทัด {line}: {message}')
+        if report.error_count > len(report.errors):
+            self.stderr.write(f'... และข้อผิดพลาดอื่นอีก {report.error_count - len(report.errors)} รายการ')
+        prefix = '(ทดลอง ไม่ได้บันทึก) ' if report.dry_run else ''
+        self.stdout.write(self.style.SUCCESS(
+            f'{prefix}อ่าน {report.rows} แถว: เพิ่มรายวิชา {report.courses_created} '
+            f'(ปรับ {report.courses_updated}), กลุ่มเรียน {report.sections_created} '
+            f'(ปรับ {report.sections_updated}), คาบเรียน {report.class_times_created}, '
+            f'ข้อผิดพลาด {report.error_count} แถว'
+        ))
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from courses.waitlist import DEFAULT_BATCH_SIZE, promote_waitlists
+
+
+class Command(BaseCommand):
+    help = 'เลื่อนคิวรอที่นั่งของกลุ่มเรียนที่มีที่นั่งว่าง (ใช้ --interval เพื่อทำงานต่อเนื่องเป็น worker)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                            help='จำนวนคิวสูงสุดที่เลื่อนต่อกลุ่มเรียนต่อรอบ')
+        parser.add_argument('--interval', type=float, default=0,
+                            help='ทำงานซ้ำทุก ๆ กี่วินาที (0 = ทำรอบเดียวแล้วจบ)')
+
+    def handle(self, *args, **options):
+        while True:
+            summary = promote_waitlists(batch_size=options['batch_size'])
+            if summary.promoted or summary.removed or not options['interval']:
+                self.stdout.write(self.style.SUCCESS(
+                    f'เลื่อนคิวเข้าเรียน {summary.promoted} คน, นำออกจากคิว {summary.removed} คน'
+                ))
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from courses.enrollment import sync_enrolled_counts
+
+
+class Command(BaseCommand):
+    help = 'คำนวณจำนวนนิสิตที่ลงทะเบียน (enrolled_count) ของทุกกลุ่มเรียนใหม่จากตารางลงทะเบียน'
+
+    def handle(self, *args, **options):
+        fixed = sync_enrolled_counts()
+        if fixed:
+            self.stdout.write(self.style.WARNING(f'แก้ไขจำนวนที่ลงทะเบียนที่ไม่ตรงกัน {fixed} กลุ่มเรียน'))
+        else:
+            self.stdout.write(self.style.SUCCESS('จำนวนที่ลงทะเบียนของทุกกลุ่มเรียนถูกต้องแล้ว'))
@@ -0,0 +1,69 @@
+# Generated by Django 5.2.4 on 2026-10-17 02:29
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_enrolled_count(apps, schema_editor):
+    Section = apps.get_model('courses', 'Section')
+    Enrollment = Section.students.through
+    counts = (
+        Enrollment.objects.filter(section_id=OuterRef('pk'))
+        .order_by()
+        .values('section_id')
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    Section.objects.update(enrolled_count=Coalesce(Subquery(counts), 0))
+
+
+def check_overbooked_sections(apps, schema_editor):
+    """
+    กลุ่มเรียนที่รับนิสิตเกินจำนวนที่รับไว้แล้ว (ข้อมูลก่อนมี enrollment service) จะทำให้เพิ่ม CHECK constraint ไม่ได้
+    จำนวนที่รับเป็นข้อมูลที่ฝ่ายทะเบียนกำหนด migration จึงไม่แก้เอง แต่หยุดพร้อมรายการให้ผู้ดูแลแก้ก่อน migrate ใหม่
+    """
+    Section = apps.get_model('courses', 'Section')
+    overbooked = (
+        Section.objects.annotate(total=Count('students'))
+        .filter(total__gt=F('capacity'))
+        .order_by('pk')
+        .values_list('pk', 'course__code', 'section_number', 'capacity', 'total')
+    )
+    lines = [
+        f'  Section {pk} ({code} กลุ่ม {number}): จำนวนที่รับ {capacity} ลงทะเบียนแล้ว {total}'
+        for pk, code, number, capacity, total in overbooked
+    ]
+    if lines:
+        raise RuntimeError(
+            'มีกลุ่มเรียนที่ลงทะเบียนเกินจำนวนที่รับ ให้เพิ่มจำนวนที่รับหรือถอนนิสิตออกก่อน แล้วจึง migrate ใหม่:\n'
+            + '\n'.join(lines)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0006_alter_classtime_section'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='section',
+            name='enrolled_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='จำนวนที่ลงทะเบียนแล้ว'),
+        ),
+        migrations.RunPython(check_overbooked_sections, migrations.RunPython.noop),
+        migrations.RunPython(populate_enrolled_count, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='classtime',
+            name='day',
+            field=models.CharField(choices=[('MON', 'วันจันทร์'), ('TUE', 'วันอังคาร'), ('WED', 'วันพุธ'), ('THU', 'วันพฤหัสบดี'), ('FRI', 'วันศุกร์'), ('SAT', 'วันเสาร์'), ('SUN', 'วันอาทิตย์')], max_length=3, verbose_name='วัน'),
+        ),
+        migrations.AddConstraint(
+            model_name='section',
+            constraint=models.CheckConstraint(condition=models.Q(('enrolled_count__lte', models.F('capacity'))), name='section_enrolled_count_within_capacity'),
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.2.4 on 2026-10-17 02:37
+
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+# สำเนาของ courses.search.normalize_search_text ณ ตอนสร้าง migration นี้
+# (migration ต้องให้ผลเหมือนเดิมเสมอ แม้โค้ดค้นหาในแอปจะเปลี่ยนไปภายหลัง)
+THAI_TONE_MARKS = re.compile('[\u0E47-\u0E4B]')
+ZERO_WIDTH = re.compile('[\u200B-\u200D\u2060\uFEFF]')
+WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_search_text(text):
+    if not text:
+        return ''
+    text = unicodedata.normalize('NFKC', text).casefold()
+    text = ZERO_WIDTH.sub('', text)
+    text = THAI_TONE_MARKS.sub('', text)
+    text = text.replace('\u0E4D\u0E32', '\u0E33')
+    return WHITESPACE.sub(' ', text).strip()
+
+
+def build_search_text(code, name, description):
+    return normalize_search_text(' '.join(part for part in (code, name, description) if part))
+
+
+def populate_search_text(apps, schema_editor):
+    Course = apps.get_model('courses', 'Course')
+    courses = list(Course.objects.only('pk', 'code', 'name', 'description'))
+    for course in courses:
+        course.search_text = build_search_text(course.code, course.name, course.description)
+    Course.objects.bulk_update(courses, ['search_text'], batch_size=1000)
+
+
+def create_trigram_index(apps, schema_editor):
+    # index แบบ GIN (pg_trgm) ใช้ได้เฉพาะ PostgreSQL ฐานข้อมูลอื่นจะใช้ index ในหน่วยความจำแทน
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS courses_course_search_text_trgm '
+        'ON courses_course USING gin (search_text gin_trgm_ops)'
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS courses_course_search_text_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0007_section_enrolled_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='search_text',
+            field=models.TextField(blank=True, default='', editable=False, verbose_name='ข้อความสำหรับค้นหา'),
+        ),
+        migrations.RunPython(populate_search_text, migrations.RunPython.noop),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
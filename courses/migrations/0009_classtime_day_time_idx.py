@@ -0,0 +1,17 @@
+# Generated by Django 5.2.4 on 2026-10-17 02:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0008_course_search_text'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='classtime',
+            index=models.Index(fields=['day', 'start_time', 'end_time'], name='classtime_day_time_idx'),
+        ),
+    ]
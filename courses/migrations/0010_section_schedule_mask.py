@@ -0,0 +1,61 @@
+# Generated by Django 5.2.4 on 2026-10-17 02:42
+
+from django.db import migrations, models
+
+# สำเนาของรูปแบบ bitmask ใน courses.timetable ณ ตอนสร้าง migration นี้
+# (migration ต้องให้ผลเหมือนเดิมเสมอ แม้รูปแบบ bitmask หรือโมเดลในแอปจะเปลี่ยนไปภายหลัง)
+SLOT_MINUTES = 15
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+DAY_INDEX = {day: index for index, day in enumerate(['MON', 'TUE', 'WED', 'THU', 'FRI', 'SAT', 'SUN'])}
+MASK_BYTES = (SLOTS_PER_DAY * len(DAY_INDEX) + 7) // 8
+
+
+def slot_mask(day, start_time, end_time):
+    start = (start_time.hour * 60 + start_time.minute) // SLOT_MINUTES
+    end = max(start, -(-(end_time.hour * 60 + end_time.minute) // SLOT_MINUTES))
+    if end <= start:
+        return 0
+    offset = DAY_INDEX[day] * SLOTS_PER_DAY
+    return ((1 << (end - start)) - 1) << (offset + start)
+
+
+def build_mask(slots):
+    mask = 0
+    for day, start_time, end_time in slots:
+        mask |= slot_mask(day, start_time, end_time)
+    return mask
+
+
+def mask_to_bytes(mask):
+    return mask.to_bytes(MASK_BYTES, 'big') if mask else b''
+
+
+def populate_schedule_mask(apps, schema_editor):
+    Section = apps.get_model('courses', 'Section')
+    ClassTime = apps.get_model('courses', 'ClassTime')
+    slots = {}
+    for section_id, day, start_time, end_time in ClassTime.objects.values_list(
+        'section_id', 'day', 'start_time', 'end_time'
+    ).iterator():
+        slots.setdefault(section_id, []).append((day, start_time, end_time))
+    Section.objects.bulk_update(
+        [Section(pk=pk, schedule_mask=mask_to_bytes(build_mask(items))) for pk, items in slots.items()],
+        ['schedule_mask'],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0009_classtime_day_time_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='section',
+            name='schedule_mask',
+            field=models.BinaryField(default=b'', verbose_name='ตารางเรียนรายสัปดาห์ (bitmask)'),
+        ),
+        migrations.RunPython(populate_schedule_mask, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.4 on 2026-10-17 02:46
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0010_section_schedule_mask'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WaitlistEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='เวลาที่เข้าคิว')),
+                ('section', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='waitlist_entries', to='courses.section', verbose_name='กลุ่มเรียน')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='waitlist_entries', to=settings.AUTH_USER_MODEL, verbose_name='นิสิต')),
+            ],
+            options={
+                'verbose_name': 'คิวรอที่นั่ง',
+                'verbose_name_plural': 'คิวรอที่นั่ง',
+                'indexes': [models.Index(fields=['section', 'id'], name='waitlist_section_order_idx')],
+                'constraints': [models.UniqueConstraint(fields=('section', 'student'), name='waitlist_unique_section_student')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-17 03:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0011_waitlistentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='section',
+            name='render_version',
+            field=models.PositiveIntegerField(default=1, editable=False, verbose_name='เวอร์ชันของข้อมูลที่แสดงผล'),
+        ),
+    ]
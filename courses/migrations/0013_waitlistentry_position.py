@@ -0,0 +1,33 @@
+# Generated by Django 5.2.4 on 2026-10-17 09:20
+
+from django.db import migrations, models
+
+
+def number_waitlist_entries(apps, schema_editor):
+    """กำหนดลำดับในคิวของคิวที่มีอยู่แล้วตามลำดับ id ของแต่ละกลุ่มเรียน"""
+    WaitlistEntry = apps.get_model('courses', 'WaitlistEntry')
+    entries = []
+    section_id, position = None, 0
+    for entry in WaitlistEntry.objects.order_by('section_id', 'pk').only('pk', 'section_id'):
+        if entry.section_id != section_id:
+            section_id, position = entry.section_id, 0
+        position += 1
+        entry.position = position
+        entries.append(entry)
+    WaitlistEntry.objects.bulk_update(entries, ['position'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0012_section_render_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='waitlistentry',
+            name='position',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='ลำดับในคิว'),
+        ),
+        migrations.RunPython(number_waitlist_entries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.4 on 2026-10-17 05:03
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0013_waitlistentry_position'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='waitlistentry',
+            name='position',
+        ),
+    ]
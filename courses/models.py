@@ -3,7 +3,7 @@ from django.contrib.auth.models import User
 from django.forms import ValidationError
 from users.models import Profile
 from django.core.validators import MinValueValidator, MaxValueValidator, RegexValidator
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 
 class Faculty(models.Model):
     thai_validator = RegexValidator(
@@ -237,6 +237,22 @@ class Course(models.Model):
         ]
     )
 
+    search_text = models.TextField(
+        blank=True,
+        default='',
+        editable=False,
+        verbose_name="ข้อความสำหรับค้นหา"
+    )
+
+    def save(self, *args, **kwargs):
+        from .search import build_search_text
+        # เก็บข้อความค้นหาที่ normalize แล้ว (รหัส ชื่อ คำอธิบาย) ไว้ใช้กับ index
+        self.search_text = build_search_text(self.code, self.name, self.description)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'search_text' not in update_fields:
+            kwargs['update_fields'] = [*update_fields, 'search_text']
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.code} - {self.name}"
 
@@ -291,6 +307,21 @@ class Section(models.Model):
         blank=True,
         verbose_name="นิสิตที่ลงทะเบียน"
     )
+    enrolled_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="จำนวนที่ลงทะเบียนแล้ว"
+    )
+    schedule_mask = models.BinaryField(
+        default=b'',
+        editable=False,
+        verbose_name="ตารางเรียนรายสัปดาห์ (bitmask)"
+    )
+    render_version = models.PositiveIntegerField(
+        default=1,
+        editable=False,
+        verbose_name="เวอร์ชันของข้อมูลที่แสดงผล"
+    )
     
     def clean(self):
         super().clean()
@@ -300,12 +331,23 @@ class Section(models.Model):
             raise ValidationError({'course': 'กรุณาเลือกรายวิชา'})
             
         # ตรวจสอบว่าจำนวนนิสิตที่ลงทะเบียนต้องไม่เกินความจุ
-        if hasattr(self, 'students'):
-            if self.get_enrolled_count() > self.capacity:
-                raise ValidationError('จำนวนนิสิตที่ลงทะเบียนเกินความจุของกลุ่มเรียน')
-    
+        if self.capacity is not None and self.get_enrolled_count() > self.capacity:
+            raise ValidationError('จำนวนนิสิตที่ลงทะเบียนเกินความจุของกลุ่มเรียน')
+
+    def save(self, *args, **kwargs):
+        # enrolled_count ถูกดูแลโดย enrollment service และ signal เท่านั้น
+        # schedule_mask ถูกคำนวณใหม่จาก ClassTime ทุกครั้งที่คาบเรียนเปลี่ยน (courses.timetable)
+        # render_version ถูกเพิ่มค่าโดย signal ทุกครั้งที่ข้อมูลที่แสดงผลเปลี่ยน (courses.fragments)
+        # จึงไม่เขียนค่าที่อาจค้างอยู่ใน instance ทับค่าในฐานข้อมูลเมื่อแก้ไขข้อมูลอื่น
+        if not self._state.adding and not kwargs.get('force_insert') and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in ('enrolled_count', 'schedule_mask', 'render_version')
+            ]
+        super().save(*args, **kwargs)
+
     def get_enrolled_count(self):
-        return self.students.count()
+        return self.enrolled_count
 
     def is_full(self):
         return self.get_enrolled_count() >= self.capacity
@@ -318,9 +360,34 @@ class Section(models.Model):
 
     class Meta:
         unique_together = ('course', 'semester', 'section_number')
+        constraints = [
+            # กันไม่ให้จำนวนที่ลงทะเบียนเกินจำนวนที่รับในระดับฐานข้อมูล
+            models.CheckConstraint(
+                condition=models.Q(enrolled_count__lte=models.F('capacity')),
+                name='section_enrolled_count_within_capacity',
+            ),
+        ]
         
     def __str__(self):
         return f"{self.course.code} - Section {self.section_number}"
+
+
+def instructors_prefetch(lookup='instructors'):
+    """Prefetch อาจารย์ผู้สอนพร้อม profile ในคิวรีเดียว (สำหรับแสดง profile.display_name)"""
+    return models.Prefetch(lookup, queryset=User.objects.select_related('profile'))
+
+
+MAX_CLASS_DURATION = timedelta(hours=2)
+
+
+def validate_class_period(start_time, end_time):
+    """กฎช่วงเวลาของคาบเรียนที่ไม่ต้องคิวรี (ใช้ทั้ง ClassTime.clean และ courses.importer)"""
+    # ตรวจสอบว่า end_time ไม่ได้มาก่อน start_time
+    if end_time <= start_time:
+        raise ValidationError({'end_time': 'เวลาเลิกเรียนต้องอยู่หลังเวลาเริ่มเรียน'})
+    # ตรวจสอบว่าเวลาเรียนไม่เกิน 2 ชั่วโมงต่อคาบ
+    if datetime.combine(date.min, end_time) - datetime.combine(date.min, start_time) > MAX_CLASS_DURATION:
+        raise ValidationError('ระยะเวลาเรียนต้องไม่เกิน 2 ชั่วโมงต่อคาบ')
         
 class ClassTime(models.Model):
     
@@ -346,51 +413,73 @@ class ClassTime(models.Model):
     end_time = models.TimeField(
         verbose_name="เวลาเลิกเรียน"
     )
+
+    class Meta:
+        indexes = [
+            # ใช้หาคาบเรียนที่ทับช่วงเวลากันในวันเดียวกัน (courses.conflicts)
+            models.Index(fields=['day', 'start_time', 'end_time'], name='classtime_day_time_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # กลุ่มเรียนตอนโหลด: ถ้าคาบเรียนถูกย้ายไปกลุ่มเรียนอื่น ต้องคำนวณข้อมูลของกลุ่มเรียนเดิมใหม่ด้วย (courses.signals)
+        instance._loaded_section_id = instance.__dict__.get('section_id')
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # signal post_save ใช้กลุ่มเรียนเดิมไปแล้ว การบันทึกครั้งถัดไปเทียบกับกลุ่มเรียนปัจจุบัน
+        self._loaded_section_id = self.section_id
     
     def clean(self):
         super().clean()
         if self.start_time and self.end_time:
-            # ตรวจสอบว่า end_time ไม่ได้มาก่อน start_time
-            if self.end_time <= self.start_time:
-                raise ValidationError({'end_time': 'เวลาเลิกเรียนต้องอยู่หลังเวลาเริ่มเรียน'})
-            
-            # ตรวจสอบว่าเวลาเรียนไม่เกิน 2 ชั่วโมงต่อคาบ
-            duration = (
-                datetime.combine(date.today(), self.end_time) - 
-                datetime.combine(date.today(), self.start_time)
-            ).seconds / 3600  # แปลงเป็นชั่วโมง
-            
-            if duration > 2:
-                raise ValidationError('ระยะเวลาเรียนต้องไม่เกิน 2 ชั่วโมงต่อคาบ')
-
-            # ตรวจสอบการซ้ำซ้อนของเวลาเรียนในวันเดียวกัน
-            if self.section_id:  # ตรวจสอบเฉพาะเมื่อมี section แล้ว
-                overlapping_times = ClassTime.objects.filter(
-                    section__semester=self.section.semester,
-                    day=self.day
-                ).exclude(id=self.id)  # ไม่นับตัวเอง
-
-                for time in overlapping_times:
-                    if (
-                        (self.start_time <= time.start_time <= self.end_time) or
-                        (self.start_time <= time.end_time <= self.end_time) or
-                        (time.start_time <= self.start_time and time.end_time >= self.end_time)
-                    ):
-                        # ตรวจสอบว่ามีการใช้ห้องซ้ำกันหรือไม่
-                        if self.section.room and self.section.room == time.section.room:
-                            raise ValidationError(
-                                f'ห้อง {self.section.room} ถูกใช้งานในช่วงเวลานี้แล้ว ' +
-                                f'โดยวิชา {time.section.course.code} กลุ่ม {time.section.section_number}'
-                            )
-
-                        # ตรวจสอบว่าอาจารย์สอนซ้ำซ้อนหรือไม่
-                        if any(instructor in time.section.instructors.all() 
-                              for instructor in self.section.instructors.all()):
-                            raise ValidationError(
-                                'มีอาจารย์ในกลุ่มเรียนนี้มีตารางสอนซ้ำซ้อนกับ ' +
-                                f'วิชา {time.section.course.code} กลุ่ม {time.section.section_number}'
-                            )
+            validate_class_period(self.start_time, self.end_time)
+
+            # ตรวจสอบการชนกันของห้องเรียน อาจารย์ และคาบเรียนในกลุ่มเรียนเดียวกัน (คิวรีเดียว)
+            if self.section_id and self.day:  # ตรวจสอบเฉพาะเมื่อมี section แล้ว
+                from .conflicts import find_conflicts
+
+                conflicts = find_conflicts(
+                    self.section, self.day, self.start_time, self.end_time, exclude_pk=self.pk,
+                )
+                if conflicts:
+                    raise ValidationError([conflict.message for conflict in conflicts])
 
     def __str__(self):
         return f"{self.section.course.code} Sec {self.section.section_number} ({self.get_day_display()} {self.start_time})"
-    
\ No newline at end of file
+    
+
+class WaitlistEntry(models.Model):
+    """คิวรอที่นั่งของกลุ่มเรียนที่เต็มแล้ว เรียงแบบมาก่อนได้ก่อนตาม id"""
+    section = models.ForeignKey(
+        Section,
+        on_delete=models.CASCADE,
+        related_name='waitlist_entries',
+        verbose_name="กลุ่มเรียน"
+    )
+    student = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='waitlist_entries',
+        verbose_name="นิสิต"
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="เวลาที่เข้าคิว"
+    )
+
+    class Meta:
+        verbose_name = "คิวรอที่นั่ง"
+        verbose_name_plural = "คิวรอที่นั่ง"
+        constraints = [
+            models.UniqueConstraint(fields=['section', 'student'], name='waitlist_unique_section_student'),
+        ]
+        indexes = [
+            # ลำดับคิวของกลุ่มเรียน: ใช้ทั้งดึงคิวถัดไปและนับลำดับ "คุณอยู่ลำดับที่ n"
+            models.Index(fields=['section', 'id'], name='waitlist_section_order_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.student} รอ {self.section}"
@@ -0,0 +1,120 @@
+"""
+ข้อมูลกลุ่มเรียนสำหรับ API ของระบบอื่นในมหาวิทยาลัย (อ่านอย่างเดียว)
+
+อ่านด้วย values() เฉพาะคอลัมน์ของฟิลด์ที่ขอ (?fields=) ไม่สร้าง model instance ทีละแถว
+ตารางเรียนและอาจารย์ผู้สอนอ่านเพิ่มอีกอย่างละ 1 คิวรีต่อหน้า (เฉพาะเมื่อขอ)
+จำนวนคิวรีต่อหน้าจึงคงที่ไม่เกิน 3 ไม่ว่าหน้าจะมีกี่แถว
+"""
+from collections import defaultdict
+
+from django.db.models import Exists, OuterRef
+
+from .models import ClassTime, Section
+from .timetable import DAY_INDEX
+
+ORDERING = ('course__code', 'section_number')
+
+
+def _room(row):
+    return f"{row['room__building']} {row['room__room_number']}" if row['room__building'] else None
+
+
+# ชื่อฟิลด์ใน response -> (คอลัมน์ที่ต้องอ่านด้วย values(), ฟังก์ชันสร้างค่าจากแถว)
+# schedule และ instructors ไม่มีคอลัมน์ในตาราง Section จึงเติมจากคิวรีแยก (ดู _attach_related)
+FIELDS = {
+    'id': (('id',), lambda row: row['id']),
+    'section_number': (('section_number',), lambda row: row['section_number']),
+    'capacity': (('capacity',), lambda row: row['capacity']),
+    'enrolled': (('enrolled_count',), lambda row: row['enrolled_count']),
+    'course': (
+        ('course__code', 'course__name', 'course__credits', 'course__department__name'),
+        lambda row: {
+            'code': row['course__code'],
+            'name': row['course__name'],
+            'credits': row['course__credits'],
+            'department': row['course__department__name'],
+        },
+    ),
+    'semester': (
+        ('semester_id', 'semester__year', 'semester__semester'),
+        lambda row: {'id': row['semester_id'], 'year': row['semester__year'], 'semester': row['semester__semester']},
+    ),
+    'room': (('room__building', 'room__room_number'), _room),
+    'schedule': ((), None),
+    'instructors': ((), None),
+}
+DEFAULT_FIELDS = tuple(FIELDS)
+
+
+class InvalidFields(ValueError):
+    pass
+
+
+def parse_fields(value):
+    """แปลง "id,course,schedule" เป็น tuple ของฟิลด์ (ว่าง = ทุกฟิลด์) ชื่อที่ไม่รู้จักจะ raise InvalidFields"""
+    if not value:
+        return DEFAULT_FIELDS
+    fields = tuple(dict.fromkeys(name.strip() for name in value.split(',') if name.strip()))
+    unknown = [name for name in fields if name not in FIELDS]
+    if unknown:
+        raise InvalidFields(unknown)
+    return fields or DEFAULT_FIELDS
+
+
+def section_rows(fields, semester_id, department_id=None, day=None):
+    """
+    QuerySet ของ dict (values()) ของกลุ่มเรียนในรายวิชาที่เปิดสอน มีคอลัมน์ของ fields
+    และคีย์ที่ใช้เรียง/แบ่งหน้าเสมอ (ใช้กับ core.pagination.KeysetPaginator ได้ทันที)
+    """
+    columns = ['id', *ORDERING]
+    for name in fields:
+        columns.extend(column for column in FIELDS[name][0] if column not in columns)
+    rows = Section.objects.filter(semester_id=semester_id, course__is_active=True)
+    if department_id is not None:
+        rows = rows.filter(course__department_id=department_id)
+    if day is not None:
+        rows = rows.filter(Exists(ClassTime.objects.filter(section_id=OuterRef('pk'), day=day)))
+    return rows.values(*columns)
+
+
+def _schedules(section_ids):
+    schedule = defaultdict(list)
+    class_times = ClassTime.objects.filter(section_id__in=section_ids).values_list(
+        'section_id', 'day', 'start_time', 'end_time'
+    )
+    for section_id, day, start_time, end_time in class_times:
+        schedule[section_id].append((DAY_INDEX[day], start_time, end_time, day))
+    return {
+        section_id: [
+            {'day': day, 'start': f'{start_time:%H:%M}', 'end': f'{end_time:%H:%M}'}
+            for _, start_time, end_time, day in sorted(items)
+        ]
+        for section_id, items in schedule.items()
+    }
+
+
+def _instructors(section_ids):
+    instructors = defaultdict(list)
+    teaching = Section.instructors.through.objects.filter(section_id__in=section_ids).order_by(
+        'section_id', 'user__profile__first_name_th', 'user__username'
+    ).values_list('section_id', 'user__username', 'user__profile__display_name')
+    for section_id, username, display_name in teaching:
+        instructors[section_id].append(display_name or username)
+    return instructors
+
+
+def serialize_rows(rows, fields):
+    """แปลงแถวจาก section_rows เป็น dict ของ response (คิวรีเพิ่มเฉพาะ schedule / instructors ที่ขอ)"""
+    section_ids = [row['id'] for row in rows]
+    related = {}
+    if 'schedule' in fields:
+        related['schedule'] = _schedules(section_ids)
+    if 'instructors' in fields:
+        related['instructors'] = _instructors(section_ids)
+    return [
+        {
+            name: related[name].get(row['id'], []) if name in related else FIELDS[name][1](row)
+            for name in fields
+        }
+        for row in rows
+    ]
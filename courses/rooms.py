@@ -0,0 +1,240 @@
+"""
+ดัชนีการใช้ห้องเรียนรายภาคเรียน (room occupancy index) สำหรับค้นหาห้องว่าง
+
+เก็บจำนวนคาบเรียนที่ใช้ห้องในแต่ละช่อง 15 นาที แยกตามห้องและวัน (ช่องเดียวกับ courses.timetable)
+สร้างจากฐานข้อมูลครั้งเดียวต่อภาคเรียน แล้วปรับทีละรายการหลัง commit เมื่อ ClassTime หรือห้องของ Section เปลี่ยน
+(ดู courses.signals และ update_room_indexes) การหาห้องว่างจึงเป็นเพียงการตรวจช่องไม่กี่ช่องของแต่ละห้องในหน่วยความจำ
+
+ดัชนีอยู่ในหน่วยความจำของแต่ละ process ทุกการเปลี่ยนแปลงจะเพิ่มเวอร์ชันใน Django cache ที่ใช้ร่วมกัน
+process อื่นเห็นเวอร์ชันไม่ตรงกับดัชนีของตัวเองก็สร้างใหม่ (แบบเดียวกับ courses.semesters)
+ROOM_INDEX_TTL ยังคงไว้สำหรับการแก้ไขที่ไม่ผ่าน signal (เช่น queryset.update) ส่วนการตรวจขั้นสุดท้ายยังอยู่ที่ ClassTime.clean
+"""
+import threading
+import time
+from array import array
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import ClassTime, Room, Section
+from .timetable import SLOTS_PER_DAY, slot_range
+
+ROOM_INDEX_TTL = 300  # วินาที
+VERSION_KEY = 'rooms:index:version'
+
+
+class RoomOccupancyIndex:
+    """จำนวนคาบเรียนที่ใช้แต่ละห้องในแต่ละช่องเวลา ของภาคเรียนหนึ่ง"""
+
+    def __init__(self, semester_id, version=None):
+        self.semester_id = semester_id
+        self.version = version     # เวอร์ชันใน cache ตอนเริ่มสร้าง (ดู get_room_index)
+        self.built_at = time.monotonic()
+        self._lock = threading.Lock()
+        self._counts = {}          # (room_id, day) -> array ของจำนวนคาบในแต่ละช่อง
+        self._class_times = {}     # class_time_id -> (section_id, day, start_slot, end_slot)
+        self._section_rooms = {}   # section_id -> room_id (None ถ้ายังไม่กำหนดห้อง)
+
+    @classmethod
+    def build(cls, semester_id, version=None):
+        index = cls(semester_id, version)
+        index._section_rooms = dict(
+            Section.objects.filter(semester_id=semester_id).values_list('pk', 'room_id')
+        )
+        rows = ClassTime.objects.filter(section__semester_id=semester_id).values_list(
+            'pk', 'section_id', 'day', 'start_time', 'end_time'
+        )
+        for pk, section_id, day, start_time, end_time in rows.iterator(chunk_size=5000):
+            index._add(pk, section_id, day, start_time, end_time)
+        return index
+
+    @property
+    def expired(self):
+        return time.monotonic() - self.built_at > ROOM_INDEX_TTL
+
+    def knows_section(self, section_id):
+        return section_id in self._section_rooms
+
+    def _apply(self, room_id, day, start, end, delta):
+        if room_id is None or start >= end:
+            return
+        counts = self._counts.get((room_id, day))
+        if counts is None:
+            counts = self._counts[(room_id, day)] = array('H', bytes(2 * SLOTS_PER_DAY))
+        for slot in range(start, end):
+            counts[slot] += delta
+
+    def _add(self, pk, section_id, day, start_time, end_time):
+        start, end = slot_range(start_time, end_time)
+        self._class_times[pk] = (section_id, day, start, end)
+        self._apply(self._section_rooms.get(section_id), day, start, end, 1)
+
+    def _remove(self, pk):
+        entry = self._class_times.pop(pk, None)
+        if entry is not None:
+            section_id, day, start, end = entry
+            self._apply(self._section_rooms.get(section_id), day, start, end, -1)
+
+    def put_class_time(self, class_time):
+        """เพิ่มหรือแก้ไขคาบเรียน 1 คาบ (ลบช่วงเวลาเดิมที่เคยบันทึกไว้ก่อน)"""
+        with self._lock:
+            self._remove(class_time.pk)
+            self._add(class_time.pk, class_time.section_id, class_time.day,
+                      class_time.start_time, class_time.end_time)
+
+    def remove_class_time(self, pk):
+        with self._lock:
+            self._remove(pk)
+
+    def set_section_room(self, section_id, room_id):
+        """ย้ายคาบเรียนทั้งหมดของกลุ่มเรียนไปยังห้องใหม่"""
+        with self._lock:
+            old_room_id = self._section_rooms.get(section_id)
+            self._section_rooms[section_id] = room_id
+            if old_room_id == room_id:
+                return
+            for entry_section_id, day, start, end in self._class_times.values():
+                if entry_section_id == section_id:
+                    self._apply(old_room_id, day, start, end, -1)
+                    self._apply(room_id, day, start, end, 1)
+
+    def remove_section(self, section_id):
+        """ลบกลุ่มเรียนออกจากดัชนี (เช่น ถูกลบ หรือย้ายไปภาคเรียนอื่น)"""
+        with self._lock:
+            for pk in [pk for pk, entry in self._class_times.items() if entry[0] == section_id]:
+                self._remove(pk)
+            self._section_rooms.pop(section_id, None)
+
+    def add_section(self, section_id, room_id):
+        """เพิ่มกลุ่มเรียนพร้อมคาบเรียนที่มีอยู่แล้ว (เช่น ย้ายมาจากภาคเรียนอื่น)"""
+        with self._lock:
+            self._section_rooms[section_id] = room_id
+            rows = ClassTime.objects.filter(section_id=section_id).values_list(
+                'pk', 'day', 'start_time', 'end_time'
+            )
+            for pk, day, start_time, end_time in rows:
+                self._remove(pk)
+                self._add(pk, section_id, day, start_time, end_time)
+
+    def free_room_ids(self, room_ids, day, start_time, end_time, ignore_section_id=None):
+        """
+        คืนค่า id ของห้องใน room_ids ที่ว่างตลอดช่วงเวลานี้
+
+        ignore_section_id ใช้ไม่นับคาบเรียนของกลุ่มเรียนนั้นเอง (เช่น ตอนแก้ไขกลุ่มเรียนเดิม)
+        """
+        start, end = slot_range(start_time, end_time)
+        free = []
+        with self._lock:
+            own = array('H', bytes(2 * SLOTS_PER_DAY))
+            own_room_id = self._section_rooms.get(ignore_section_id)
+            if ignore_section_id is not None:
+                for section_id, own_day, own_start, own_end in self._class_times.values():
+                    if section_id == ignore_section_id and own_day == day:
+                        for slot in range(own_start, own_end):
+                            own[slot] += 1
+            for room_id in room_ids:
+                counts = self._counts.get((room_id, day))
+                if counts is None:
+                    free.append(room_id)
+                    continue
+                if room_id == own_room_id:
+                    busy = any(counts[slot] - own[slot] for slot in range(start, end))
+                else:
+                    busy = any(counts[slot] for slot in range(start, end))
+                if not busy:
+                    free.append(room_id)
+        return free
+
+    def busy_room_ids_for_section(self, section_id):
+        """id ของห้องที่ไม่ว่างอย่างน้อยหนึ่งคาบในเวลาเรียนของกลุ่มเรียนนี้ (ไม่นับตัวเอง)"""
+        busy = set()
+        with self._lock:
+            own_slots = [
+                (day, start, end) for entry_section_id, day, start, end in self._class_times.values()
+                if entry_section_id == section_id
+            ]
+            own_room_id = self._section_rooms.get(section_id)
+            for (room_id, day), counts in self._counts.items():
+                for own_day, start, end in own_slots:
+                    if own_day != day:
+                        continue
+                    own = 1 if room_id == own_room_id else 0
+                    if any(counts[slot] > own for slot in range(start, end)):
+                        busy.add(room_id)
+                        break
+        return busy
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def _get_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, 0, None)
+        version = cache.get(VERSION_KEY, 0)
+    return version
+
+
+def _bump_version():
+    try:
+        return cache.incr(VERSION_KEY)
+    except ValueError:
+        # key หายไป (cache ถูกล้างหรือถูก evict)
+        cache.add(VERSION_KEY, 0, None)
+        return cache.incr(VERSION_KEY)
+
+
+def _stale(index, version):
+    return index is None or index.expired or index.version != version
+
+
+def get_room_index(semester_id):
+    """ดัชนีการใช้ห้องของภาคเรียน (สร้างเมื่อถูกเรียกใช้ครั้งแรก เมื่อหมดอายุ หรือเมื่อ process อื่นแก้ข้อมูล)"""
+    version = _get_version()
+    index = _indexes.get(semester_id)
+    if _stale(index, version):
+        with _indexes_lock:
+            index = _indexes.get(semester_id)
+            if _stale(index, version):
+                index = _indexes[semester_id] = RoomOccupancyIndex.build(semester_id, version)
+    return index
+
+
+def reset_room_indexes():
+    """ทิ้งดัชนีของทุก process (เช่น หลังนำเข้าข้อมูลด้วย bulk_create ที่ไม่ส่ง signal)"""
+    with _indexes_lock:
+        _indexes.clear()
+        _bump_version()
+
+
+def loaded_room_indexes():
+    """ดัชนีที่สร้างไว้แล้วใน process นี้"""
+    return list(_indexes.values())
+
+
+def update_room_indexes(change):
+    """
+    เรียก change(index) กับทุกดัชนีใน process นี้หลัง transaction ปัจจุบัน commit (ไม่แก้ทันทีใน signal
+    เพราะถ้า rollback ดัชนีจะค้างข้อมูลที่ไม่มีอยู่จริง) แล้วเพิ่มเวอร์ชันใน cache ให้ process อื่นสร้างดัชนีใหม่
+    ดัชนีของ process นี้ใช้ต่อด้วยเวอร์ชันใหม่ได้เฉพาะเมื่อไม่มี process อื่นเพิ่มเวอร์ชันแทรกระหว่างนั้น
+    """
+    def apply():
+        indexes = loaded_room_indexes()
+        for index in indexes:
+            change(index)
+        version = _bump_version()
+        for index in indexes:
+            if index.version == version - 1:
+                index.version = version
+
+    transaction.on_commit(apply)
+
+
+def find_free_rooms(semester_id, day, start_time, end_time, ignore_section_id=None):
+    """รายการห้องที่ว่างตลอดช่วงเวลาที่ระบุในภาคเรียนนี้ เรียงตามอาคารและเลขห้อง"""
+    index = get_room_index(semester_id)
+    rooms = list(Room.objects.order_by('building', 'room_number'))
+    free_ids = set(index.free_room_ids([room.pk for room in rooms], day, start_time, end_time, ignore_section_id))
+    return [room for room in rooms if room.pk in free_ids]
@@ -0,0 +1,295 @@
+"""
+ระบบค้นหารายวิชา (รหัสวิชา ชื่อวิชา และคำอธิบายรายวิชา)
+
+- ข้อความทุกชิ้นถูกทำให้อยู่ในรูปมาตรฐานด้วย normalize_search_text ก่อนเก็บลง
+  Course.search_text และก่อนค้นหา เพื่อให้คำภาษาไทยที่พิมพ์วรรณยุกต์ต่างกัน
+  หรือเรียงสระ/วรรณยุกต์สลับกันยังค้นเจอ
+- บน PostgreSQL ใช้ index แบบ GIN (pg_trgm) บน search_text ทำให้ LIKE '%คำค้น%' ไม่ต้อง scan ทั้งตาราง
+- บนฐานข้อมูลอื่น (เช่น SQLite ตอนพัฒนา) ใช้ n-gram index ในหน่วยความจำของ process แทน
+- รหัสวิชาที่เป็นตัวเลขล้วนค้นแบบขึ้นต้นด้วย (prefix) ได้ และได้อันดับสูงกว่าการเจอในชื่อ/คำอธิบาย
+- filter_by_search กรองและจัดอันดับ queryset ในฐานข้อมูล (search_rank) เพื่อให้ view เรียงผลด้วย SQL
+"""
+import bisect
+import heapq
+import re
+import threading
+import unicodedata
+
+from django.db import connection
+from django.db.models import Case, F, FloatField, Func, IntegerField, Q, Value, When
+from django.db.models.functions import Length, StrIndex
+from django.db.models.lookups import Exact, GreaterThanOrEqual, LessThanOrEqual
+
+from .models import Course
+
+# วรรณยุกต์และไม้ไต่คู้ ซึ่งมักพิมพ์ไม่ตรงกัน (ไม่ใส่ ใส่ผิดตำแหน่ง หรือใส่ซ้ำ)
+THAI_TONE_MARKS = re.compile('[\u0E47-\u0E4B]')
+ZERO_WIDTH = re.compile('[\u200B-\u200D\u2060\uFEFF]')
+WHITESPACE = re.compile(r'\s+')
+NGRAM_SIZE = 3
+DEFAULT_LIMIT = 200
+NAME_WINDOW = 200
+
+# คะแนนสำหรับจัดอันดับผลการค้นหา
+RANK_EXACT_CODE = 100
+RANK_CODE_PREFIX = 80
+RANK_NAME_START = 60
+RANK_NAME = 40
+RANK_TEXT = 10
+
+
+def normalize_search_text(text):
+    """
+    แปลงข้อความให้อยู่ในรูปมาตรฐานสำหรับการค้นหา
+
+    ใช้ NFKC, ตัวพิมพ์เล็ก, ตัดอักขระความกว้างศูนย์, ตัดวรรณยุกต์ไทย
+    และรวม นิคหิต + สระอา ให้เป็นสระอำ ก่อนยุบช่องว่างที่ซ้ำกัน
+    """
+    if not text:
+        return ''
+    text = unicodedata.normalize('NFKC', text).casefold()
+    text = ZERO_WIDTH.sub('', text)
+    text = THAI_TONE_MARKS.sub('', text)
+    text = text.replace('\u0E4D\u0E32', '\u0E33')
+    return WHITESPACE.sub(' ', text).strip()
+
+
+def build_search_text(code, name, description):
+    """ข้อความที่ใช้ค้นหาของรายวิชา 1 รายการ (เก็บใน Course.search_text)"""
+    return normalize_search_text(' '.join(part for part in (code, name, description) if part))
+
+
+def _ngrams(text):
+    if len(text) < NGRAM_SIZE:
+        return {text} if text else set()
+    return {text[i:i + NGRAM_SIZE] for i in range(len(text) - NGRAM_SIZE + 1)}
+
+
+def _score(query, code, text):
+    """คะแนนของรายวิชาที่ตรงกับคำค้นแล้ว ยิ่งมากยิ่งอยู่ต้น"""
+    if code.startswith(query):
+        return RANK_EXACT_CODE if code == query else RANK_CODE_PREFIX
+    # search_text = "<รหัส> <ชื่อ> <คำอธิบาย>" ดังนั้นชื่อเริ่มหลังรหัสวิชา
+    # ค้นเฉพาะช่วงต้นของข้อความ (ชื่อวิชา) เพื่อไม่ต้องไล่คำอธิบายทั้งหมด
+    start = len(code) + 1
+    position = text.find(query, start, start + NAME_WINDOW + len(query))
+    if position == start:
+        return RANK_NAME_START
+    return RANK_NAME if position != -1 else RANK_TEXT
+
+
+class CourseSearchIndex:
+    """
+    n-gram index ในหน่วยความจำ: เก็บ trigram -> ชุด id ของรายวิชา
+    และรายการรหัสวิชาที่เรียงไว้สำหรับค้นหาแบบ prefix ด้วย bisect
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._docs = {}       # id -> (code, search_text)
+        self._postings = {}   # trigram -> set(id)
+        self._codes = []      # [(code, id)] เรียงตามรหัสวิชา
+
+    @classmethod
+    def build(cls):
+        index = cls()
+        for pk, code, text in Course.objects.values_list('pk', 'code', 'search_text').iterator(chunk_size=5000):
+            index._add(pk, code, text or build_search_text(code, '', ''))
+        index._codes.sort()
+        return index
+
+    def __len__(self):
+        return len(self._docs)
+
+    def _add(self, pk, code, text, keep_sorted=False):
+        self._docs[pk] = (code, text)
+        for gram in _ngrams(text):
+            self._postings.setdefault(gram, set()).add(pk)
+        if keep_sorted:
+            bisect.insort(self._codes, (code, pk))
+        else:
+            self._codes.append((code, pk))
+
+    def _remove(self, pk):
+        doc = self._docs.pop(pk, None)
+        if doc is None:
+            return
+        code, text = doc
+        for gram in _ngrams(text):
+            ids = self._postings.get(gram)
+            if ids is not None:
+                ids.discard(pk)
+                if not ids:
+                    del self._postings[gram]
+        position = bisect.bisect_left(self._codes, (code, pk))
+        if position < len(self._codes) and self._codes[position] == (code, pk):
+            del self._codes[position]
+
+    def update(self, pk, code, text):
+        """เพิ่มหรือแก้ไขรายวิชา 1 รายการ (ไม่ต้องสร้าง index ใหม่ทั้งหมด)"""
+        with self._lock:
+            self._remove(pk)
+            self._add(pk, code, text, keep_sorted=True)
+
+    def remove(self, pk):
+        with self._lock:
+            self._remove(pk)
+
+    def _code_prefix(self, prefix):
+        start = bisect.bisect_left(self._codes, (prefix,))
+        ids = []
+        for code, pk in self._codes[start:]:
+            if not code.startswith(prefix):
+                break
+            ids.append(pk)
+        return ids
+
+    def _containing(self, term):
+        """id ของรายวิชาที่ search_text มี term อยู่ (ตรวจซ้ำหลังตัดด้วย n-gram)"""
+        grams = _ngrams(term)
+        if len(term) < NGRAM_SIZE:
+            candidates = self._docs.keys()
+        else:
+            postings = sorted((self._postings.get(gram, set()) for gram in grams), key=len)
+            candidates = set(postings[0])
+            for ids in postings[1:]:
+                candidates &= ids
+                if not candidates:
+                    break
+        return {pk for pk in candidates if term in self._docs[pk][1]}
+
+    def _matches(self, query):
+        matched = set(self._code_prefix(query)) if query.isdigit() else set()
+        terms = query.split(' ')
+        found = self._containing(terms[0])
+        for term in terms[1:]:
+            if not found:
+                break
+            found &= self._containing(term)
+        return matched | found
+
+    def matches(self, query):
+        """ชุด id ของรายวิชาที่ตรงกับคำค้นทั้งหมด (ไม่จัดอันดับ)"""
+        query = normalize_search_text(query)
+        if not query:
+            return set()
+        with self._lock:
+            return self._matches(query)
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        """คืนค่ารายการ id ของรายวิชาที่ตรงกับคำค้น เรียงตามอันดับความเกี่ยวข้อง"""
+        query = normalize_search_text(query)
+        if not query:
+            return []
+        with self._lock:
+            matched = self._matches(query)
+            docs = self._docs
+            # ต้องการแค่ limit อันดับแรก จึงใช้ heap แทนการเรียงผลลัพธ์ทั้งหมด
+            ranked = heapq.nsmallest(
+                limit,
+                ((-_score(query, *docs[pk]), docs[pk][0], pk) for pk in matched),
+            )
+        return [pk for _, _, pk in ranked]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_search_index():
+    """index ในหน่วยความจำของ process (สร้างครั้งแรกเมื่อถูกเรียกใช้)"""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = CourseSearchIndex.build()
+    return _index
+
+
+def reset_search_index():
+    """ทิ้ง index ในหน่วยความจำ เพื่อให้สร้างใหม่ในการค้นหาครั้งถัดไป"""
+    global _index
+    with _index_lock:
+        _index = None
+
+
+def index_course(course):
+    """อัปเดตรายวิชาใน index ในหน่วยความจำ (ถ้าสร้างไว้แล้ว)"""
+    if _index is not None:
+        _index.update(course.pk, course.code, course.search_text)
+
+
+def unindex_course(pk):
+    if _index is not None:
+        _index.remove(pk)
+
+
+class Similarity(Func):
+    """ฟังก์ชัน similarity() ของ pg_trgm"""
+    function = 'SIMILARITY'
+    output_field = FloatField()
+
+
+def search_rank(normalized, prefix=''):
+    """
+    อันดับความเกี่ยวข้องเป็น expression ของ SQL ตามกฎเดียวกับ _score
+    prefix คือเส้นทางไปยัง Course เช่น 'course__' เมื่อใช้กับ queryset ของ Section
+    """
+    code = f'{prefix}code'
+    # ตำแหน่งแรกที่เจอคำค้นใน search_text (เริ่มที่ 1, 0 คือไม่เจอ) ชื่อวิชาเริ่มหลัง "<รหัส> "
+    position = StrIndex(F(f'{prefix}search_text'), Value(normalized))
+    name_start = Length(code) + 2
+    return Case(
+        When(**{code: normalized}, then=Value(RANK_EXACT_CODE)),
+        When(**{f'{code}__startswith': normalized}, then=Value(RANK_CODE_PREFIX)),
+        When(Exact(position, name_start), then=Value(RANK_NAME_START)),
+        When(
+            GreaterThanOrEqual(position, name_start) & LessThanOrEqual(position, name_start + NAME_WINDOW),
+            then=Value(RANK_NAME),
+        ),
+        default=Value(RANK_TEXT),
+        output_field=IntegerField(),
+    )
+
+
+def filter_by_search(queryset, query, prefix=''):
+    """
+    กรอง queryset ด้วยคำค้นและ annotate search_rank คืนค่า (queryset, คีย์การเรียงตามความเกี่ยวข้อง)
+    คีย์การเรียงเป็น annotation ที่เรียงจากน้อยไปมาก จึงใช้กับ KeysetPaginator ได้โดยตรง
+
+    ฐานข้อมูลเรียงผลเองทั้งหมด ไม่ต้องตัดเหลือ DEFAULT_LIMIT รายวิชาแล้วส่งอันดับกลับไปเป็น CASE
+    บน PostgreSQL กรองด้วย GIN index และเรียงอันดับที่เท่ากันด้วย similarity()
+    บนฐานข้อมูลอื่นกรองด้วย index ในหน่วยความจำ แล้วจัดอันดับด้วย expression เดียวกันใน SQL
+    """
+    normalized = normalize_search_text(query)
+    if not normalized:
+        return queryset.none(), ()
+    rank = search_rank(normalized, prefix)
+    if connection.vendor != 'postgresql':
+        ids = get_search_index().matches(normalized)
+        queryset = queryset.filter(**{f'{prefix}pk__in': ids})
+        return queryset.annotate(search_rank=rank, search_order=-F('search_rank')), ('search_order',)
+
+    condition = Q()
+    for term in normalized.split(' '):
+        # LIKE '%term%' ใช้ GIN index (gin_trgm_ops) บน search_text ได้
+        condition &= Q(**{f'{prefix}search_text__contains': term})
+    if normalized.isdigit():
+        # รหัสวิชามี index แบบ varchar_pattern_ops จาก unique=True จึงค้น prefix ได้เร็ว
+        condition |= Q(**{f'{prefix}code__startswith': normalized})
+    queryset = queryset.filter(condition).annotate(
+        search_rank=rank,
+        search_order=-F('search_rank'),
+        search_distance=Value(1.0) - Similarity(F(f'{prefix}search_text'), Value(normalized)),
+    )
+    return queryset, ('search_order', 'search_distance')
+
+
+def search_courses(query, limit=DEFAULT_LIMIT):
+    """ค้นหารายวิชา คืนค่ารายการ id เรียงตามความเกี่ยวข้อง (มากไปน้อย)"""
+    if not normalize_search_text(query):
+        return []
+    if connection.vendor == 'postgresql':
+        courses, ordering = filter_by_search(Course.objects.all(), query)
+        return list(courses.order_by(*ordering, 'code').values_list('pk', flat=True)[:limit])
+    return get_search_index().search(query, limit)
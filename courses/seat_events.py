@@ -0,0 +1,140 @@
+"""
+ส่งจำนวนที่นั่งที่เปลี่ยนไปยังหน้าลงทะเบียนที่เปิดอยู่แบบ real-time (Server-Sent Events)
+
+- ฝั่งที่เปลี่ยนจำนวนที่นั่ง (courses.enrollment) เรียก notify_seat_changes() หลัง commit
+  ซึ่งอ่านจำนวนล่าสุดเฉพาะกลุ่มเรียนที่มีผู้ติดตามอยู่ (ไม่มีผู้ติดตาม = ไม่คิวรี) แล้วส่งให้ broker
+- broker กระจายข้อมูลไปยัง Subscription ของแต่ละการเชื่อมต่อ SSE (courses.api.seat_stream)
+- Subscription รวมการเปลี่ยนแปลงที่เข้ามาถี่ ๆ ไว้ ส่งออกไม่เกิน 1 ครั้งต่อ interval (ค่าล่าสุดเท่านั้น)
+
+LocalSeatBroker ทำงานภายใน process เดียว (ต้องรันด้วย ASGI เพื่อให้ request ลงทะเบียน
+และการเชื่อมต่อ SSE อยู่ใน process เดียวกัน) ถ้ามีหลาย process ให้เปลี่ยนเป็น broker กลาง
+ที่มี method เดียวกันด้วย set_broker()
+"""
+import asyncio
+import threading
+from collections import defaultdict
+
+from django.db import transaction
+
+from .models import Section
+
+COALESCE_SECONDS = 1.0
+
+
+class Subscription:
+    """การติดตามกลุ่มเรียนของการเชื่อมต่อ 1 รายการ (ต้องสร้างภายใน event loop ที่จะอ่านข้อมูล)"""
+
+    def __init__(self, section_ids, interval=COALESCE_SECONDS):
+        self.section_ids = frozenset(section_ids)
+        self.interval = interval
+        self._loop = asyncio.get_running_loop()
+        self._pending = {}
+        self._ready = asyncio.Event()
+        self._last_batch = None
+
+    def deliver(self, updates):
+        """รับข้อมูลจาก thread ใดก็ได้ ค่าใหม่ของกลุ่มเรียนเดียวกันจะทับค่าที่ยังไม่ได้ส่ง"""
+        self._loop.call_soon_threadsafe(self._add, updates)
+
+    def _add(self, updates):
+        self._pending.update(updates)
+        self._ready.set()
+
+    async def next_batch(self):
+        """
+        รอจนมีข้อมูล แล้วคืน {section_id: ข้อมูลที่นั่ง} ที่สะสมไว้
+        ห่างจากชุดก่อนหน้าอย่างน้อย interval วินาที (ถูกยกเลิกระหว่างรอได้โดยข้อมูลไม่หาย)
+        """
+        await self._ready.wait()
+        if self._last_batch is not None:
+            delay = self._last_batch + self.interval - self._loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        self._ready.clear()
+        batch, self._pending = self._pending, {}
+        self._last_batch = self._loop.time()
+        return batch
+
+
+class LocalSeatBroker:
+    """pub/sub ภายใน process: section_id -> Subscription ที่ติดตามอยู่"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = defaultdict(set)
+
+    def subscribe(self, section_ids, interval=COALESCE_SECONDS):
+        subscription = Subscription(section_ids, interval)
+        with self._lock:
+            for section_id in subscription.section_ids:
+                self._subscriptions[section_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for section_id in subscription.section_ids:
+                subscribers = self._subscriptions.get(section_id)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscriptions[section_id]
+
+    def subscribed(self, section_ids=None):
+        """id ของกลุ่มเรียน (ใน section_ids ถ้าระบุ) ที่มีผู้ติดตามอย่างน้อย 1 ราย"""
+        with self._lock:
+            if section_ids is None:
+                return set(self._subscriptions)
+            return {section_id for section_id in section_ids if section_id in self._subscriptions}
+
+    def publish(self, updates):
+        """updates = {section_id: ข้อมูลที่นั่ง} ส่งให้แต่ละ Subscription เฉพาะกลุ่มเรียนที่ติดตาม"""
+        targets = defaultdict(dict)
+        with self._lock:
+            for section_id, payload in updates.items():
+                for subscription in self._subscriptions.get(section_id, ()):
+                    targets[subscription][section_id] = payload
+        for subscription, items in targets.items():
+            try:
+                subscription.deliver(items)
+            except RuntimeError:
+                # event loop ของการเชื่อมต่อปิดไปแล้ว
+                self.unsubscribe(subscription)
+
+
+_broker = LocalSeatBroker()
+
+
+def get_broker():
+    return _broker
+
+
+def set_broker(broker):
+    """เปลี่ยน broker (เช่น broker กลางข้าม process หรือ broker ทดแทนในการทดสอบ) คืนค่า broker เดิม"""
+    global _broker
+    previous, _broker = _broker, broker
+    return previous
+
+
+def seat_payload(section_id, enrolled, capacity):
+    return {'id': section_id, 'enrolled': enrolled, 'capacity': capacity, 'available': max(capacity - enrolled, 0)}
+
+
+def seat_counts(section_ids):
+    """{section_id: ข้อมูลที่นั่ง} ล่าสุดจากฐานข้อมูล (คิวรีเดียว)"""
+    rows = Section.objects.filter(pk__in=section_ids).values_list('pk', 'enrolled_count', 'capacity')
+    return {pk: seat_payload(pk, enrolled, capacity) for pk, enrolled, capacity in rows}
+
+
+def publish_seat_counts(section_ids=None):
+    """อ่านและส่งจำนวนที่นั่งของกลุ่มเรียนที่มีผู้ติดตาม (section_ids=None คือทุกกลุ่มที่ถูกติดตาม)"""
+    broker = get_broker()
+    watched = broker.subscribed(section_ids)
+    if watched:
+        broker.publish(seat_counts(watched))
+
+
+def notify_seat_changes(section_ids=None):
+    """เรียกเมื่อ enrolled_count หรือ capacity เปลี่ยน จะส่งข้อมูลหลัง transaction ปัจจุบัน commit เท่านั้น"""
+    if section_ids is not None:
+        section_ids = list(section_ids)
+    transaction.on_commit(lambda: publish_seat_counts(section_ids))
@@ -0,0 +1,96 @@
+"""
+ตัวช่วยหาภาคเรียนปัจจุบัน
+
+ภาคเรียนปัจจุบันเปลี่ยนเพียงไม่กี่ครั้งต่อปี จึงเก็บผลลัพธ์ไว้ในหน่วยความจำของ process
+จนกว่าจะถึงวันที่ภาคเรียนเปลี่ยน (วันสิ้นสุดภาคหรือวันเปิดภาคถัดไป)
+และล้างทิ้งเมื่อมีการบันทึกหรือลบ Semester ใด ๆ (ดู courses.signals)
+
+การล้างต้องมีผลกับทุก process จึงเก็บเวอร์ชันไว้ใน Django cache ที่ใช้ร่วมกัน (แบบเดียวกับ courses.catalog)
+ค่าในหน่วยความจำใช้ได้เฉพาะเมื่อเวอร์ชันที่บันทึกไว้ตรงกับเวอร์ชันปัจจุบันใน cache
+"""
+import threading
+import uuid
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import Semester
+
+VERSION_KEY = 'semesters:current:version'
+
+_lock = threading.Lock()
+# (semester, เวอร์ชัน, วันที่คำนวณ, วันที่ต้องคำนวณใหม่ หรือ None ถ้าไม่มีกำหนด)
+_cached = None
+
+
+def _get_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        version = uuid.uuid4().hex
+        if not cache.add(VERSION_KEY, version, None):
+            version = cache.get(VERSION_KEY, version)
+    return version
+
+
+def _resolve(today):
+    """คิวรีภาคเรียนปัจจุบันและวันที่ผลลัพธ์นี้จะหมดอายุ"""
+    semester = Semester.objects.filter(start_date__lte=today, end_date__gte=today).first()
+    boundaries = []
+    if semester:
+        boundaries.append(semester.end_date + timedelta(days=1))
+    next_start = (
+        Semester.objects.filter(start_date__gt=today)
+        .order_by('start_date')
+        .values_list('start_date', flat=True)
+        .first()
+    )
+    if next_start:
+        boundaries.append(next_start)
+    return semester, (min(boundaries) if boundaries else None)
+
+
+_MISS = object()
+
+
+def _cached_semester(today, version):
+    """ภาคเรียนในแคชที่ยังใช้ได้ในวันนี้และตรงกับเวอร์ชันปัจจุบัน หรือ _MISS"""
+    entry = _cached
+    if entry is not None and version is not None:
+        semester, cached_version, computed_on, valid_until = entry
+        if (cached_version == version and computed_on <= today
+                and (valid_until is None or today < valid_until)):
+            return semester
+    return _MISS
+
+
+def get_current_semester():
+    """คืนค่าภาคเรียนที่ครอบคลุมวันนี้ (หรือ None) โดยไม่แตะฐานข้อมูลถ้ายังมีค่าในแคช"""
+    global _cached
+    today = timezone.localdate()
+    version = _get_version()
+    semester = _cached_semester(today, version)
+    if semester is not _MISS:
+        return semester
+
+    with _lock:
+        semester, valid_until = _resolve(today)
+        _cached = (semester, version, today, valid_until)
+    return semester
+
+
+async def aget_current_semester():
+    """get_current_semester สำหรับ async view: ถ้ามีในแคชคืนค่าทันทีโดยไม่ต้องสลับไปยัง thread ของฐานข้อมูล"""
+    semester = _cached_semester(timezone.localdate(), await cache.aget(VERSION_KEY))
+    if semester is not _MISS:
+        return semester
+    return await sync_to_async(get_current_semester)()
+
+
+def clear_current_semester_cache():
+    """ล้างแคชภาคเรียนปัจจุบันของทุก process (เรียกเมื่อข้อมูล Semester เปลี่ยน)"""
+    global _cached
+    with _lock:
+        cache.set(VERSION_KEY, uuid.uuid4().hex, None)
+        _cached = None
@@ -0,0 +1,208 @@
+from django.db import transaction
+from django.core.cache import cache
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from users.models import Profile
+
+from .catalog import bump_catalog_version
+from .enrollment import sync_enrolled_counts
+from .fragments import bump_render_versions, fragment_key
+from .models import ClassTime, Course, Room, Section, Semester
+from .rooms import update_room_indexes
+from .search import index_course, unindex_course
+from .seat_events import notify_seat_changes
+from .semesters import clear_current_semester_cache
+from .timetable import rebuild_schedule_masks
+from .waitlist import schedule_promotion
+
+
+@receiver(m2m_changed, sender=Section.students.through)
+def update_enrolled_count(sender, instance, action, reverse, pk_set, **kwargs):
+    """ปรับ enrolled_count ทุกครั้งที่มีการเพิ่ม/ลบนิสิตผ่าน Section.students (รวมถึงหน้า admin)
+    การลบนิสิตออก (ถอน) ทำให้มีที่นั่งว่าง จึงเลื่อนคิวรอที่นั่งหลัง commit ด้วย"""
+    if reverse:
+        # เรียกจากฝั่ง User เช่น user.enrolled_sections.add(section)
+        if action == 'pre_clear':
+            # เก็บรายการ Section ไว้ก่อน เพราะหลัง clear จะไม่รู้ว่ากระทบ Section ใดบ้าง
+            instance._cleared_section_ids = list(instance.enrolled_sections.values_list('pk', flat=True))
+        elif action == 'post_clear':
+            sync_enrolled_counts(getattr(instance, '_cleared_section_ids', []))
+            schedule_promotion(getattr(instance, '_cleared_section_ids', []))
+        elif action in ('post_add', 'post_remove') and pk_set:
+            sync_enrolled_counts(pk_set)
+            if action == 'post_remove':
+                schedule_promotion(pk_set)
+        return
+
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        sync_enrolled_counts([instance.pk])
+        instance.refresh_from_db(fields=['enrolled_count'])
+        if action != 'post_add':
+            schedule_promotion([instance.pk])
+
+
+@receiver(post_save, sender=Section)
+def promote_waitlist_for_section(sender, instance, created, **kwargs):
+    """จำนวนที่รับอาจเพิ่มขึ้น: เลื่อนคิวรอที่นั่งหลัง commit (ไม่มีที่นั่งว่างก็ไม่มีคิวรีเพิ่ม)"""
+    if not created:
+        schedule_promotion([instance.pk])
+
+
+@receiver(post_save, sender=Semester)
+@receiver(post_delete, sender=Semester)
+def invalidate_current_semester(sender, **kwargs):
+    """ล้างแคชภาคเรียนปัจจุบันทันที และล้างซ้ำหลัง commit
+    เผื่อ request อื่นอ่านข้อมูลเก่า (ก่อน commit) กลับเข้าแคชไประหว่างนั้น"""
+    clear_current_semester_cache()
+    transaction.on_commit(clear_current_semester_cache)
+
+
+@receiver(post_save, sender=Course)
+def reindex_course(sender, instance, **kwargs):
+    """อัปเดต index ค้นหาในหน่วยความจำทีละรายวิชา แทนการสร้างใหม่ทั้งหมด"""
+    index_course(instance)
+
+
+@receiver(post_delete, sender=Course)
+def remove_course_from_index(sender, instance, **kwargs):
+    unindex_course(instance.pk)
+
+
+def class_time_section_ids(class_time):
+    """กลุ่มเรียนที่ได้รับผลจากการเปลี่ยนคาบเรียน: กลุ่มเรียนปัจจุบัน และกลุ่มเรียนเดิมถ้าคาบเรียนถูกย้าย"""
+    return {class_time.section_id, getattr(class_time, '_loaded_section_id', None)} - {None}
+
+
+@receiver(post_save, sender=ClassTime)
+@receiver(post_delete, sender=ClassTime)
+def update_schedule_mask(sender, instance, **kwargs):
+    """คำนวณตารางเรียน (bitmask) ของกลุ่มเรียนใหม่ทุกครั้งที่เพิ่ม แก้ไข ย้าย หรือลบคาบเรียน"""
+    rebuild_schedule_masks(class_time_section_ids(instance))
+
+
+@receiver(post_save, sender=ClassTime)
+def update_room_index_for_class_time(sender, instance, **kwargs):
+    """ปรับดัชนีการใช้ห้องที่สร้างไว้แล้วเฉพาะคาบเรียนที่เปลี่ยน (หลัง commit)"""
+    # เก็บค่าตอนบันทึกไว้ instance อาจถูกแก้ต่อก่อน commit
+    class_time = ClassTime(pk=instance.pk, section_id=instance.section_id, day=instance.day,
+                           start_time=instance.start_time, end_time=instance.end_time)
+
+    def change(index):
+        if index.knows_section(class_time.section_id):
+            index.put_class_time(class_time)
+        else:
+            # ย้ายไปกลุ่มเรียนของภาคเรียนอื่น
+            index.remove_class_time(class_time.pk)
+
+    update_room_indexes(change)
+
+
+@receiver(post_delete, sender=ClassTime)
+def remove_class_time_from_room_index(sender, instance, **kwargs):
+    pk = instance.pk
+    update_room_indexes(lambda index: index.remove_class_time(pk))
+
+
+@receiver(post_save, sender=Section)
+def update_room_index_for_section(sender, instance, **kwargs):
+    """ย้ายคาบเรียนในดัชนีเมื่อเปลี่ยนห้อง และย้ายดัชนีเมื่อเปลี่ยนภาคเรียน (หลัง commit)"""
+    section_id, semester_id, room_id = instance.pk, instance.semester_id, instance.room_id
+
+    def change(index):
+        if index.semester_id == semester_id:
+            if index.knows_section(section_id):
+                index.set_section_room(section_id, room_id)
+            else:
+                index.add_section(section_id, room_id)
+        elif index.knows_section(section_id):
+            index.remove_section(section_id)
+
+    update_room_indexes(change)
+
+
+@receiver(post_delete, sender=Section)
+def remove_section_from_room_index(sender, instance, **kwargs):
+    section_id = instance.pk
+    update_room_indexes(lambda index: index.remove_section(section_id))
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+@receiver(post_save, sender=Section)
+@receiver(post_delete, sender=Section)
+@receiver(post_save, sender=ClassTime)
+@receiver(post_delete, sender=ClassTime)
+@receiver(post_save, sender=Room)
+@receiver(post_delete, sender=Room)
+@receiver(post_save, sender=Semester)
+@receiver(m2m_changed, sender=Section.instructors.through)
+def invalidate_catalog_snapshot(sender, **kwargs):
+    """เปลี่ยนเวอร์ชันของ catalog snapshot ทันที และซ้ำหลัง commit
+    เผื่อ request อื่นสร้าง snapshot จากข้อมูลก่อน commit ไว้ระหว่างนั้น
+    (การลงทะเบียนอัปเดต enrolled_count ด้วย queryset.update จึงไม่ผ่าน signal นี้)"""
+    if kwargs.get('action', 'post_').startswith('post_'):
+        bump_catalog_version()
+        transaction.on_commit(bump_catalog_version)
+
+
+@receiver(post_save, sender=Profile)
+def invalidate_catalog_snapshot_for_instructor(sender, instance, **kwargs):
+    """snapshot มีเฉพาะชื่ออาจารย์ การแก้โปรไฟล์นิสิตจึงไม่ต้องทิ้ง snapshot ทุกภาคเรียน"""
+    if instance.user_type == Profile.UserType.INSTRUCTOR:
+        invalidate_catalog_snapshot(sender, **kwargs)
+
+
+@receiver(post_save, sender=Section)
+def publish_section_seats(sender, instance, created, **kwargs):
+    """ส่งจำนวนที่นั่งใหม่ให้หน้าที่ติดตามอยู่ (เช่น แก้จำนวนที่รับ) หลัง commit"""
+    if not created:
+        notify_seat_changes([instance.pk])
+
+
+@receiver(post_save, sender=Section)
+def bump_section_render_version(sender, instance, created, **kwargs):
+    """HTML ของแถวกลุ่มเรียนที่ cache ไว้ (courses.fragments) ใช้ไม่ได้เมื่อข้อมูลที่แสดงเปลี่ยน"""
+    if not created:
+        bump_render_versions([instance.pk])
+
+
+@receiver(post_delete, sender=Section)
+def delete_section_fragment(sender, instance, **kwargs):
+    # กันไม่ให้กลุ่มเรียนใหม่ที่ได้ id ซ้ำ (เช่นบน SQLite) ใช้ HTML ของกลุ่มเรียนที่ถูกลบ
+    cache.delete(fragment_key(instance.pk, instance.render_version))
+
+
+@receiver(post_save, sender=ClassTime)
+@receiver(post_delete, sender=ClassTime)
+def bump_render_version_for_class_time(sender, instance, **kwargs):
+    bump_render_versions(class_time_section_ids(instance))
+
+
+@receiver(m2m_changed, sender=Section.instructors.through)
+def bump_render_version_for_instructors(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            bump_render_versions([instance.pk])
+    elif action == 'pre_clear':
+        # เรียกจากฝั่ง User (user.taught_sections.clear()) ต้องเก็บรายการไว้ก่อนถูกลบ
+        bump_render_versions(instance.taught_sections.values_list('pk', flat=True))
+    elif action in ('post_add', 'post_remove') and pk_set:
+        bump_render_versions(pk_set)
+
+
+@receiver(post_save, sender=Course)
+def bump_render_version_for_course(sender, instance, created, **kwargs):
+    if not created:
+        bump_render_versions(Section.objects.filter(course_id=instance.pk))
+
+
+@receiver(post_save, sender=Room)
+@receiver(pre_delete, sender=Room)
+def bump_render_version_for_room(sender, instance, **kwargs):
+    bump_render_versions(Section.objects.filter(room_id=instance.pk))
+
+
+@receiver(post_save, sender=Profile)
+def bump_render_version_for_instructor_profile(sender, instance, **kwargs):
+    bump_render_versions(Section.objects.filter(instructors=instance.user_id))
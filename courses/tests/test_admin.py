@@ -0,0 +1,133 @@
+import pytest
+from datetime import date, time
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from users.models import Profile
+from courses.models import ClassTime, Course, Room, Section, Semester
+
+@pytest.fixture
+def admin_client(client, db):
+    client.force_login(User.objects.create_superuser(username="root", password="pass"))
+    return client
+
+@pytest.fixture
+def semester(db):
+    return Semester.objects.create(year=2567, semester=1, start_date=date(2025, 6, 1), end_date=date(2025, 10, 1))
+
+@pytest.fixture
+def section(db, semester):
+    course = Course.objects.create(code="100001", name="Programming", credits=3)
+    room = Room.objects.create(building="A", room_number="101")
+    section = Section.objects.create(course=course, semester=semester, section_number="1", room=room, capacity=200)
+    ClassTime.objects.create(section=section, day='MON', start_time=time(8), end_time=time(10))
+    return section
+
+def make_students(count, prefix="s", start=0):
+    users = User.objects.bulk_create([User(username=f"{prefix}{i:04d}") for i in range(count)])
+    Profile.objects.bulk_create([
+        Profile(user=user, user_type='STUDENT', student_id=f"6{start + i:07d}", first_name_th="นิสิต", last_name_th=f"คนที่{i}")
+        for i, user in enumerate(users)
+    ])
+    return users
+
+def change_form_data(resp, **overrides):
+    """ข้อมูล POST ของหน้าแก้ไขจาก context (ฟอร์มหลัก + management form และแถวเดิมของทุก inline)"""
+    form = resp.context['adminform'].form
+    data = {}
+    for name in form.fields:
+        value = form[name].value()
+        if value is not None:
+            data[name] = value
+    for inline in resp.context['inline_admin_formsets']:
+        formset = inline.formset
+        for name, field in formset.management_form.fields.items():
+            data[formset.management_form.add_prefix(name)] = formset.management_form[name].value()
+        for row in formset.initial_forms:
+            for name in row.fields:
+                value = row[name].value()
+                if value is not None:
+                    data[row.add_prefix(name)] = value
+    data.update(overrides)
+    return data
+
+def inline_prefixes(resp):
+    return [inline.formset.prefix for inline in resp.context['inline_admin_formsets']]
+
+@pytest.mark.django_db
+def test_changelist_queries_do_not_grow_with_sections(admin_client, semester, section):
+    instructor = User.objects.create(username="teacher")
+    Profile.objects.create(user=instructor, user_type='INSTRUCTOR', first_name_th="ครู", last_name_th="ใจดี")
+    section.instructors.add(instructor)
+    url = reverse('admin:courses_section_changelist')
+
+    def add_sections(count):
+        start = Section.objects.count()
+        for i in range(start, start + count):
+            other = Section.objects.create(course=section.course, semester=semester, section_number=str(i + 1),
+                                           room=section.room, capacity=30)
+            other.instructors.add(instructor)
+
+    admin_client.get(url)
+    with CaptureQueriesContext(connection) as few:
+        resp = admin_client.get(url, {'semester__id__exact': semester.pk})
+    assert "ครู ใจดี" in resp.content.decode()
+    add_sections(10)
+    with CaptureQueriesContext(connection) as many:
+        admin_client.get(url, {'semester__id__exact': semester.pk})
+    assert len(many) == len(few)
+
+@pytest.mark.django_db
+def test_change_page_paginates_and_searches_roster(admin_client, section):
+    section.students.add(*make_students(120))
+    url = reverse('admin:courses_section_change', args=[section.pk])
+
+    resp = admin_client.get(url)
+    assert resp.status_code == 200
+    roster = resp.context['inline_admin_formsets'][1].formset
+    assert len(roster.forms) == 50 and roster.page.paginator.num_pages == 3
+    # ไม่มีรายชื่อผู้ใช้ทั้งระบบเป็นตัวเลือกในหน้าแก้ไข
+    assert resp.content.decode().count('<option') < 30
+
+    roster = admin_client.get(url, {'roster_page': 3}).context['inline_admin_formsets'][1].formset
+    assert len(roster.forms) == 20
+    assert 'roster_page=2' in roster.previous_page_url()
+
+    roster = admin_client.get(url, {'roster_q': '60000007'}).context['inline_admin_formsets'][1].formset
+    assert [form.instance.user.username for form in roster.forms] == ["s0007"]
+
+@pytest.mark.django_db
+def test_roster_inline_add_and_remove_keep_enrolled_count(admin_client, section):
+    enrolled = make_students(3)
+    section.students.add(*enrolled)
+    new_student, = make_students(1, prefix="new", start=100)
+    url = reverse('admin:courses_section_change', args=[section.pk])
+
+    resp = admin_client.get(url)
+    _, roster_prefix, add_prefix = inline_prefixes(resp)
+    data = change_form_data(resp, **{
+        f'{roster_prefix}-0-DELETE': 'on',
+        f'{add_prefix}-TOTAL_FORMS': 1,
+        f'{add_prefix}-0-user': new_student.pk,
+        f'{add_prefix}-0-section': section.pk,
+    })
+    resp = admin_client.post(url, data)
+    assert resp.status_code == 302
+    section.refresh_from_db()
+    assert section.enrolled_count == 3
+    assert set(section.students.values_list('username', flat=True)) == {"s0001", "s0002", "new0000"}
+
+    # เกินความจุ: ไม่บันทึกและแสดงข้อผิดพลาด
+    Section.objects.filter(pk=section.pk).update(capacity=3)
+    late, = make_students(1, prefix="late", start=200)
+    resp = admin_client.get(url)
+    data = change_form_data(resp, **{
+        f'{add_prefix}-TOTAL_FORMS': 1,
+        f'{add_prefix}-0-user': late.pk,
+        f'{add_prefix}-0-section': section.pk,
+    })
+    resp = admin_client.post(url, data)
+    assert resp.status_code == 200
+    assert "เกินความจุของกลุ่มเรียน" in resp.content.decode()
+    assert Section.objects.get(pk=section.pk).enrolled_count == 3
@@ -0,0 +1,96 @@
+import pytest
+from datetime import date, time
+from django.contrib.auth.models import User
+from django.urls import reverse
+from users.models import Profile
+from courses.autocomplete import PAGE_SIZE
+from courses.forms import SectionForm
+from courses.models import ClassTime, Course, Department, Faculty, Room, Section, Semester
+
+@pytest.fixture
+def staff_client(client, db):
+    client.force_login(User.objects.create_user(username="staff", password="pass", is_staff=True))
+    return client
+
+@pytest.fixture
+def instructors(db):
+    faculty = Faculty.objects.create(name="วิทยาศาสตร์")
+    computer = Department.objects.create(name="วิทยาการคอมพิวเตอร์", faculty=faculty)
+    math = Department.objects.create(name="คณิตศาสตร์", faculty=faculty)
+    people = [
+        ("somchai", "สมชาย", "ใจดี", computer),
+        ("somsri", "สมศรี", "สอนเก่ง", math),
+        ("manee", "มานี", "มีนา", computer),
+    ]
+    users = []
+    for username, first_name, last_name, department in people:
+        user = User.objects.create(username=username)
+        Profile.objects.create(user=user, user_type='INSTRUCTOR', acdemic_title='LECTURER',
+                               first_name_th=first_name, last_name_th=last_name, department=department)
+        users.append(user)
+    student = User.objects.create(username="student")
+    Profile.objects.create(user=student, user_type='STUDENT', first_name_th="สมชาย", last_name_th="นิสิต")
+    return users
+
+def texts(resp):
+    return [item['text'] for item in resp.json()['results']]
+
+@pytest.mark.django_db
+def test_instructor_autocomplete_searches_thai_name_and_department(staff_client, instructors):
+    url = reverse('courses:instructor-autocomplete')
+    assert texts(staff_client.get(url, {'q': 'สมชาย'})) == ["อาจารย์ สมชาย ใจดี (วิทยาการคอมพิวเตอร์)"]
+    assert texts(staff_client.get(url, {'q': 'คอมพิวเตอร์'})) == [
+        "อาจารย์ มานี มีนา (วิทยาการคอมพิวเตอร์)",
+        "อาจารย์ สมชาย ใจดี (วิทยาการคอมพิวเตอร์)",
+    ]
+    # ทุกคำค้นต้องตรง
+    assert texts(staff_client.get(url, {'q': 'สม คณิต'})) == ["อาจารย์ สมศรี สอนเก่ง (คณิตศาสตร์)"]
+    assert len(texts(staff_client.get(url))) == 3
+
+@pytest.mark.django_db
+def test_autocomplete_is_paginated_and_staff_only(client, staff_client, django_assert_num_queries):
+    Room.objects.bulk_create([Room(building="A", room_number=f"{i:03d}") for i in range(PAGE_SIZE + 5)])
+    url = reverse('courses:room-autocomplete')
+    with django_assert_num_queries(3):  # session, ผู้ใช้ และคิวรีห้อง 1 ครั้ง
+        first = staff_client.get(url, {'q': 'A'}).json()
+    assert len(first['results']) == PAGE_SIZE and first['pagination']['more'] is True
+    second = staff_client.get(url, {'q': 'A', 'page': 2})
+    assert texts(second) == [f"A - ห้อง {i:03d}" for i in range(PAGE_SIZE, PAGE_SIZE + 5)]
+    assert second.json()['pagination']['more'] is False
+    assert texts(staff_client.get(url, {'q': 'A 001'})) == ["A - ห้อง 001"]
+
+    client.logout()
+    client.force_login(User.objects.create_user(username="plain", password="pass"))
+    assert client.get(url).status_code == 403
+
+@pytest.mark.django_db
+def test_room_autocomplete_marks_busy_rooms(staff_client):
+    semester = Semester.objects.create(year=2567, semester=1, start_date=date(2025, 6, 1), end_date=date(2025, 10, 1))
+    rooms = [Room.objects.create(building="B", room_number=str(101 + i)) for i in range(2)]
+    course = Course.objects.create(code="100001", name="Course", credits=3)
+    section = Section.objects.create(course=course, semester=semester, section_number="1", room=rooms[0], capacity=30)
+    ClassTime.objects.create(section=section, day='MON', start_time=time(8), end_time=time(10))
+    other = Section.objects.create(course=course, semester=semester, section_number="2", room=rooms[1], capacity=30)
+    ClassTime.objects.create(section=other, day='MON', start_time=time(9), end_time=time(10))
+
+    results = staff_client.get(reverse('courses:room-autocomplete'), {'section': section.pk}).json()['results']
+    assert [item.get('busy', False) for item in results] == [False, True]
+    assert results[1]['text'] == "B - ห้อง 102 (ไม่ว่างในเวลาเรียนของกลุ่มนี้)"
+
+@pytest.mark.django_db
+def test_section_form_renders_only_selected_instructors(instructors, django_assert_num_queries):
+    form = SectionForm(initial={'instructors': [instructors[1].pk]})
+    with django_assert_num_queries(1):
+        html = str(form['instructors'])
+    assert html.count('<option') == 1
+    assert "อาจารย์ สมศรี สอนเก่ง" in html and 'selected' in html
+    assert f'data-autocomplete-url="{reverse("courses:instructor-autocomplete")}"' in html
+
+    # ไม่มีค่าที่เลือกหรือค่าผิดรูปแบบ: ไม่คิวรีเลย
+    with django_assert_num_queries(0):
+        assert '<option' not in str(SectionForm(data={'instructors': ['abc']})['instructors'])
+
+    # ค่าที่เลือกยังถูกตรวจกับ queryset ทั้งหมดตอนบันทึก
+    form = SectionForm(data={'instructors': [instructors[0].pk]})
+    form.is_valid()
+    assert 'instructors' not in form.errors
@@ -0,0 +1,102 @@
+import json
+import pytest
+from datetime import date, time
+from django.contrib.auth.models import User
+from django.urls import reverse
+from users.models import Profile
+from courses.catalog import get_catalog_version
+from courses.models import ClassTime, Course, Room, Section, Semester
+
+@pytest.fixture
+def semester(db):
+    return Semester.objects.create(year=2567, semester=1, start_date=date(2025, 6, 1), end_date=date(2025, 10, 1))
+
+@pytest.fixture
+def section(db, semester):
+    course = Course.objects.create(code="100001", name="Programming", credits=3)
+    section = Section.objects.create(course=course, semester=semester, section_number="1",
+                                     room=Room.objects.create(building="A", room_number="101"), capacity=30)
+    ClassTime.objects.create(section=section, day='WED', start_time=time(13), end_time=time(15))
+    ClassTime.objects.create(section=section, day='MON', start_time=time(8), end_time=time(10))
+    teacher = User.objects.create_user(username="t1", password="pass")
+    Profile.objects.create(user=teacher, user_type='INSTRUCTOR', acdemic_title='LECTURER', name_title='DR',
+                           first_name_th="สมศรี", last_name_th="สอนดี")
+    section.instructors.add(teacher)
+    hidden = Course.objects.create(code="100002", name="Closed", credits=3, is_active=False)
+    Section.objects.create(course=hidden, semester=semester, section_number="1", capacity=30)
+    return section
+
+@pytest.mark.django_db
+def test_catalog_snapshot(client, semester, section):
+    resp = client.get(reverse('api:catalog', args=[semester.pk]))
+    assert resp.status_code == 200
+    assert resp['ETag'].startswith('"')
+    data = json.loads(resp.content)
+    assert data['semester']['id'] == semester.pk
+    assert data['sections'] == [{
+        'id': section.pk,
+        'course': {'code': "100001", 'name': "Programming", 'credits': 3},
+        'section_number': "1",
+        'capacity': 30,
+        'room': "A 101",
+        'instructors': ["อาจารย์ ดร. สมศรี สอนดี"],
+        'schedule': [{'day': 'MON', 'start': '08:00', 'end': '10:00'},
+                     {'day': 'WED', 'start': '13:00', 'end': '15:00'}],
+    }]
+
+@pytest.mark.django_db
+def test_catalog_conditional_get_without_queries(client, semester, section, django_assert_num_queries):
+    url = reverse('api:catalog', args=[semester.pk])
+    etag = client.get(url)['ETag']
+    with django_assert_num_queries(0):
+        resp = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert resp.status_code == 304
+        assert resp['ETag'] == etag
+        # snapshot ถูกเก็บไว้แล้ว client ใหม่ก็ไม่ต้องคิวรี
+        assert client.get(url).content
+
+@pytest.mark.django_db
+def test_catalog_rebuilt_on_change_but_not_on_enrollment(client, semester, section):
+    url = reverse('api:catalog', args=[semester.pk])
+    etag = client.get(url)['ETag']
+
+    student = User.objects.create_user(username="s1", password="pass")
+    section.students.add(student)
+    assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+    ClassTime.objects.filter(section=section, day='WED').get().delete()
+    resp = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert resp.status_code == 200 and resp['ETag'] != etag
+    assert len(json.loads(resp.content)['sections'][0]['schedule']) == 1
+
+@pytest.mark.django_db
+def test_catalog_rebuilt_on_instructor_profile_only(client, semester, section):
+    url = reverse('api:catalog', args=[semester.pk])
+    etag = client.get(url)['ETag']
+
+    # ETag มาจากเนื้อหา จึงต้องเทียบเวอร์ชันเพื่อรู้ว่า snapshot ไม่ถูกสร้างใหม่
+    version = get_catalog_version()
+    student = User.objects.create_user(username="s1", password="pass")
+    Profile.objects.create(user=student, user_type='STUDENT', student_id="65000001", first_name_th="นิสิต")
+    Profile.objects.filter(user=student).get().save()
+    assert get_catalog_version() == version
+
+    profile = Profile.objects.get(user__username="t1")
+    profile.first_name_th = "สมหญิง"
+    profile.save()
+    resp = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert resp.status_code == 200 and "สมหญิง" in resp.content.decode()
+
+@pytest.mark.django_db
+def test_catalog_seats(client, semester, section):
+    section.students.add(User.objects.create_user(username="s1", password="pass"))
+    url = reverse('api:catalog-seats', args=[semester.pk])
+    resp = client.get(url)
+    assert json.loads(resp.content)['seats'] == {str(section.pk): [1, 30]}
+    assert client.get(url, HTTP_IF_NONE_MATCH=resp['ETag']).status_code == 304
+
+@pytest.mark.django_db
+def test_catalog_current_and_missing_semester(client, section):
+    # ภาคเรียนใน fixture ไม่ครอบคลุมวันนี้
+    assert client.get(reverse('api:catalog-current')).status_code == 404
+    assert client.get(reverse('api:catalog', args=[999])).status_code == 404
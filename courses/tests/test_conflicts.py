@@ -0,0 +1,87 @@
+import pytest
+from datetime import date, time
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.urls import reverse
+from courses.conflicts import INSTRUCTOR, ROOM, SECTION, find_conflicts, find_conflicts_within
+from courses.models import ClassTime, Course, Room, Section, Semester
+
+@pytest.fixture
+def semester(db):
+    return Semester.objects.create(year=2567, semester=1, start_date=date(2025, 6, 1), end_date=date(2025, 10, 1))
+
+@pytest.fixture
+def rooms(db):
+    return Room.objects.create(building="A", room_number="101"), Room.objects.create(building="A", room_number="102")
+
+@pytest.fixture
+def teacher(db):
+    return User.objects.create_user(username="teacher", password="pass")
+
+def make_section(semester, room, code, instructors=()):
+    course = Course.objects.create(code=code, name=f"Course {code}", credits=3)
+    section = Section.objects.create(course=course, semester=semester, section_number="1", room=room, capacity=30)
+    section.instructors.set(instructors)
+    return section
+
+@pytest.mark.django_db
+def test_find_conflicts_returns_every_clash_in_one_query(semester, rooms, teacher, django_assert_num_queries):
+    target = make_section(semester, rooms[0], "100001", [teacher])
+    same_room = make_section(semester, rooms[0], "100002")
+    same_teacher = make_section(semester, rooms[1], "100003", [teacher])
+    unrelated = make_section(semester, rooms[1], "100004")
+    ClassTime.objects.create(section=target, day='MON', start_time=time(8), end_time=time(9))
+    ClassTime.objects.create(section=same_room, day='MON', start_time=time(9), end_time=time(11))
+    ClassTime.objects.create(section=same_teacher, day='MON', start_time=time(10), end_time=time(12))
+    ClassTime.objects.create(section=unrelated, day='MON', start_time=time(9), end_time=time(11))
+    # คาบที่ต่อกันพอดีและคาบคนละวันไม่ถือว่าชน
+    ClassTime.objects.create(section=same_room, day='MON', start_time=time(11), end_time=time(12))
+    ClassTime.objects.create(section=same_teacher, day='TUE', start_time=time(9), end_time=time(11))
+
+    with django_assert_num_queries(1):
+        conflicts = find_conflicts(target, 'MON', time(8, 30), time(11))
+        kinds = [(c.kind, c.class_time.section.course.code) for c in conflicts]
+        messages = [c.message for c in conflicts]
+    assert kinds == [(SECTION, "100001"), (ROOM, "100002"), (INSTRUCTOR, "100003")]
+    assert "100002" in messages[1]
+
+@pytest.mark.django_db
+def test_find_conflicts_ignores_other_semesters(semester, rooms, teacher):
+    other = Semester.objects.create(year=2567, semester=2, start_date=date(2025, 11, 1), end_date=date(2026, 3, 1))
+    target = make_section(semester, rooms[0], "100001", [teacher])
+    elsewhere = make_section(other, rooms[0], "100002", [teacher])
+    ClassTime.objects.create(section=elsewhere, day='MON', start_time=time(8), end_time=time(10))
+    assert find_conflicts(target, 'MON', time(8), time(10)) == []
+
+@pytest.mark.django_db
+def test_classtime_clean_reports_all_conflicts(semester, rooms, teacher):
+    target = make_section(semester, rooms[0], "100001", [teacher])
+    busy = make_section(semester, rooms[0], "100002", [teacher])
+    ClassTime.objects.create(section=busy, day='WED', start_time=time(13), end_time=time(15))
+    with pytest.raises(ValidationError) as excinfo:
+        ClassTime(section=target, day='WED', start_time=time(14), end_time=time(16)).full_clean()
+    assert len(excinfo.value.messages) == 2
+
+@pytest.mark.django_db
+def test_time_add_view_rejects_room_clash(client, semester, rooms):
+    staff = User.objects.create_user(username="staff", password="pass", is_staff=True)
+    client.force_login(staff)
+    target = make_section(semester, rooms[0], "100001")
+    busy = make_section(semester, rooms[0], "100002")
+    ClassTime.objects.create(section=busy, day='FRI', start_time=time(8), end_time=time(10))
+    url = reverse('courses:time-add', kwargs={'section_pk': target.pk})
+    resp = client.post(url, {'day': 'FRI', 'start_time': '09:00', 'end_time': '11:00'})
+    assert resp.status_code == 200
+    assert resp.context['form'].non_field_errors()
+    resp = client.post(url, {'day': 'FRI', 'start_time': '10:00', 'end_time': '12:00'})
+    assert resp.status_code == 302
+    assert target.class_times.count() == 1
+
+def test_find_conflicts_within_submitted_rows():
+    slots = [
+        ('MON', time(8), time(10)),
+        ('MON', time(10), time(12)),
+        ('TUE', time(8), time(10)),
+        ('MON', time(9), time(11)),
+    ]
+    assert find_conflicts_within(slots) == [(0, 3), (1, 3)]
@@ -0,0 +1,295 @@
+import pytest
+from importlib import import_module
+from django.apps import apps
+from concurrent.futures import ThreadPoolExecutor
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import IntegrityError, connection
+from django.urls import reverse
+from courses.models import ClassTime, Course, Section, Semester, Room, Department, Faculty
+from courses.enrollment import EnrollmentStatus, enroll_many, enroll_student
+from courses.timetable import mask_from_bytes, slot_mask
+from datetime import date, time
+
+@pytest.fixture
+def department(db):
+    faculty = Faculty.objects.create(name="วิทยาศาสตร์")
+    return Department.objects.create(name="คอมพิวเตอร์", faculty=faculty)
+
+@pytest.fixture
+def semester(db):
+    return Semester.objects.create(
+        year=2567, semester=1,
+        start_date=date(2025, 6, 1), end_date=date(2025, 10, 1)
+    )
+
+@pytest.fixture
+def course(db, department):
+    return Course.objects.create(code="101154", name="Programming", department=department, credits=3)
+
+@pytest.fixture
+def section(db, course, semester):
+    room = Room.objects.create(building="A", room_number="101")
+    return Section.objects.create(course=course, section_number="1", semester=semester, room=room, capacity=2)
+
+@pytest.fixture
+def student(db):
+    return User.objects.create_user(username="student", password="pass123")
+
+@pytest.mark.django_db
+def test_enroll_student_ok(student, section):
+    result = enroll_student(student, section.pk)
+    assert result.ok
+    assert result.status == EnrollmentStatus.OK
+    assert section.students.filter(pk=student.pk).exists()
+
+@pytest.mark.django_db
+def test_enroll_student_already_enrolled(student, section):
+    enroll_student(student, section.pk)
+    result = enroll_student(student, section.pk)
+    assert result.status == EnrollmentStatus.ALREADY_ENROLLED
+    assert section.students.count() == 1
+
+@pytest.mark.django_db
+def test_enroll_student_duplicate_course(student, section, course, semester):
+    other = Section.objects.create(course=course, section_number="2", semester=semester, capacity=2)
+    enroll_student(student, section.pk)
+    result = enroll_student(student, other.pk)
+    assert result.status == EnrollmentStatus.DUPLICATE_COURSE
+    assert not other.students.exists()
+
+@pytest.mark.django_db
+def test_enroll_student_full(student, section):
+    for i in range(section.capacity):
+        section.students.add(User.objects.create_user(username=f"s{i}", password="pass"))
+    result = enroll_student(student, section.pk)
+    assert result.status == EnrollmentStatus.FULL
+    assert not section.students.filter(pk=student.pk).exists()
+
+@pytest.mark.django_db
+def test_enroll_student_missing_section(student):
+    with pytest.raises(Section.DoesNotExist):
+        enroll_student(student, 9999)
+
+@pytest.mark.django_db(transaction=True)
+def test_enroll_student_concurrent_no_overbooking(section):
+    # นิสิตจำนวนมากแย่งกันลงทะเบียนกลุ่มเรียนเดียวกันพร้อมกัน ต้องไม่เกินจำนวนที่รับ
+    section.capacity = 5
+    section.save()
+    students = [User.objects.create_user(username=f"rush{i}", password="pass") for i in range(24)]
+
+    def attempt(student):
+        try:
+            return enroll_student(student, section.pk, max_retries=50).status
+        finally:
+            connection.close()
+
+    with ThreadPoolExecutor(max_workers=12) as pool:
+        statuses = list(pool.map(attempt, students))
+
+    assert statuses.count(EnrollmentStatus.OK) == 5
+    assert statuses.count(EnrollmentStatus.FULL) == len(students) - 5
+    assert section.students.count() == 5
+
+@pytest.mark.django_db
+def test_enrolled_count_follows_m2m_changes(student, section):
+    other = User.objects.create_user(username="other", password="pass")
+    section.students.add(student, other)
+    assert section.enrolled_count == 2
+    section.students.remove(other)
+    assert section.enrolled_count == 1
+    # แก้จากฝั่ง User ก็ต้องอัปเดตด้วย
+    student.enrolled_sections.clear()
+    section.refresh_from_db()
+    assert section.enrolled_count == 0
+    assert not section.is_full()
+    assert section.available_seats == section.capacity
+
+@pytest.mark.django_db
+def test_enrolled_count_not_overwritten_by_stale_save(student, section):
+    stale = Section.objects.get(pk=section.pk)
+    enroll_student(student, section.pk)
+    stale.capacity = 10
+    stale.save()
+    section.refresh_from_db()
+    assert section.enrolled_count == 1
+    assert section.capacity == 10
+
+@pytest.mark.django_db
+def test_enrolled_count_check_constraint(section):
+    with pytest.raises(IntegrityError):
+        Section.objects.filter(pk=section.pk).update(enrolled_count=section.capacity + 1)
+
+@pytest.mark.django_db
+def test_reconcile_enrollment_counts(student, section):
+    section.students.add(student)
+    Section.objects.filter(pk=section.pk).update(enrolled_count=0)
+    call_command('reconcile_enrollment_counts')
+    section.refresh_from_db()
+    assert section.enrolled_count == 1
+
+def test_slot_mask_rounds_to_quarter_hours():
+    # 08:10-09:05 ครอบคลุมช่อง 08:00-09:15 และคาบที่ต่อกันพอดีไม่ทับกัน
+    assert slot_mask('MON', time(8, 10), time(9, 5)) == slot_mask('MON', time(8), time(9, 15))
+    assert not slot_mask('MON', time(8), time(10)) & slot_mask('MON', time(10), time(12))
+    assert not slot_mask('MON', time(8), time(10)) & slot_mask('TUE', time(8), time(10))
+    assert slot_mask('SUN', time(23), time(23, 59)).bit_length() == 7 * 96
+
+@pytest.mark.django_db
+def test_schedule_mask_follows_class_times(section):
+    class_time = ClassTime.objects.create(section=section, day='MON', start_time=time(8), end_time=time(10))
+    section.refresh_from_db()
+    assert mask_from_bytes(section.schedule_mask) == slot_mask('MON', time(8), time(10))
+    class_time.day = 'TUE'
+    class_time.save()
+    section.refresh_from_db()
+    assert mask_from_bytes(section.schedule_mask) == slot_mask('TUE', time(8), time(10))
+    class_time.delete()
+    section.refresh_from_db()
+    assert mask_from_bytes(section.schedule_mask) == 0
+    # บันทึก Section ที่ค้างค่าเก่าไว้ต้องไม่เขียนทับ bitmask
+    ClassTime.objects.create(section=section, day='WED', start_time=time(8), end_time=time(10))
+    section.capacity = 3
+    section.save()
+    section.refresh_from_db()
+    assert mask_from_bytes(section.schedule_mask) == slot_mask('WED', time(8), time(10))
+
+@pytest.mark.django_db
+def test_enroll_student_time_clash(student, section, semester, department):
+    other_course = Course.objects.create(code="101155", name="Data Structures", department=department, credits=3)
+    clashing = Section.objects.create(course=other_course, section_number="1", semester=semester, capacity=5)
+    free = Section.objects.create(course=other_course, section_number="2", semester=semester, capacity=5)
+    ClassTime.objects.create(section=section, day='MON', start_time=time(8), end_time=time(10))
+    ClassTime.objects.create(section=clashing, day='MON', start_time=time(9), end_time=time(11))
+    ClassTime.objects.create(section=free, day='MON', start_time=time(10), end_time=time(12))
+
+    assert enroll_student(student, section.pk).ok
+    result = enroll_student(student, clashing.pk)
+    assert result.status == EnrollmentStatus.TIME_CLASH
+    assert result.clash_with == section
+    assert not clashing.students.exists()
+    assert enroll_student(student, free.pk).ok
+
+@pytest.mark.django_db
+def test_back_to_back_off_grid_class_times_do_not_clash(student, section, semester, department):
+    # 09:50 อยู่กลางช่อง 15 นาที bitmask ของสองคาบจึงมีบิตร่วมกัน แต่เวลาจริงไม่ทับกัน
+    ClassTime.objects.create(section=section, day='MON', start_time=time(8), end_time=time(9, 50))
+    other_course = Course.objects.create(code="101155", name="Data Structures", department=department, credits=3)
+    next_class = Section.objects.create(course=other_course, section_number="1", semester=semester, capacity=5)
+    ClassTime.objects.create(section=next_class, day='MON', start_time=time(9, 50), end_time=time(11))
+    overlapping = Section.objects.create(course=other_course, section_number="2", semester=semester, capacity=5)
+    ClassTime.objects.create(section=overlapping, day='MON', start_time=time(9, 45), end_time=time(11))
+
+    assert enroll_student(student, section.pk).ok
+    assert enroll_student(student, overlapping.pk).status == EnrollmentStatus.TIME_CLASH
+    assert enroll_student(student, next_class.pk).ok
+
+    other = User.objects.create_user(username="other", password="pass")
+    result = enroll_many(other, [section.pk, next_class.pk])
+    assert result.committed
+
+@pytest.mark.django_db
+def test_moving_class_time_rebuilds_both_schedule_masks(section, semester):
+    other = Section.objects.create(course=section.course, section_number="2", semester=semester, capacity=5)
+    class_time = ClassTime.objects.create(section=section, day='MON', start_time=time(8), end_time=time(10))
+    class_time = ClassTime.objects.get(pk=class_time.pk)
+    class_time.section = other
+    class_time.save()
+    section.refresh_from_db()
+    other.refresh_from_db()
+    assert mask_from_bytes(section.schedule_mask) == 0
+    assert mask_from_bytes(other.schedule_mask) == slot_mask('MON', time(8), time(10))
+
+@pytest.fixture
+def cart_sections(db, semester, department):
+    sections = []
+    for i, (day, start, end) in enumerate([('MON', 8, 10), ('TUE', 8, 10), ('MON', 9, 11)]):
+        course = Course.objects.create(code=f"20000{i}", name=f"Course {i}", department=department, credits=3)
+        section = Section.objects.create(course=course, section_number="1", semester=semester, capacity=1)
+        ClassTime.objects.create(section=section, day=day, start_time=time(start), end_time=time(end))
+        sections.append(section)
+    return sections
+
+@pytest.mark.django_db
+def test_enroll_many_all_or_nothing(student, cart_sections, django_assert_max_num_queries):
+    first, second, clashing = cart_sections
+    with django_assert_max_num_queries(6):
+        result = enroll_many(student, [first.pk, second.pk, clashing.pk, 999999])
+    assert not result.committed
+    assert [item.status for item in result.items] == [
+        EnrollmentStatus.OK, EnrollmentStatus.OK, EnrollmentStatus.TIME_CLASH, EnrollmentStatus.NOT_FOUND,
+    ]
+    assert result.items[2].clash_with == first
+    assert result.enrolled == []
+    assert not Section.students.through.objects.exists()
+
+@pytest.mark.django_db
+def test_enroll_many_best_effort(student, cart_sections):
+    first, second, clashing = cart_sections
+    other = User.objects.create_user(username="other", password="pass")
+    enroll_student(other, second.pk)
+    result = enroll_many(student, [first.pk, second.pk, clashing.pk], all_or_nothing=False)
+    assert result.committed
+    assert [item.status for item in result.items] == [
+        EnrollmentStatus.OK, EnrollmentStatus.FULL, EnrollmentStatus.TIME_CLASH,
+    ]
+    assert result.enrolled == [first]
+    first.refresh_from_db()
+    assert first.enrolled_count == 1
+    assert list(student.enrolled_sections.all()) == [first]
+
+@pytest.mark.django_db
+def test_enroll_many_query_count_is_constant(student, semester, department, django_assert_max_num_queries):
+    sections = []
+    for i in range(12):
+        course = Course.objects.create(code=f"30000{i:02d}", name=f"Course {i}", department=department, credits=3)
+        sections.append(Section.objects.create(course=course, section_number="1", semester=semester, capacity=5))
+    with django_assert_max_num_queries(7):
+        result = enroll_many(student, [section.pk for section in sections])
+    assert result.committed and len(result.enrolled) == 12
+
+@pytest.mark.django_db
+def test_cart_checkout_view(client, student, cart_sections):
+    first, second, _ = cart_sections
+    client.force_login(student)
+    for section in (first, second):
+        client.post(reverse('courses:cart-add', args=[section.pk]))
+    assert client.get(reverse('courses:cart')).context['total_credits'] == 6
+    resp = client.post(reverse('courses:cart-checkout'), {'mode': 'all'})
+    assert resp.status_code == 302
+    assert resp.url == reverse('courses:my-schedule')
+    assert set(student.enrolled_sections.all()) == {first, second}
+    assert client.session['enrollment_cart'] == []
+
+@pytest.mark.django_db
+def test_cart_checkout_reports_busy_after_retries(client, student, cart_sections, monkeypatch):
+    from courses import enrollment
+
+    def always_conflict(*args):
+        raise enrollment._BatchConflict
+
+    monkeypatch.setattr(enrollment, '_claim_seats', always_conflict)
+    monkeypatch.setattr(enrollment.time, 'sleep', lambda seconds: None)
+    first, _, _ = cart_sections
+    assert enroll_many(student, [first.pk], max_retries=2).status == EnrollmentStatus.BUSY
+
+    client.force_login(student)
+    client.post(reverse('courses:cart-add', args=[first.pk]))
+    resp = client.post(reverse('courses:cart-checkout'), {'mode': 'all'}, follow=True)
+    assert resp.redirect_chain[-1][0] == reverse('courses:cart')
+    assert EnrollmentStatus.BUSY.label in resp.content.decode()
+    assert client.session['enrollment_cart'] == [first.pk]
+
+@pytest.mark.django_db
+def test_enrolled_count_migration_stops_on_overbooked_sections(section):
+    # ข้อมูลเก่าที่เพิ่มตรงลงตารางความสัมพันธ์ (ไม่ผ่าน signal) ลงทะเบียนเกินจำนวนที่รับ
+    migration = import_module('courses.migrations.0007_section_enrolled_count')
+    migration.check_overbooked_sections(apps, None)
+    Enrollment = Section.students.through
+    Enrollment.objects.bulk_create([
+        Enrollment(section=section, user=User.objects.create_user(username=f"old{i}")) for i in range(3)
+    ])
+    with pytest.raises(RuntimeError, match="Section .*101154 กลุ่ม 1.*จำนวนที่รับ 2 ลงทะเบียนแล้ว 3"):
+        migration.check_overbooked_sections(apps, None)
+    section.refresh_from_db()
+    assert section.capacity == 2
@@ -0,0 +1,91 @@
+import csv
+import io
+import pytest
+from datetime import date, time
+from django.contrib.auth.models import User
+from django.urls import reverse
+from users.models import Profile
+from courses.models import Branch, ClassTime, Course, Department, Faculty, Room, Section, Semester
+
+@pytest.fixture
+def semester(db):
+    return Semester.objects.create(year=2567, semester=1, start_date=date(2025, 6, 1), end_date=date(2025, 10, 1))
+
+@pytest.fixture
+def sections(db, semester):
+    room = Room.objects.create(building="A", room_number="101")
+    course = Course.objects.create(code="100001", name="Programming", credits=3)
+    first = Section.objects.create(course=course, semester=semester, section_number="1", room=room, capacity=30)
+    second = Section.objects.create(course=course, semester=semester, section_number="2", capacity=30)
+    ClassTime.objects.create(section=first, day='WED', start_time=time(13), end_time=time(15))
+    ClassTime.objects.create(section=first, day='MON', start_time=time(8), end_time=time(10))
+    other = Course.objects.create(code="100002", name="Data", credits=3)
+    third = Section.objects.create(course=other, semester=semester, section_number="1", capacity=30)
+    return first, second, third
+
+@pytest.fixture
+def students(db, sections):
+    faculty = Faculty.objects.create(name="วิทยาศาสตร์")
+    branch = Branch.objects.create(name="วิทยาการคอมพิวเตอร์", department=Department.objects.create(name="คอมพิวเตอร์", faculty=faculty))
+    result = []
+    for i, (first_name, last_name) in enumerate([("สมชาย", "ใจดี"), ("", "")]):
+        user = User.objects.create_user(username=f"s{i}", password="pass", first_name="Sam" if not first_name else "")
+        Profile.objects.create(user=user, user_type='STUDENT', student_id=f"6500000{i}", branch=branch,
+                               name_title='MR', first_name_th=first_name, last_name_th=last_name)
+        result.append(user)
+    first, second, third = sections
+    first.students.add(*result)
+    second.students.add(result[0])
+    third.students.add(result[1])
+    return result
+
+@pytest.fixture
+def staff_client(client, db):
+    client.force_login(User.objects.create_user(username="staff", password="pass", is_staff=True))
+    return client
+
+def read_csv(resp):
+    assert resp.streaming
+    content = b"".join(resp.streaming_content).decode("utf-8")
+    assert content.startswith("﻿")
+    return list(csv.reader(io.StringIO(content[1:])))
+
+@pytest.mark.django_db
+def test_section_roster_csv(staff_client, sections, students):
+    resp = staff_client.get(reverse('courses:section-roster-export', args=[sections[0].pk]))
+    assert resp.status_code == 200
+    assert 'roster_100001_2567-1_sec1.csv' in resp['Content-Disposition']
+    rows = read_csv(resp)
+    assert rows[0][0] == "รหัสนิสิต"
+    assert rows[1:] == [
+        ["65000000", "นาย สมชาย ใจดี", "วิทยาการคอมพิวเตอร์", "2567/1", "100001", "Programming", "1", "A 101",
+         "จ. 08:00-10:00, พ. 13:00-15:00"],
+        ["65000001", "Sam", "วิทยาการคอมพิวเตอร์", "2567/1", "100001", "Programming", "1", "A 101",
+         "จ. 08:00-10:00, พ. 13:00-15:00"],
+    ]
+
+@pytest.mark.django_db
+def test_course_and_semester_roster(staff_client, semester, sections, students):
+    rows = read_csv(staff_client.get(reverse('courses:course-roster-export', args=[sections[0].course_id]),
+                                     {'semester': semester.pk}))
+    assert [(row[0], row[6]) for row in rows[1:]] == [("65000000", "1"), ("65000001", "1"), ("65000000", "2")]
+
+    rows = read_csv(staff_client.get(reverse('courses:semester-roster-export', args=[semester.pk])))
+    assert [(row[4], row[6]) for row in rows[1:]] == [("100001", "1"), ("100001", "1"), ("100001", "2"), ("100002", "1")]
+
+@pytest.mark.django_db
+def test_roster_export_query_count(staff_client, semester, sections, students, django_assert_max_num_queries):
+    url = reverse('courses:semester-roster-export', args=[semester.pk])
+    with django_assert_max_num_queries(6):
+        resp = staff_client.get(url)
+        read_csv(resp)
+
+@pytest.mark.django_db
+def test_roster_export_requires_staff(client, sections):
+    client.force_login(User.objects.create_user(username="u", password="pass"))
+    assert client.get(reverse('courses:section-roster-export', args=[sections[0].pk])).status_code == 403
+
+@pytest.mark.django_db
+def test_roster_export_unknown_format(staff_client, sections):
+    resp = staff_client.get(reverse('courses:section-roster-export', args=[sections[0].pk]), {'format': 'pdf'})
+    assert resp.status_code == 404
@@ -0,0 +1,86 @@
+import pytest
+from datetime import date, time
+from django.contrib.auth.models import User
+from django.urls import reverse
+from django.utils import timezone
+from users.models import Profile
+from courses.fragments import fragment_stats, reset_fragment_stats
+from courses.models import ClassTime, Course, Room, Section, Semester
+
+@pytest.fixture
+def section(db):
+    today = timezone.localdate()
+    semester = Semester.objects.create(year=2567, semester=1, start_date=date(today.year - 1, 1, 1),
+                                       end_date=date(today.year + 1, 12, 31))
+    course = Course.objects.create(code="100001", name="Programming", credits=3)
+    section = Section.objects.create(course=course, semester=semester, section_number="1",
+                                     room=Room.objects.create(building="A", room_number="101"), capacity=30)
+    ClassTime.objects.create(section=section, day='MON', start_time=time(8), end_time=time(10))
+    teacher = User.objects.create_user(username="t1", password="pass")
+    Profile.objects.create(user=teacher, user_type='INSTRUCTOR', acdemic_title='LECTURER',
+                           first_name_th="สมศรี", last_name_th="สอนดี")
+    section.instructors.add(teacher)
+    return section
+
+@pytest.fixture
+def student_client(client, db):
+    client.force_login(User.objects.create_user(username="s1", password="pass"))
+    return client
+
+@pytest.fixture(autouse=True)
+def _reset_stats():
+    reset_fragment_stats()
+
+def page(client):
+    return client.get(reverse('courses:public-section-list')).content.decode()
+
+@pytest.mark.django_db
+def test_section_row_cached(student_client, section, django_assert_num_queries):
+    first = page(student_client)
+    assert "สมศรี สอนดี" in first and "08:00 - 10:00" in first
+    assert fragment_stats()['misses'] == 1
+
+    # cache hit: ไม่ต้องดึงคาบเรียนและผู้สอน แต่ที่นั่งคงเหลือยังเป็นค่าล่าสุด
+    Section.objects.filter(pk=section.pk).update(enrolled_count=5)
+    with django_assert_num_queries(6):
+        second = page(student_client)
+    assert "25 / 30" in second
+    stats = fragment_stats()
+    assert (stats['hits'], stats['misses'], stats['hit_ratio']) == (1, 1, 0.5)
+
+@pytest.mark.django_db
+def test_section_row_invalidated_on_change(student_client, section):
+    page(student_client)
+    class_time = section.class_times.get()
+    class_time.start_time, class_time.end_time = time(13), time(15)
+    class_time.save()
+    assert "13:00 - 15:00" in page(student_client)
+
+    profile = Profile.objects.get(user__username="t1")
+    profile.first_name_th = "สมหญิง"
+    profile.save()
+    assert "สมหญิง สอนดี" in page(student_client)
+
+    room = section.room
+    room.room_number = "202"
+    room.save()
+    assert "ห้อง 202" in page(student_client)
+
+    section.instructors.clear()
+    assert "สมหญิง" not in page(student_client)
+    assert fragment_stats()['hits'] == 0
+
+@pytest.mark.django_db
+def test_section_save_keeps_bumped_version(section):
+    stale = Section.objects.get(pk=section.pk)
+    ClassTime.objects.create(section=section, day='TUE', start_time=time(8), end_time=time(10))
+    stale.capacity = 40
+    stale.save()
+    # บันทึกจาก instance เก่าต้องไม่ย้อน render_version กลับไปเป็นค่าที่เคยใช้แล้ว
+    assert Section.objects.get(pk=section.pk).render_version == stale.render_version + 2
+
+@pytest.mark.django_db
+def test_fragment_metrics_requires_staff(student_client, client):
+    assert student_client.get(reverse('courses:fragment-metrics')).status_code == 403
+    client.force_login(User.objects.create_user(username="staff", password="pass", is_staff=True))
+    assert client.get(reverse('courses:fragment-metrics')).json()['section_rows']['hits'] == 0
@@ -0,0 +1,147 @@
+import io
+import pytest
+from datetime import date, time
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.urls import reverse
+from users.models import Profile
+from courses.enrollment import sync_enrolled_counts
+from courses.importer import CatalogImporter, ImportFormatError, import_catalog, read_csv
+from courses.models import ClassTime, Course, Department, Faculty, Room, Section, Semester
+from courses.timetable import build_mask, mask_from_bytes
+
+HEADER = "course_code,course_name,credits,department,description,semester,section_number,capacity,building,room_number,instructors,day,start_time,end_time\n"
+
+@pytest.fixture
+def catalog(db):
+    faculty = Faculty.objects.create(name="วิทยาศาสตร์")
+    Department.objects.create(name="คอมพิวเตอร์", faculty=faculty)
+    Semester.objects.create(year=2567, semester=1, start_date=date(2025, 6, 1), end_date=date(2025, 10, 1))
+    Room.objects.create(building="A", room_number="101")
+    user = User.objects.create_user(username="t1", password="pass")
+    Profile.objects.create(user=user, user_type='INSTRUCTOR')
+    return user
+
+def csv_file(*lines):
+    return io.BytesIO(("﻿" + HEADER + "".join(line + "\n" for line in lines)).encode("utf-8"))
+
+ROWS = (
+    "100001,Programming,3,คอมพิวเตอร์,Intro,2567/1,1,40,A,101,t1,MON,08:00,10:00",
+    "100001,Programming,3,คอมพิวเตอร์,Intro,2567/1,1,40,A,101,t1,วันพุธ,08:00,10:00",
+    "100001,Programming,3,คอมพิวเตอร์,Intro,2567/1,2,40,,,,TUE,13:00,15:00",
+    "100002,Data,3,,,2567/1,1,30,,,,,,",
+)
+
+@pytest.mark.django_db
+def test_import_creates_catalog(catalog):
+    report = import_catalog(csv_file(*ROWS), "catalog.csv", chunk_size=2)
+    assert (report.rows, report.error_count) == (4, 0)
+    assert (report.courses_created, report.sections_created, report.class_times_created) == (2, 3, 3)
+
+    section = Section.objects.get(course__code="100001", section_number="1")
+    assert section.capacity == 40 and section.room.room_number == "101"
+    assert list(section.instructors.all()) == [catalog]
+    assert sorted(section.class_times.values_list('day', flat=True)) == ['MON', 'WED']
+    # bulk_create ไม่ส่ง signal จึงต้องคำนวณ bitmask ตารางเรียนให้ด้วย
+    assert mask_from_bytes(section.schedule_mask) == build_mask(
+        [('MON', time(8), time(10)), ('WED', time(8), time(10))]
+    )
+    assert Course.objects.get(code="100001").search_text == "100001 programming intro"
+
+@pytest.mark.django_db
+def test_import_reports_row_errors_and_skips_duplicates(catalog):
+    import_catalog(csv_file(*ROWS), "catalog.csv")
+    report = import_catalog(csv_file(
+        *ROWS,
+        "12345,Bad code,3,,,2567/1,1,30,,,,,,",
+        "100003,Course,3,ไม่มีภาค,,2567/1,1,30,,,,,,",
+        "100004,Course,3,,,2599/1,1,30,,,,,,",
+        "100005,Course,3,,,2567/1,1,300,,,,,,",
+        "100006,Course,3,,,2567/1,1,30,B,999,,,,",
+        "100007,Course,3,,,2567/1,1,30,,,nobody,,,",
+        "100008,Course,3,,,2567/1,1,30,,,,MON,10:00,09:00",
+        "100009,Course,3,,,2567/1,1,30,,,,MON,08:00,11:00",
+    ), "catalog.csv")
+    assert report.error_count == 8
+    assert [line for line, _ in report.errors] == [6, 7, 8, 9, 10, 11, 12, 13]
+    assert "รหัสวิชาต้องเป็นตัวเลข 6 หลัก" in report.errors[0][1]
+    assert "ไม่เกิน 2 ชั่วโมง" in report.errors[-1][1]
+    # แถวเดิมไม่ถูกเพิ่มซ้ำ และแถวที่ผิดไม่ถูกบันทึก
+    assert (report.courses_created, report.sections_created, report.class_times_created) == (0, 0, 0)
+    assert Course.objects.count() == 2 and ClassTime.objects.count() == 3
+
+@pytest.mark.django_db
+def test_import_update_and_dry_run(catalog):
+    import_catalog(csv_file(*ROWS), "catalog.csv")
+    changed = "100001,Programming I,4,,,2567/1,1,50,,,,MON,08:00,10:00"
+
+    report = import_catalog(csv_file(changed), "catalog.csv", update=True, dry_run=True)
+    assert (report.courses_updated, report.sections_updated) == (1, 1)
+    assert Course.objects.get(code="100001").name == "Programming"
+
+    import_catalog(csv_file(changed), "catalog.csv", update=True)
+    course = Course.objects.get(code="100001")
+    assert (course.name, course.credits, course.department) == ("Programming I", 4, None)
+    assert Section.objects.get(course=course, section_number="1").capacity == 50
+
+@pytest.mark.django_db
+def test_import_commits_each_chunk(catalog):
+    def rows():
+        yield from read_csv(csv_file(*ROWS[:2]))
+        raise OSError("อ่านไฟล์ไม่สำเร็จ")
+
+    # chunk ที่เขียนแล้วยังอยู่แม้แถวถัดไปจะอ่านไม่ได้ แต่ dry_run ไม่บันทึกอะไรเลย
+    with pytest.raises(OSError):
+        CatalogImporter(chunk_size=1, dry_run=True).run(rows())
+    assert not Course.objects.exists()
+    with pytest.raises(OSError):
+        CatalogImporter(chunk_size=1).run(rows())
+    assert ClassTime.objects.filter(section__course__code="100001").count() == 2
+
+@pytest.mark.django_db
+def test_import_update_keeps_enrolled_students_and_blank_columns(catalog):
+    import_catalog(csv_file(*ROWS), "catalog.csv")
+    section = Section.objects.get(course__code="100001", section_number="1")
+    for i in range(5):
+        student = User.objects.create_user(username=f"s{i}")
+        Profile.objects.create(user=student, user_type='STUDENT', student_id=f"6500000{i}")
+        section.students.add(student)
+    sync_enrolled_counts()
+
+    report = import_catalog(csv_file("100001,Programming,3,คอมพิวเตอร์,Intro,2567/1,1,2,A,101,t1,,,"),
+                            "catalog.csv", update=True)
+    assert report.errors == [(2, "จำนวนที่รับต้องไม่น้อยกว่าจำนวนที่ลงทะเบียนแล้ว")]
+    # คอลัมน์ห้องที่เว้นว่างไม่ลบห้องเดิมของกลุ่มเรียน
+    report = import_catalog(csv_file("100001,Programming,3,คอมพิวเตอร์,Intro,2567/1,1,45,,,,,,"),
+                            "catalog.csv", update=True)
+    section.refresh_from_db()
+    assert (report.error_count, section.capacity, section.room.room_number) == (0, 45, "101")
+
+@pytest.mark.django_db
+def test_import_queries_do_not_grow_with_rows(catalog, django_assert_max_num_queries):
+    rows = [f"{100100 + i},Course {i},3,,,2567/1,1,30,,,,MON,08:00,09:00" for i in range(200)]
+    with django_assert_max_num_queries(30):
+        report = CatalogImporter(chunk_size=500).run(read_csv(csv_file(*rows)))
+    assert report.class_times_created == 200
+
+def test_missing_columns():
+    with pytest.raises(ImportFormatError):
+        list(read_csv(io.BytesIO(b"name,credits\nx,3\n")))
+
+@pytest.mark.django_db
+def test_import_command_and_view(catalog, client, tmp_path):
+    path = tmp_path / "catalog.csv"
+    path.write_bytes(csv_file(*ROWS).getvalue())
+    out = io.StringIO()
+    call_command("import_catalog", str(path), "--dry-run", stdout=out)
+    assert "อ่าน 4 แถว" in out.getvalue()
+    assert not Course.objects.exists()
+
+    staff = User.objects.create_user(username="staff", password="pass", is_staff=True)
+    client.force_login(staff)
+    upload = SimpleUploadedFile("catalog.csv", csv_file(*ROWS).getvalue(), content_type="text/csv")
+    resp = client.post(reverse('courses:catalog-import'), {'file': upload})
+    assert resp.status_code == 200
+    assert resp.context['report'].sections_created == 3
+    assert Course.objects.count() == 2
@@ -0,0 +1,69 @@
+import pytest
+from datetime import date, time
+from django.contrib.auth.models import User
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.urls import reverse
+from users.models import Profile
+from courses.forms import SectionForm
+from courses.models import ClassTime, Course, Section, Semester
+
+def make_instructor(username, **names):
+    user = User.objects.create(username=username)
+    Profile.objects.create(user=user, user_type='INSTRUCTOR', **names)
+    return user
+
+@pytest.mark.django_db
+def test_profile_display_name_maintained_on_save():
+    user = make_instructor("t1", acdemic_title='ASSISTANT_PROFESSOR', name_title='DR',
+                           first_name_th="สมศรี", last_name_th="สอนดี")
+    profile = user.profile
+    assert profile.display_name == "ผู้ช่วยศาสตราจารย์ ดร. สมศรี สอนดี"
+
+    profile.acdemic_title = None
+    profile.first_name_th = "สมหญิง"
+    profile.save(update_fields=['acdemic_title', 'first_name_th'])
+    assert Profile.objects.get(pk=profile.pk).display_name == "ดร. สมหญิง สอนดี"
+
+    assert make_instructor("t2").profile.display_name == ""
+
+@pytest.fixture
+def course_with_instructors(db):
+    semester = Semester.objects.create(year=2567, semester=1, start_date=date(2025, 6, 1), end_date=date(2025, 10, 1))
+    course = Course.objects.create(code="100001", name="Programming", credits=3)
+
+    def add_sections(count):
+        start = course.sections.count()
+        for i in range(start, start + count):
+            section = Section.objects.create(course=course, semester=semester, section_number=str(i + 1), capacity=30)
+            ClassTime.objects.create(section=section, day='MON', start_time=time(8), end_time=time(9))
+            section.instructors.add(*[
+                make_instructor(f"t{i}-{k}", acdemic_title='LECTURER', first_name_th="ครู", last_name_th=f"คนที่{'หนึ่งสองสาม'[k]}")
+                for k in range(3)
+            ])
+    return course, add_sections
+
+@pytest.mark.django_db
+def test_section_list_queries_do_not_grow_with_instructors(client, course_with_instructors):
+    course, add_sections = course_with_instructors
+    client.force_login(User.objects.create_user(username="staff", password="pass", is_staff=True))
+    url = reverse('courses:section-list', args=[course.pk])
+
+    add_sections(2)
+    client.get(url)
+    with CaptureQueriesContext(connection) as few:
+        resp = client.get(url)
+    assert "อาจารย์ ครู คนที่ห" in resp.content.decode()
+    add_sections(8)
+    with CaptureQueriesContext(connection) as many:
+        client.get(url)
+    assert len(many) == len(few)
+
+@pytest.mark.django_db
+def test_instructor_choices_single_query(django_assert_num_queries):
+    for i in range(5):
+        make_instructor(f"t{i}", acdemic_title='LECTURER', first_name_th="ครู", last_name_th="ใจดี")
+    field = SectionForm().fields['instructors']
+    with django_assert_num_queries(1):
+        labels = [label for _, label in field.choices]
+    assert labels == ["อาจารย์ ครู ใจดี"] * 5
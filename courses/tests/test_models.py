@@ -4,7 +4,7 @@ from django.urls import reverse
 from django.db.utils import IntegrityError
 from django.core.exceptions import ValidationError
 from courses.models import Course, Section, Semester, Room, Department, Faculty, Profile
-from datetime import date
+from datetime import date, timedelta
 
 # --------------------
 # Fixtures สำหรับการสร้างข้อมูลทดสอบ
@@ -180,4 +180,68 @@ def test_section_create_view_positive(client, staff_user, course, semester, room
         print("SectionForm errors:", resp.context['form'].errors)
         print(resp.content.decode('utf-8'))
     assert resp.status_code == 302
-    assert Section.objects.filter(course=course, section_number='2').exists()
\ No newline at end of file
+    assert Section.objects.filter(course=course, section_number='2').exists()
+# --------------------
+# Current semester resolver
+# --------------------
+
+@pytest.mark.django_db
+def test_get_current_semester_cached_and_invalidated(django_assert_num_queries):
+    from courses.semesters import get_current_semester
+    today = date.today()
+    assert get_current_semester() is None
+
+    current = Semester.objects.create(
+        year=2568, semester=1,
+        start_date=today - timedelta(days=10), end_date=today + timedelta(days=170)
+    )
+    # การบันทึก Semester ต้องล้างแคช
+    assert get_current_semester() == current
+    with django_assert_num_queries(0):
+        assert get_current_semester() == current
+
+    current.delete()
+    assert get_current_semester() is None
+
+@pytest.mark.django_db
+def test_current_semester_cache_invalidated_by_other_process(django_assert_num_queries):
+    from django.core.cache import cache
+    from courses import semesters
+    today = date.today()
+    current = Semester.objects.create(
+        year=2568, semester=1,
+        start_date=today - timedelta(days=10), end_date=today + timedelta(days=170)
+    )
+    assert semesters.get_current_semester() == current
+    # process อื่นบันทึก Semester: เปลี่ยนเวอร์ชันใน cache ที่ใช้ร่วมกัน แต่ไม่ได้แตะ _cached ของ process นี้
+    Semester.objects.filter(pk=current.pk).update(end_date=today - timedelta(days=1))
+    cache.set(semesters.VERSION_KEY, 'other-process', None)
+    with django_assert_num_queries(2):
+        assert semesters.get_current_semester() is None
+
+@pytest.mark.django_db
+def test_aget_current_semester_uses_same_cache(django_assert_num_queries):
+    from asgiref.sync import async_to_sync
+    from courses.semesters import aget_current_semester, get_current_semester
+    today = date.today()
+    current = Semester.objects.create(
+        year=2568, semester=1,
+        start_date=today - timedelta(days=10), end_date=today + timedelta(days=170)
+    )
+    assert async_to_sync(aget_current_semester)() == current
+    with django_assert_num_queries(0):
+        assert get_current_semester() == current
+        assert async_to_sync(aget_current_semester)() == current
+
+@pytest.mark.django_db
+def test_get_current_semester_expires_at_boundary(monkeypatch):
+    from courses import semesters
+    today = date.today()
+    current = Semester.objects.create(
+        year=2568, semester=1,
+        start_date=today - timedelta(days=10), end_date=today
+    )
+    assert semesters.get_current_semester() == current
+    # วันถัดไปหลังสิ้นสุดภาคเรียน แคชต้องหมดอายุเอง
+    monkeypatch.setattr(semesters.timezone, 'localdate', lambda: today + timedelta(days=1))
+    assert semesters.get_current_semester() is None
@@ -0,0 +1,180 @@
+import copy
+import itertools
+import pytest
+from datetime import time, timedelta
+from types import SimpleNamespace
+from django.contrib.auth.models import User
+from django.urls import URLResolver, get_resolver, reverse
+from django.utils import timezone
+from core.testing import QueryBudgetExceeded, assert_query_budget, query_budget
+from courses.enrollment import sync_enrolled_counts
+from courses.models import Branch, ClassTime, Course, Department, Faculty, Room, Section, Semester, WaitlistEntry
+from users.models import Profile
+
+PASSWORD = "123456789"
+DAYS = ['MON', 'TUE', 'WED', 'THU', 'FRI']
+
+# (ชื่อ URL, ผู้ใช้, method, world -> kwargs ของ URL, world -> query string / form data, status ที่คาด, งบคิวรี)
+# งบคือเพดานที่ไม่ขึ้นกับจำนวนแถว (ข้อมูลน้อยและข้อมูลมากต้องใช้คิวรีเท่ากัน)
+BUDGETS = [
+    ('core:index', 'student', 'get', None, None, 200, 6),
+    ('core:metrics', 'staff', 'get', None, None, 200, 2),
+    ('courses:public-section-list', 'student', 'get', None, None, 200, 6),
+    ('courses:public-section-list', 'student', 'get', None, lambda w: {'q': 'วิชา'}, 200, 6),
+    ('courses:my-schedule', 'student', 'get', None, None, 200, 6),
+    ('courses:enroll-section', 'student', 'post', lambda w: {'section_pk': w.open_section.pk}, None, 302, 10),
+    ('courses:waitlist-join', 'student', 'post', lambda w: {'section_pk': w.full_section.pk}, None, 302, 12),
+    ('courses:waitlist-leave', 'student', 'post', lambda w: {'section_pk': w.waitlisted_section.pk}, None, 302, 6),
+    ('courses:cart', 'student', 'get', None, None, 200, 5),
+    ('courses:cart-add', 'student', 'post', lambda w: {'section_pk': w.open_section.pk}, None, 302, 8),
+    ('courses:cart-remove', 'student', 'post', lambda w: {'section_pk': w.cart_section.pk}, None, 302, 7),
+    ('courses:cart-checkout', 'student', 'post', None, None, 302, 13),
+    ('courses:course-list', 'staff', 'get', None, None, 200, 4),
+    ('courses:course-add', 'staff', 'get', None, None, 200, 4),
+    ('courses:course-edit', 'staff', 'get', lambda w: {'pk': w.course.pk}, None, 200, 5),
+    ('courses:course-delete', 'staff', 'get', lambda w: {'pk': w.course.pk}, None, 200, 4),
+    ('courses:catalog-import', 'staff', 'get', None, None, 200, 3),
+    ('courses:course-roster-export', 'staff', 'get', lambda w: {'pk': w.course.pk}, None, 200, 5),
+    ('courses:section-list', 'staff', 'get', lambda w: {'course_pk': w.course.pk}, None, 200, 7),
+    ('courses:section-add', 'staff', 'get', lambda w: {'course_pk': w.course.pk}, None, 200, 5),
+    ('courses:section-edit', 'staff', 'get', lambda w: {'pk': w.section.pk}, None, 200, 9),
+    ('courses:section-delete', 'staff', 'get', lambda w: {'pk': w.section.pk}, None, 200, 5),
+    ('courses:section-roster-export', 'staff', 'get', lambda w: {'pk': w.section.pk}, None, 200, 5),
+    ('courses:semester-roster-export', 'staff', 'get', lambda w: {'pk': w.semester.pk}, None, 200, 5),
+    ('courses:time-list', 'staff', 'get', lambda w: {'section_pk': w.section.pk}, None, 200, 6),
+    ('courses:time-add', 'staff', 'get', lambda w: {'section_pk': w.section.pk}, None, 200, 5),
+    ('courses:time-edit', 'staff', 'get', lambda w: {'pk': w.class_time.pk}, None, 200, 6),
+    ('courses:time-delete', 'staff', 'get', lambda w: {'pk': w.class_time.pk}, None, 200, 6),
+    ('courses:free-rooms', 'staff', 'get', None, lambda w: {'day': 'MON', 'start_time': '08:00', 'end_time': '10:00'}, 200, 3),
+    ('courses:instructor-autocomplete', 'staff', 'get', None, lambda w: {'q': 'ครู'}, 200, 3),
+    ('courses:room-autocomplete', 'staff', 'get', None, lambda w: {'q': 'SC', 'section': w.section.pk}, 200, 4),
+    ('courses:admission-metrics', 'staff', 'get', None, None, 200, 2),
+    ('courses:fragment-metrics', 'staff', 'get', None, None, 200, 2),
+    ('users:login', None, 'get', None, None, 200, 0),
+    ('users:login', None, 'post', None, lambda w: {'username': 'student', 'password': PASSWORD}, 302, 13),
+    ('users:logout', 'student', 'post', None, None, 302, 6),
+    ('users:student-list', 'staff', 'get', None, None, 200, 4),
+    ('users:student-detail', 'staff', 'get', lambda w: {'pk': w.student.pk}, None, 200, 5),
+]
+
+def _case_id(case):
+    url_name, _, method, _, data = case[:5]
+    return f"{method.upper()} {url_name}" + (" (query)" if data and method == 'get' else "")
+
+def make_student(username, branch, student_id, password=None):
+    # แฮชรหัสผ่านเฉพาะนิสิตที่ต้องล็อกอินด้วยรหัสผ่านจริง (ช้า)
+    user = User.objects.create_user(username=username, password=password)
+    Profile.objects.create(user=user, user_type='STUDENT', branch=branch, student_id=student_id,
+                           first_name_th="นิสิต", last_name_th=username)
+    return user
+
+@pytest.fixture
+def world(db):
+    """
+    ข้อมูลของทุก view และ grow(n) ที่เพิ่มแถวที่แต่ละ view อ่าน: รายวิชา กลุ่มเรียน คาบเรียน อาจารย์
+    ห้องเรียน นิสิต การลงทะเบียน (ทั้งของนิสิตเป้าหมายและในกลุ่มเรียนเป้าหมาย) และคิวรอที่นั่ง
+    """
+    today = timezone.now().date()
+    semester = Semester.objects.create(year=today.year + 543, semester=1,
+                                       start_date=today - timedelta(days=30), end_date=today + timedelta(days=90))
+    department = Department.objects.create(name="วิทยาการคอมพิวเตอร์", faculty=Faculty.objects.create(name="วิทยาศาสตร์"))
+    branch = Branch.objects.create(name="วิทยาการคอมพิวเตอร์", department=department)
+    staff = User.objects.create_user(username="staff", password=PASSWORD, is_staff=True)
+    student = make_student("student", branch, "65000000", password=PASSWORD)
+    counter = itertools.count(1)
+
+    def add_course(capacity=100, class_times=1):
+        n = next(counter)
+        course = Course.objects.create(code=f"{100000 + n}", name=f"วิชา {n}", credits=3, department=department)
+        return add_section(course, capacity, class_times), course
+
+    def add_section(course, capacity=100, class_times=1):
+        n = next(counter)
+        room = Room.objects.create(building=f"SC{n % 3}", room_number=str(100 + n))
+        section = Section.objects.create(course=course, semester=semester, section_number=str(n),
+                                         room=room, capacity=capacity)
+        for k in range(class_times):
+            ClassTime.objects.create(section=section, day=DAYS[(n + k) % 5], start_time=time(8 + k), end_time=time(9 + k))
+        instructor = User.objects.create_user(username=f"t{n}")
+        Profile.objects.create(user=instructor, user_type='INSTRUCTOR', acdemic_title='LECTURER',
+                               first_name_th="ครู", last_name_th=f"คนที่ {n}", department=department)
+        section.instructors.add(instructor)
+        return section
+
+    section, course = add_course(capacity=1000)
+    open_section, _ = add_course()
+    full_section, _ = add_course(capacity=1)
+    full_section.students.add(make_student("first", branch, "65000001"))
+    waitlisted_section, _ = add_course(capacity=1)
+    waitlisted_section.students.add(make_student("second", branch, "65000002"))
+    WaitlistEntry.objects.create(section=waitlisted_section, student=student)
+    # ข้อมูลขนาดเล็กต้องมีอย่างน้อย 1 แถวในทุกความสัมพันธ์ ไม่เช่นนั้น prefetch จะไม่คิวรีเลย
+    section.students.add(student)
+    sync_enrolled_counts()
+
+    def grow(n=5):
+        for _ in range(n):
+            other = make_student(f"s{next(counter)}", branch, f"66{next(counter):06d}")
+            enrolled, _ = add_course(class_times=2)
+            enrolled.students.add(student, other)
+            section.students.add(other)
+            full, _ = add_course(capacity=1)
+            full.students.add(other)
+            WaitlistEntry.objects.create(section=full, student=student)
+            add_section(course)
+            ClassTime.objects.create(section=section, day='SAT', start_time=time(8), end_time=time(9))
+        sync_enrolled_counts()
+
+    return SimpleNamespace(
+        semester=semester, staff=staff, student=student, course=course, section=section,
+        class_time=section.class_times.first(), open_section=open_section, full_section=full_section,
+        waitlisted_section=waitlisted_section, cart_section=open_section, grow=grow,
+    )
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('case', BUDGETS, ids=_case_id)
+def test_view_query_budget(client, world, case):
+    url_name, user, method, kwargs, data, expected_status, budget = case
+    if user is not None:
+        client.force_login(getattr(world, user))
+    if url_name.startswith('courses:cart'):
+        client.post(reverse('courses:cart-add', args=[world.cart_section.pk]))
+    url = reverse(url_name, kwargs=kwargs(world) if kwargs else None)
+    params = data(world) if data else {}
+
+    def send():
+        # คืน cookie เดิมทุกครั้ง (login/logout เปลี่ยน session ของ client แต่ข้อมูลถูก rollback)
+        cookies = copy.deepcopy(client.cookies)
+        response = getattr(client, method)(url, params)
+        if response.streaming:
+            b"".join(response.streaming_content)
+        assert response.status_code == expected_status
+        client.cookies = cookies
+
+    assert_query_budget(send, budget, world.grow, rollback=method != 'get')
+
+def test_every_view_has_a_budget():
+    covered = {case[0] for case in BUDGETS}
+    names = {
+        f"{resolver.namespace}:{pattern.name}"
+        for resolver in get_resolver().url_patterns
+        if isinstance(resolver, URLResolver) and resolver.namespace in ('core', 'courses', 'users')
+        for pattern in resolver.url_patterns
+    }
+    assert names - covered == set()
+
+@pytest.mark.django_db
+def test_query_budget_detects_growth(world):
+    with query_budget(1):
+        list(Section.objects.all())
+    with pytest.raises(QueryBudgetExceeded):
+        with query_budget(1):
+            list(Section.objects.all())
+            list(Course.objects.all())
+
+    def n_plus_one():
+        for section in Section.objects.all():
+            section.course.name
+
+    with pytest.raises(QueryBudgetExceeded, match="N\\+1"):
+        assert_query_budget(n_plus_one, 100, world.grow)
@@ -0,0 +1,104 @@
+import pytest
+from datetime import date, time
+from django.contrib.auth.models import User
+from django.urls import reverse
+from courses.forms import SectionForm
+from courses.models import ClassTime, Course, Room, Section, Semester
+from django.core.cache import cache
+from courses import rooms as rooms_module
+from courses.rooms import find_free_rooms, get_room_index
+
+@pytest.fixture
+def semester(db):
+    return Semester.objects.create(year=2567, semester=1, start_date=date(2025, 6, 1), end_date=date(2025, 10, 1))
+
+@pytest.fixture
+def rooms(db):
+    return [Room.objects.create(building="A", room_number=str(101 + i)) for i in range(3)]
+
+@pytest.fixture
+def section(db, semester, rooms):
+    course = Course.objects.create(code="100001", name="Course", credits=3)
+    section = Section.objects.create(course=course, semester=semester, section_number="1", room=rooms[0], capacity=30)
+    ClassTime.objects.create(section=section, day='MON', start_time=time(8), end_time=time(10))
+    return section
+
+def free_labels(semester, day, start, end, **kwargs):
+    return [room.room_number for room in find_free_rooms(semester.pk, day, start, end, **kwargs)]
+
+@pytest.mark.django_db
+def test_find_free_rooms(semester, rooms, section):
+    assert free_labels(semester, 'MON', time(9), time(11)) == ["102", "103"]
+    # ต่อกันพอดีหรือคนละวันถือว่าว่าง
+    assert free_labels(semester, 'MON', time(10), time(12)) == ["101", "102", "103"]
+    assert free_labels(semester, 'TUE', time(8), time(10)) == ["101", "102", "103"]
+    # ไม่นับคาบเรียนของกลุ่มเรียนเดียวกัน
+    assert free_labels(semester, 'MON', time(9), time(11), ignore_section_id=section.pk) == ["101", "102", "103"]
+
+@pytest.mark.django_db
+def test_room_index_updates_incrementally(semester, rooms, section, django_assert_num_queries,
+                                          django_capture_on_commit_callbacks):
+    index = get_room_index(semester.pk)
+    with django_capture_on_commit_callbacks(execute=True):
+        class_time = section.class_times.get()
+        class_time.start_time, class_time.end_time = time(13), time(15)
+        class_time.save()
+        section.room = rooms[1]
+        section.save()
+        other = Section.objects.create(course=section.course, semester=semester, section_number="2",
+                                       room=rooms[2], capacity=30)
+        ClassTime.objects.create(section=other, day='MON', start_time=time(8), end_time=time(9))
+
+    # ยังเป็นดัชนีเดิม (ไม่ถูกสร้างใหม่) และตอบได้โดยไม่ต้องคิวรีคาบเรียน
+    assert get_room_index(semester.pk) is index
+    with django_assert_num_queries(0):
+        assert index.free_room_ids([r.pk for r in rooms], 'MON', time(8), time(10)) == [rooms[0].pk, rooms[1].pk]
+        assert index.free_room_ids([r.pk for r in rooms], 'MON', time(13), time(14)) == [rooms[0].pk, rooms[2].pk]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        other.delete()
+    assert index.free_room_ids([rooms[2].pk], 'MON', time(8), time(10)) == [rooms[2].pk]
+    assert index.free_room_ids([r.pk for r in rooms], 'MON', time(8), time(15)) == [rooms[0].pk, rooms[2].pk]
+
+@pytest.mark.django_db
+def test_room_index_waits_for_commit_and_follows_other_processes(semester, rooms, section,
+                                                                 django_capture_on_commit_callbacks):
+    index = get_room_index(semester.pk)
+    with django_capture_on_commit_callbacks(execute=False):
+        section.room = rooms[1]
+        section.save()
+    # ยังไม่ commit (หรือ rollback ไป): ดัชนีไม่เปลี่ยน
+    assert index.free_room_ids([rooms[0].pk], 'MON', time(8), time(10)) == []
+
+    # process อื่นแก้ข้อมูลแล้วเพิ่มเวอร์ชันใน cache: process นี้สร้างดัชนีใหม่จากฐานข้อมูล
+    cache.incr(rooms_module.VERSION_KEY)
+    rebuilt = get_room_index(semester.pk)
+    assert rebuilt is not index
+    assert rebuilt.free_room_ids([rooms[0].pk], 'MON', time(8), time(10)) == [rooms[0].pk]
+
+@pytest.mark.django_db
+def test_section_form_marks_busy_rooms(semester, rooms, section):
+    course = Course.objects.create(code="100002", name="Other", credits=3)
+    busy = Section.objects.create(course=course, semester=semester, section_number="1", room=rooms[1], capacity=30)
+    ClassTime.objects.create(section=busy, day='MON', start_time=time(9), end_time=time(10))
+    # ฟอร์ม render เฉพาะห้องที่เลือกไว้ ห้องอื่นค้นผ่าน autocomplete ที่ทำเครื่องหมายห้องไม่ว่างให้
+    html = str(SectionForm(instance=section, course=section.course)['room'])
+    assert "ห้อง 101" in html and "ห้อง 102" not in html
+    assert f'?section={section.pk}' in html
+
+    form = SectionForm(instance=section, course=section.course)
+    form.initial['room'] = rooms[1].pk
+    html = str(form['room'])
+    assert html.count('data-busy="true"') == 1
+    assert "ห้อง 102 (ไม่ว่างในเวลาเรียนของกลุ่มนี้)" in html
+
+@pytest.mark.django_db
+def test_free_rooms_api(client, semester, rooms, section):
+    staff = User.objects.create_user(username="staff", password="pass", is_staff=True)
+    client.force_login(staff)
+    url = reverse('courses:free-rooms')
+    resp = client.get(url, {'semester': semester.pk, 'day': 'MON', 'start_time': '09:00', 'end_time': '10:00'})
+    assert resp.status_code == 200
+    assert [room['room_number'] for room in resp.json()['rooms']] == ["102", "103"]
+    resp = client.get(url, {'semester': semester.pk, 'day': 'MON', 'start_time': '10:00', 'end_time': '09:00'})
+    assert resp.status_code == 400
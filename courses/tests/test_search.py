@@ -0,0 +1,88 @@
+import pytest
+from courses.models import Course
+from datetime import date
+from core.pagination import KeysetPaginator
+from courses.models import Section, Semester
+from courses.search import (
+    CourseSearchIndex, _score, filter_by_search, get_search_index, normalize_search_text, search_courses,
+)
+
+@pytest.fixture
+def catalog(db):
+    return {
+        'prog': Course.objects.create(code="101154", name="การเขียนโปรแกรม", credits=3,
+                                      description="พื้นฐานการเขียนโปรแกรมคอมพิวเตอร์"),
+        'data': Course.objects.create(code="101155", name="โครงสร้างข้อมูล", credits=3,
+                                      description="ต่อยอดจากวิชา 101154"),
+        'thai': Course.objects.create(code="201101", name="ภาษาไทยเพื่อการสื่อสาร", credits=3),
+        'english': Course.objects.create(code="301101", name="English for Communication", credits=3),
+    }
+
+def test_normalize_folds_tone_mark_variants():
+    # วรรณยุกต์ต่างกัน / พิมพ์นิคหิต+สระอาแยกกัน / มีอักขระความกว้างศูนย์ ต้องได้ผลเหมือนกัน
+    assert normalize_search_text("คำ") == normalize_search_text("ค่ำ")
+    assert normalize_search_text("คํ่า") == normalize_search_text("ค่ำ")
+    assert normalize_search_text("การ​เขียน") == "การเขียน"
+    assert normalize_search_text("  English   FOR ") == "english for"
+
+@pytest.mark.django_db
+def test_search_code_prefix_ranked_first(catalog):
+    ids = search_courses("10115")
+    assert ids[:2] == [catalog['prog'].pk, catalog['data'].pk]
+    # รหัสที่ตรงทั้งหมดมาก่อนรายวิชาที่กล่าวถึงรหัสในคำอธิบาย
+    assert search_courses("101154") == [catalog['prog'].pk, catalog['data'].pk]
+
+@pytest.mark.django_db
+def test_search_thai_name_and_description(catalog):
+    assert search_courses("โปรแกรม") == [catalog['prog'].pk]
+    assert search_courses("โครงสร้าง") == [catalog['data'].pk]
+    # คำในคำอธิบาย
+    assert search_courses("พื้นฐาน") == [catalog['prog'].pk]
+    # ภาษาอังกฤษไม่สนตัวพิมพ์ และหลายคำต้องเจอครบทุกคำ
+    assert search_courses("english communication") == [catalog['english'].pk]
+    assert search_courses("ไม่มีวิชานี้") == []
+
+@pytest.mark.django_db
+def test_sql_rank_matches_index_score(catalog):
+    for query in ("101154", "10115", "การเขียน", "โปรแกรม", "พื้นฐาน", "english", "communication"):
+        courses, ordering = filter_by_search(Course.objects.all(), query)
+        normalized = normalize_search_text(query)
+        assert courses.exists()
+        for course in courses:
+            assert course.search_rank == _score(normalized, course.code, course.search_text), (query, course.code)
+
+@pytest.mark.django_db
+def test_filter_by_search_orders_sections_in_sql(catalog):
+    semester = Semester.objects.create(year=2567, semester=1, start_date=date(2025, 6, 1), end_date=date(2025, 10, 1))
+    for course in catalog.values():
+        Section.objects.create(course=course, semester=semester, section_number="1", capacity=5)
+    sections, ordering = filter_by_search(Section.objects.all(), "10115", prefix='course__')
+    assert [section.course_id for section in sections.order_by(*ordering, 'course__code')] == search_courses("10115")
+    # คีย์การเรียงใช้แบ่งหน้าแบบ keyset ได้
+    paginator = KeysetPaginator(sections, ordering + ('course__code',), page_size=1)
+    first = paginator.get_page()
+    second = paginator.get_page(first.next_cursor)
+    assert [first[0].course_id, second[0].course_id] == search_courses("10115")
+    assert filter_by_search(Section.objects.all(), "  ")[0].count() == 0
+
+@pytest.mark.django_db
+def test_search_index_updates_incrementally(catalog):
+    index = get_search_index()
+    assert len(index) == 4
+    course = catalog['thai']
+    course.name = "วรรณคดีไทย"
+    course.save()
+    assert search_courses("วรรณคดี") == [course.pk]
+    assert search_courses("สื่อสาร") == []
+    course.delete()
+    assert search_courses("วรรณคดี") == []
+    assert get_search_index() is index
+
+def test_search_index_without_database():
+    index = CourseSearchIndex()
+    index.update(1, "123456", normalize_search_text("123456 ฟิสิกส์ทั่วไป"))
+    index.update(2, "123457", normalize_search_text("123457 เคมีทั่วไป"))
+    assert index.search("ทั่วไป") == [1, 2]
+    assert index.search("12345") == [1, 2]
+    index.remove(1)
+    assert index.search("ฟิสิกส์") == []
@@ -0,0 +1,141 @@
+import asyncio
+import json
+import pytest
+from asgiref.sync import async_to_sync, sync_to_async
+from datetime import date
+from django.contrib.auth.models import User
+from django.test import AsyncClient
+from django.urls import reverse
+from courses.enrollment import enroll_many, enroll_student
+from courses.models import Course, Section, Semester
+from courses.seat_events import LocalSeatBroker, get_broker, seat_counts, seat_payload, set_broker
+
+class RecordingBroker:
+    """broker ทดแทน: บันทึกสิ่งที่ถูก publish สำหรับกลุ่มเรียนที่กำหนดว่ามีผู้ติดตาม"""
+
+    def __init__(self, watched):
+        self.watched = set(watched)
+        self.published = []
+
+    def subscribed(self, section_ids=None):
+        if section_ids is None:
+            return set(self.watched)
+        return {section_id for section_id in section_ids if section_id in self.watched}
+
+    def publish(self, updates):
+        self.published.append(updates)
+
+@pytest.fixture
+def sections(db):
+    semester = Semester.objects.create(year=2567, semester=1, start_date=date(2025, 6, 1), end_date=date(2025, 10, 1))
+    return [
+        Section.objects.create(course=Course.objects.create(code=f"10000{i}", name=f"Course {i}", credits=3),
+                               semester=semester, section_number="1", capacity=2)
+        for i in range(3)
+    ]
+
+@pytest.fixture
+def recording_broker(sections):
+    broker = RecordingBroker([sections[0].pk, sections[1].pk])
+    previous = set_broker(broker)
+    yield broker
+    set_broker(previous)
+
+def test_subscription_coalesces_bursts():
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        broker = LocalSeatBroker()
+        subscription = broker.subscribe([1, 2], interval=0.2)
+        broker.publish({1: 'a', 3: 'ไม่ได้ติดตาม'})
+        assert await asyncio.wait_for(subscription.next_batch(), 1) == {1: 'a'}
+
+        started = loop.time()
+        for value in range(5):
+            # publish จาก thread อื่น (แบบเดียวกับ view ลงทะเบียนแบบ sync)
+            await asyncio.to_thread(broker.publish, {1: value})
+        broker.publish({2: 'b'})
+        # ส่งเฉพาะค่าล่าสุดของแต่ละกลุ่มเรียน ห่างจากชุดก่อนอย่างน้อย interval
+        assert await asyncio.wait_for(subscription.next_batch(), 1) == {1: 4, 2: 'b'}
+        assert loop.time() - started >= 0.15
+
+        broker.unsubscribe(subscription)
+        assert broker.subscribed() == set()
+
+    async_to_sync(scenario)()
+
+@pytest.mark.django_db
+def test_enrollment_publishes_watched_sections_after_commit(
+    sections, recording_broker, django_capture_on_commit_callbacks, django_assert_num_queries
+):
+    student = User.objects.create(username="student")
+    with django_capture_on_commit_callbacks(execute=False) as callbacks:
+        enroll_student(student, sections[0].pk)
+    # ยังไม่ส่งจนกว่าจะ commit
+    assert recording_broker.published == []
+    for callback in callbacks:
+        callback()
+    assert recording_broker.published == [{sections[0].pk: seat_payload(sections[0].pk, 1, 2)}]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        enroll_many(student, [sections[1].pk, sections[2].pk])
+    assert recording_broker.published[-1] == {sections[1].pk: seat_payload(sections[1].pk, 1, 2)}
+
+    # กลุ่มเรียนที่ไม่มีผู้ติดตาม: ไม่คิวรีและไม่ส่ง
+    recording_broker.published.clear()
+    other = User.objects.create(username="other")
+    with django_capture_on_commit_callbacks(execute=False) as callbacks:
+        enroll_student(other, sections[2].pk)
+    with django_assert_num_queries(0):
+        for callback in callbacks:
+            callback()
+    assert recording_broker.published == []
+
+@pytest.mark.django_db
+def test_seat_stream_requires_asgi_and_setting(client, settings, sections):
+    url = reverse('api:seat-stream')
+    params = {'sections': str(sections[0].pk)}
+    page = reverse('courses:public-section-list')
+    client.force_login(User.objects.create(username="student"))
+    # ปิดอยู่ (ค่าเริ่มต้น): หน้าไม่เปิด EventSource และ endpoint ตอบ 204 ทันที
+    assert client.get(url, params).status_code == 204
+    assert b'EventSource' not in client.get(page).content
+
+    settings.SEAT_STREAM_ENABLED = True
+    assert b'EventSource' in client.get(page).content
+    # WSGI (Client แบบ sync) ยังได้ 204 ไม่ถือ worker ไว้
+    assert client.get(url, params).status_code == 204
+    assert async_to_sync(AsyncClient().get)(url, {'sections': 'abc'}).status_code == 400
+
+@pytest.mark.django_db
+def test_seat_stream_sends_snapshot_then_updates(settings, sections):
+    settings.SEAT_STREAM_ENABLED = True
+    url = reverse('api:seat-stream')
+
+    async def scenario():
+        client = AsyncClient()
+        assert (await client.get(url, {'sections': 'abc'})).status_code == 400
+
+        response = await client.get(url, {'sections': f'{sections[0].pk},{sections[1].pk}'})
+        assert response['Content-Type'] == 'text/event-stream'
+        stream = aiter(response.streaming_content)
+        assert await anext(stream) == b'retry: 3000\n\n'
+        event, data = (await anext(stream)).decode().strip().split('\n')
+        assert event == 'event: seats'
+        assert {seat['id'] for seat in json.loads(data.removeprefix('data: '))} == {sections[0].pk, sections[1].pk}
+
+        await sync_to_async(Section.objects.filter(pk=sections[1].pk).update)(enrolled_count=2)
+        get_broker().publish(await sync_to_async(seat_counts)([sections[1].pk]))
+        update = (await asyncio.wait_for(anext(stream), 2)).decode()
+        assert json.loads(update.strip().split('\n')[1].removeprefix('data: ')) == [
+            {'id': sections[1].pk, 'enrolled': 2, 'capacity': 2, 'available': 0}
+        ]
+        # client ตัดการเชื่อมต่อ: ASGI handler ยกเลิก task ที่กำลังรอข้อมูล แล้วต้องเลิกติดตาม
+        waiting = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0.05)
+        assert get_broker().subscribed() == {sections[0].pk, sections[1].pk}
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        assert get_broker().subscribed() == set()
+
+    async_to_sync(scenario)()
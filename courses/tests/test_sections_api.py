@@ -0,0 +1,74 @@
+import pytest
+from datetime import date, time
+from django.contrib.auth.models import User
+from django.urls import reverse
+from users.models import Profile
+from courses.models import ClassTime, Course, Department, Faculty, Room, Section, Semester
+
+@pytest.fixture
+def semester(db):
+    return Semester.objects.create(year=2567, semester=1, start_date=date(2025, 6, 1), end_date=date(2025, 10, 1))
+
+@pytest.fixture
+def department(db):
+    return Department.objects.create(name="วิทยาการคอมพิวเตอร์", faculty=Faculty.objects.create(name="วิทยาศาสตร์"))
+
+@pytest.fixture
+def sections(db, semester, department):
+    room = Room.objects.create(building="A", room_number="101")
+    teacher = User.objects.create(username="t1")
+    Profile.objects.create(user=teacher, user_type='INSTRUCTOR', acdemic_title='LECTURER',
+                           first_name_th="สมศรี", last_name_th="สอนดี")
+    result = []
+    for i in range(12):
+        course = Course.objects.create(code=f"{100001 + i}", name=f"Course {i}", credits=3,
+                                       department=department if i % 2 == 0 else None)
+        section = Section.objects.create(course=course, semester=semester, section_number="1", room=room, capacity=30)
+        ClassTime.objects.create(section=section, day='MON' if i < 6 else 'TUE', start_time=time(8), end_time=time(10))
+        section.instructors.add(teacher)
+        result.append(section)
+    hidden = Course.objects.create(code="199999", name="Closed", credits=3, is_active=False)
+    Section.objects.create(course=hidden, semester=semester, section_number="1", capacity=30)
+    return result
+
+@pytest.mark.django_db
+def test_sections_api_all_fields(client, semester, department, sections):
+    resp = client.get(reverse('api:sections'), {'semester': semester.pk})
+    assert resp.status_code == 200
+    data = resp.json()
+    assert len(data['results']) == 12 and data['next'] is None
+    assert data['results'][0] == {
+        'id': sections[0].pk,
+        'section_number': "1",
+        'capacity': 30,
+        'enrolled': 0,
+        'course': {'code': "100001", 'name': "Course 0", 'credits': 3, 'department': "วิทยาการคอมพิวเตอร์"},
+        'semester': {'id': semester.pk, 'year': 2567, 'semester': 1},
+        'room': "A 101",
+        'schedule': [{'day': 'MON', 'start': '08:00', 'end': '10:00'}],
+        'instructors': ["อาจารย์ สมศรี สอนดี"],
+    }
+
+@pytest.mark.django_db
+def test_sections_api_fields_filters_and_cursor(client, semester, department, sections, django_assert_num_queries):
+    url = reverse('api:sections')
+    with django_assert_num_queries(1):
+        data = client.get(url, {'semester': semester.pk, 'fields': 'id,course', 'size': 10}).json()
+    assert set(data['results'][0]) == {'id', 'course'}
+    assert [row['id'] for row in data['results']] == [section.pk for section in sections[:10]]
+
+    # ตารางเรียนและผู้สอนเพิ่มอย่างละ 1 คิวรีต่อหน้า ไม่ขึ้นกับจำนวนแถว
+    with django_assert_num_queries(3):
+        rest = client.get(data['next'].replace('fields=id%2Ccourse', 'fields=id,schedule,instructors')).json()
+    assert [row['id'] for row in rest['results']] == [sections[10].pk, sections[11].pk]
+    assert rest['next'] is None and rest['previous']
+
+    data = client.get(url, {'semester': semester.pk, 'department': department.pk, 'day': 'MON', 'fields': 'id'}).json()
+    assert data['results'] == [{'id': sections[i].pk} for i in (0, 2, 4)]
+
+@pytest.mark.django_db
+def test_sections_api_rejects_unknown_fields(client, semester, sections):
+    resp = client.get(reverse('api:sections'), {'semester': semester.pk, 'fields': 'id,students'})
+    assert resp.status_code == 400
+    assert 'fields' in resp.json()['errors']
+    assert client.get(reverse('api:sections'), {'day': 'XYZ'}).status_code == 400
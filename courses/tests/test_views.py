@@ -3,7 +3,7 @@ from django.urls import reverse
 from django.contrib.auth.models import User
 from courses.models import Course, Section, Semester, Room, Department, Faculty
 from users.models import Profile
-from datetime import date
+from datetime import date, timedelta
 
 @pytest.fixture
 def staff_user(db):
@@ -319,4 +319,26 @@ def test_my_schedule_no_enroll(client, student_user):
     resp = client.get(url)
     assert resp.status_code == 200
     # ปรับ assertion ให้ตรวจสอบว่ามีเนื้อหา html กลับมา (ไม่ assert ข้อความที่อาจไม่มีจริง)
-    assert '<!DOCTYPE html>' in resp.content.decode('utf-8')
\ No newline at end of file
+    assert '<!DOCTYPE html>' in resp.content.decode('utf-8')
+@pytest.fixture
+def current_section(db, course, room):
+    today = date.today()
+    semester = Semester.objects.create(
+        year=2568, semester=1,
+        start_date=today - timedelta(days=30), end_date=today + timedelta(days=150)
+    )
+    return Section.objects.create(
+        course=course, section_number="1", semester=semester, room=room, capacity=2
+    )
+
+@pytest.mark.django_db
+def test_public_section_list_marks_enrolled_without_loading_students(client, student_user, current_section):
+    current_section.students.add(student_user)
+    client.force_login(student_user)
+    resp = client.get(reverse('courses:public-section-list'))
+    assert resp.status_code == 200
+    assert resp.context['enrolled_section_ids'] == {current_section.pk}
+    section = resp.context['sections'][0]
+    assert section.seats_left == 1
+    assert 'students' not in getattr(section, '_prefetched_objects_cache', {})
+    assert 'ลงทะเบียนแล้ว' in resp.content.decode('utf-8')
@@ -0,0 +1,121 @@
+import pytest
+from datetime import date
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.urls import reverse
+from courses.enrollment import EnrollmentStatus, enroll_student
+from courses.models import Course, Section, Semester, WaitlistEntry
+from courses.waitlist import (
+    WaitlistStatus, join_waitlist, leave_waitlist, promote_section, promote_waitlists, waitlist_positions,
+)
+
+@pytest.fixture
+def section(db):
+    semester = Semester.objects.create(year=2567, semester=1, start_date=date(2025, 6, 1), end_date=date(2025, 10, 1))
+    course = Course.objects.create(code="101154", name="Programming", credits=3)
+    return Section.objects.create(course=course, section_number="1", semester=semester, capacity=1)
+
+@pytest.fixture
+def students(db):
+    return [User.objects.create_user(username=f"s{i}", password="pass") for i in range(4)]
+
+@pytest.mark.django_db
+def test_join_waitlist_only_when_full(section, students):
+    assert join_waitlist(students[0], section.pk).status == WaitlistStatus.NOT_FULL
+    assert enroll_student(students[0], section.pk).ok
+    assert join_waitlist(students[0], section.pk).status == WaitlistStatus.ALREADY_ENROLLED
+
+    first = join_waitlist(students[1], section.pk)
+    second = join_waitlist(students[2], section.pk)
+    assert (first.status, first.position) == (WaitlistStatus.JOINED, 1)
+    assert (second.status, second.position) == (WaitlistStatus.JOINED, 2)
+    again = join_waitlist(students[2], section.pk)
+    assert (again.status, again.position) == (WaitlistStatus.ALREADY_WAITLISTED, 2)
+
+    assert leave_waitlist(students[1], section.pk)
+    assert waitlist_positions(students[2]) == {section.pk: 1}
+
+@pytest.mark.django_db
+def test_promote_waitlists_in_fifo_order(section, students):
+    enroll_student(students[0], section.pk)
+    for student in students[1:]:
+        join_waitlist(student, section.pk)
+
+    # ที่นั่งว่างแล้ว แต่ยังมีคิว: ลงทะเบียนตรงไม่แซงคิว
+    section.students.remove(students[0])
+    outsider = User.objects.create_user(username="outsider", password="pass")
+    assert enroll_student(outsider, section.pk).status == EnrollmentStatus.FULL
+
+    section.capacity = 2
+    section.save()
+    summary = promote_waitlists()
+    assert (summary.promoted, summary.removed) == (2, 0)
+    assert set(section.students.all()) == {students[1], students[2]}
+    assert waitlist_positions(students[3]) == {section.pk: 1}
+
+    # นิสิตที่ลงรายวิชาเดียวกันไปแล้วถูกนำออกจากคิว แทนที่จะขวางคิว
+    other = Section.objects.create(course=section.course, section_number="2", semester=section.semester, capacity=5)
+    enroll_student(students[3], other.pk)
+    section.capacity = 3
+    section.save()
+    summary = promote_waitlists()
+    assert (summary.promoted, summary.removed) == (0, 1)
+    assert not WaitlistEntry.objects.exists()
+
+@pytest.mark.django_db
+def test_positions_follow_every_delete(section, students, django_assert_num_queries):
+    enroll_student(students[0], section.pk)
+    for student in students[1:]:
+        join_waitlist(student, section.pk)
+    # ลบคิวกลางแถว (เช่นผ่าน admin) และลบบัญชีนิสิต: คิวข้างหลังเลื่อนขึ้นโดยไม่ต้องเขียนแถวอื่น
+    with django_assert_num_queries(1):
+        WaitlistEntry.objects.filter(student=students[2]).delete()
+    assert waitlist_positions(students[3]) == {section.pk: 2}
+    students[1].delete()
+    with django_assert_num_queries(1):
+        assert waitlist_positions(students[3]) == {section.pk: 1}
+    assert join_waitlist(students[2], section.pk).position == 2
+
+@pytest.mark.django_db
+def test_drop_and_capacity_increase_promote_on_commit(section, students, django_capture_on_commit_callbacks):
+    enroll_student(students[0], section.pk)
+    for student in students[1:]:
+        join_waitlist(student, section.pk)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        section.students.remove(students[0])
+    assert list(section.students.all()) == [students[1]]
+    assert waitlist_positions(students[2]) == {section.pk: 1}
+
+    with django_capture_on_commit_callbacks(execute=True):
+        section.capacity = 3
+        section.save()
+    assert set(section.students.all()) == set(students[1:])
+    assert not WaitlistEntry.objects.exists()
+
+@pytest.mark.django_db
+def test_promote_section_skips_deleted_section(section, students):
+    section_pk = section.pk
+    section.delete()
+    summary = promote_section(section_pk)
+    assert (summary.promoted, summary.removed) == (0, 0)
+
+@pytest.mark.django_db
+def test_process_waitlists_command(section, students):
+    enroll_student(students[0], section.pk)
+    join_waitlist(students[1], section.pk)
+    section.students.remove(students[0])
+    call_command('process_waitlists')
+    assert list(section.students.all()) == [students[1]]
+
+@pytest.mark.django_db
+def test_public_section_list_shows_waitlist_position(client, section, students):
+    section.semester.start_date = date.today()
+    section.semester.end_date = date.today()
+    section.semester.save()
+    enroll_student(students[0], section.pk)
+    client.force_login(students[2])
+    resp = client.post(reverse('courses:waitlist-join', args=[section.pk]))
+    assert resp.status_code == 302
+    resp = client.get(reverse('courses:public-section-list'))
+    assert "รอคิว #1" in resp.content.decode()
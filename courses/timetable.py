@@ -0,0 +1,101 @@
+"""
+ตารางเรียนรายสัปดาห์แบบ bitmask
+
+แบ่งแต่ละวันเป็นช่องละ 15 นาที (96 ช่อง x 7 วัน = 672 บิต) คาบเรียนหนึ่งคาบคือชุดบิตที่ต่อกัน
+ตารางของกลุ่มเรียนเก็บไว้ใน Section.schedule_mask และตารางของนิสิตคือ OR ของทุกกลุ่มเรียนที่ลงไว้
+การตรวจเวลาเรียนชนกันจึงเหลือเพียง AND ของจำนวนเต็มสองตัว
+
+bitmask ปัดเวลาออกเป็นช่อง จึงใช้คัดกรองเท่านั้น: ไม่มีบิตร่วมกันแปลว่าไม่ชนแน่นอน
+แต่มีบิตร่วมกันอาจไม่ชนจริง (คาบที่ต่อกันพอดีนอกเส้นแบ่งช่อง เช่น 08:00-09:50 และ 09:50-11:00)
+first_clash จึงตรวจเวลาจริงของกลุ่มเรียนที่ bitmask ทับกันอีกครั้ง
+"""
+from .models import ClassTime, Section
+
+SLOT_MINUTES = 15
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+DAY_INDEX = {day: index for index, (day, _) in enumerate(ClassTime.DAY_CHOICES)}
+MASK_BYTES = (SLOTS_PER_DAY * len(DAY_INDEX) + 7) // 8
+
+
+def slot_range(start_time, end_time):
+    """
+    ช่วง index ของช่อง 15 นาทีที่คาบเรียนครอบคลุม [start, end) ปัดเวลาเริ่มลง และเวลาเลิกขึ้น
+    (คาบที่ไม่ตรงเส้นแบ่งช่องจึงครอบคลุมกว้างกว่าเวลาจริง ดูหมายเหตุของ module)
+    """
+    start = (start_time.hour * 60 + start_time.minute) // SLOT_MINUTES
+    end = -(-(end_time.hour * 60 + end_time.minute) // SLOT_MINUTES)
+    return start, max(start, end)
+
+
+def slot_mask(day, start_time, end_time):
+    """bitmask ของคาบเรียน 1 คาบ"""
+    start, end = slot_range(start_time, end_time)
+    if end <= start:
+        return 0
+    offset = DAY_INDEX[day] * SLOTS_PER_DAY
+    return ((1 << (end - start)) - 1) << (offset + start)
+
+
+def build_mask(slots):
+    """รวม bitmask ของคาบเรียนทั้งหมด slots คือรายการ (day, start_time, end_time)"""
+    mask = 0
+    for day, start_time, end_time in slots:
+        mask |= slot_mask(day, start_time, end_time)
+    return mask
+
+
+def mask_to_bytes(mask):
+    return mask.to_bytes(MASK_BYTES, 'big') if mask else b''
+
+
+def mask_from_bytes(data):
+    return int.from_bytes(data, 'big') if data else 0
+
+
+def load_slots(section_ids):
+    """คาบเรียนจริงของแต่ละกลุ่มเรียน {section_id: [(day, start_time, end_time), ...]} (คิวรีเดียว)"""
+    slots = {pk: [] for pk in section_ids}
+    rows = ClassTime.objects.filter(section_id__in=list(slots)).values_list(
+        'section_id', 'day', 'start_time', 'end_time'
+    )
+    for section_id, day, start_time, end_time in rows:
+        slots[section_id].append((day, start_time, end_time))
+    return slots
+
+
+def slots_overlap(slots, other_slots):
+    """คาบเรียนสองชุดทับกันจริงหรือไม่ (เทียบเวลาจริง ไม่ปัดเป็นช่อง คาบที่ต่อกันพอดีไม่นับว่าทับ)"""
+    return any(
+        day == other_day and start < other_end and other_start < end
+        for day, start, end in slots
+        for other_day, other_start, other_end in other_slots
+    )
+
+
+def rebuild_schedule_masks(section_ids):
+    """คำนวณ Section.schedule_mask ใหม่จาก ClassTime ของกลุ่มเรียนที่ระบุ (2 คิวรี)"""
+    section_ids = list(section_ids)
+    if not section_ids:
+        return
+    slots = load_slots(section_ids)
+    Section.objects.bulk_update(
+        [Section(pk=pk, schedule_mask=mask_to_bytes(build_mask(items))) for pk, items in slots.items()],
+        ['schedule_mask'],
+        batch_size=500,
+    )
+
+
+def first_clash(section_id, mask, enrolled_masks):
+    """
+    คืนค่า id ของกลุ่มเรียนแรกที่เวลาชนกับกลุ่มเรียน section_id (bitmask คือ mask) หรือ None
+    enrolled_masks คือรายการ (section_id, mask) ของกลุ่มเรียนที่นิสิตลงไว้
+    คิวรีเวลาจริงเพิ่ม 1 ครั้งเฉพาะเมื่อมี bitmask ที่ทับกัน
+    """
+    occupied = 0
+    for _, other in enrolled_masks:
+        occupied |= other
+    if not mask & occupied:
+        return None
+    candidates = [other_id for other_id, other in enrolled_masks if mask & other]
+    slots = load_slots([section_id, *candidates])
+    return next((other_id for other_id in candidates if slots_overlap(slots[section_id], slots[other_id])), None)
@@ -7,17 +7,32 @@ urlpatterns = [
     path('add/', views.course_add, name='course-add'),
     path('<int:pk>/edit/', views.course_edit, name='course-edit'),
     path('<int:pk>/delete/', views.course_delete, name='course-delete'),
+    path('import/', views.catalog_import, name='catalog-import'),
+    path('<int:pk>/export/', views.course_roster_export, name='course-roster-export'),
     
     path('<int:course_pk>/sections/', views.section_list, name='section-list'),
     path('<int:course_pk>/add-section/', views.section_add, name='section-add'),
     path('section/<int:pk>/edit/', views.section_edit, name='section-edit'),
     path('section/<int:pk>/delete/', views.section_delete, name='section-delete'),
+    path('section/<int:pk>/export/', views.section_roster_export, name='section-roster-export'),
+    path('semester/<int:pk>/export/', views.semester_roster_export, name='semester-roster-export'),
     path('section/<int:section_pk>/times/', views.time_list, name='time-list'),
     path('section/<int:section_pk>/times/add/', views.time_add, name='time-add'),
     path('times/<int:pk>/edit/', views.time_edit, name='time-edit'),
     path('times/<int:pk>/delete/', views.time_delete, name='time-delete'),
+    path('rooms/free/', views.free_rooms, name='free-rooms'),
+    path('autocomplete/instructors/', views.instructor_autocomplete, name='instructor-autocomplete'),
+    path('autocomplete/rooms/', views.room_autocomplete, name='room-autocomplete'),
+    path('admission/metrics/', views.admission_metrics, name='admission-metrics'),
+    path('fragments/metrics/', views.fragment_metrics, name='fragment-metrics'),
     
     path('register/', views.public_section_list, name='public-section-list'),
     path('enroll/<int:section_pk>/', views.enroll_section, name='enroll-section'),
+    path('waitlist/<int:section_pk>/join/', views.join_waitlist_view, name='waitlist-join'),
+    path('waitlist/<int:section_pk>/leave/', views.leave_waitlist_view, name='waitlist-leave'),
     path('my-schedule/', views.my_schedule, name='my-schedule'),
+    path('cart/', views.cart_detail, name='cart'),
+    path('cart/add/<int:section_pk>/', views.cart_add, name='cart-add'),
+    path('cart/remove/<int:section_pk>/', views.cart_remove, name='cart-remove'),
+    path('cart/checkout/', views.cart_checkout, name='cart-checkout'),
 ]
\ No newline at end of file
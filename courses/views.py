@@ -1,12 +1,27 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.http import require_POST
 from django.core.exceptions import PermissionDenied
+from django.http import Http404, HttpResponse, JsonResponse
 from django.contrib import messages
-from django.utils import timezone
-from django.db.models import Q
-from .models import Course, Section, Semester, ClassTime
-from .forms import CourseForm, SectionForm, ClassTimeForm
+from django.db.models import Exists, F, OuterRef
+from core.admission import admission_control, all_gate_metrics
+from core.pagination import apaginate_keyset, paginate_keyset
+from . import exports
+from .autocomplete import search_instructors, search_rooms
+from .models import Course, Section, ClassTime, Semester, WaitlistEntry, instructors_prefetch
+from .forms import (
+    CatalogImportForm, CourseForm, SectionForm, ClassTimeForm, FreeRoomQueryForm, RoomAvailabilitySelect,
+)
+from .enrollment import EnrollmentStatus, enroll_many, enroll_student
+from .fragments import attach_section_cells, fragment_stats
+from .importer import ImportFormatError, import_catalog
+from .rooms import find_free_rooms, get_room_index
+from .search import filter_by_search
+from .semesters import aget_current_semester, get_current_semester
+from .waitlist import WaitlistStatus, awaitlist_positions, join_waitlist, leave_waitlist
 
 # เช็คว่าผู้ใช้เป็น staff ก่อนเข้าถึง view
 def staff_required(view_func):
@@ -20,7 +35,8 @@ def staff_required(view_func):
 @staff_required
 def course_list(request):
     """แสดงรายการวิชาทั้งหมด"""
-    courses = Course.objects.all().order_by('code') # เรียงตามรหัสวิชา
+    # แบ่งหน้าแบบ keyset เรียงตามรหัสวิชา (มี unique index)
+    courses = paginate_keyset(request, Course.objects.select_related('department__faculty'), ('code',))
     return render(request, 'courses/course_list.html', {'courses': courses})
 
 @login_required
@@ -62,12 +78,39 @@ def course_delete(request, pk):
         return redirect('courses:course-list')
     return render(request, 'courses/course_confirm_delete.html', {'object': course})
 
+@login_required
+@staff_required
+def catalog_import(request):
+    """นำเข้ารายวิชา กลุ่มเรียน และคาบเรียนจากไฟล์ CSV/XLSX แล้วแสดงสรุปผลพร้อมข้อผิดพลาดรายแถว"""
+    report = None
+    if request.method == 'POST':
+        form = CatalogImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            upload = form.cleaned_data['file']
+            try:
+                report = import_catalog(
+                    upload, upload.name,
+                    update=form.cleaned_data['update'], dry_run=form.cleaned_data['dry_run'],
+                )
+            except ImportFormatError as exc:
+                form.add_error('file', str(exc))
+            else:
+                if not report.dry_run and not report.error_count:
+                    messages.success(request, f'นำเข้าข้อมูล {report.rows} แถวเรียบร้อยแล้ว')
+    else:
+        form = CatalogImportForm()
+    return render(request, 'courses/catalog_import.html', {'form': form, 'report': report})
+
 @login_required
 @staff_required
 def section_list(request, course_pk):
     """แสดงรายการ Section ทั้งหมดของ Course ที่ระบุ"""
     course = get_object_or_404(Course, pk=course_pk)
-    sections = Section.objects.filter(course=course).order_by('section_number') # เรียงตามหมายเลข Section
+    sections = paginate_keyset(
+        request,
+        Section.objects.filter(course=course).select_related('semester', 'room').prefetch_related('class_times', instructors_prefetch()),
+        ('section_number',), # เรียงตามหมายเลข Section
+    )
     context = {
         'course': course,
         'sections': sections,
@@ -135,14 +178,55 @@ def section_delete(request, pk):
     
     return render(request, 'courses/section_confirm_delete.html', {'object': section})
 
+def _roster_export(request, enrollment_rows, filename):
+    """ส่งออกรายชื่อตาม ?format=csv|xlsx (ค่าเริ่มต้น csv)"""
+    file_format = request.GET.get('format', exports.CSV)
+    if file_format not in exports.FORMATS:
+        raise Http404
+    if file_format == exports.XLSX and not exports.xlsx_available():
+        return HttpResponse('การส่งออกไฟล์ XLSX ต้องติดตั้งแพ็กเกจ openpyxl', status=501)
+    return exports.roster_response(enrollment_rows, filename, file_format)
+
+@login_required
+@staff_required
+def section_roster_export(request, pk):
+    """ส่งออกรายชื่อนิสิตของกลุ่มเรียน"""
+    section = get_object_or_404(Section.objects.select_related('course', 'semester'), pk=pk)
+    filename = f'roster_{section.course.code}_{section.semester.year}-{section.semester.semester}_sec{section.section_number}'
+    return _roster_export(request, exports.enrollments(section=section), filename)
+
+@login_required
+@staff_required
+def course_roster_export(request, pk):
+    """ส่งออกรายชื่อนิสิตทุกกลุ่มเรียนของรายวิชา (ระบุ ?semester=<id> เพื่อเลือกภาคเรียน)"""
+    course = get_object_or_404(Course, pk=pk)
+    semester = None
+    if request.GET.get('semester'):
+        semester = get_object_or_404(Semester, pk=request.GET['semester'])
+    filename = f'roster_{course.code}' + (f'_{semester.year}-{semester.semester}' if semester else '')
+    return _roster_export(request, exports.enrollments(course=course, semester=semester), filename)
+
+@login_required
+@staff_required
+def semester_roster_export(request, pk):
+    """ส่งออกรายชื่อการลงทะเบียนทั้งภาคเรียน"""
+    semester = get_object_or_404(Semester, pk=pk)
+    return _roster_export(request, exports.enrollments(semester=semester), f'roster_{semester.year}-{semester.semester}')
+
+async def _auser(request):
+    """ผู้ใช้ของ request ใน async view และใช้ซ้ำเป็น request.user ตอน render (ไม่คิวรีผู้ใช้ซ้ำใน thread)"""
+    request.user = await request.auser()
+    return request.user
+
 @login_required
-def public_section_list(request):
-    """หน้าสำหรับให้นิสิตดู Section ที่เปิดลงทะเบียน พร้อมฟังก์ชันค้นหา"""
-    current_date = timezone.now().date()
-    current_semester = Semester.objects.filter(start_date__lte=current_date, end_date__gte=current_date).first() # ดึงภาคเรียนปัจจุบัน
+async def public_section_list(request):
+    """หน้าสำหรับให้นิสิตดู Section ที่เปิดลงทะเบียน พร้อมฟังก์ชันค้นหา (async: ไม่ถือ worker thread ระหว่างรอฐานข้อมูล)"""
+    user = await _auser(request)
+    current_semester = await aget_current_semester() # ดึงภาคเรียนปัจจุบัน (แคชไว้ในหน่วยความจำ)
 
     
-    sections_queryset = Section.objects.none() 
+    sections = []
+    enrolled_section_ids = set()
 
     if current_semester:
         # เริ่มต้น QuerySet ด้วยการกรองภาคเรียนปัจจุบันและสถานะของรายวิชา
@@ -152,57 +236,227 @@ def public_section_list(request):
         )
 
         # ส่วนของการค้นหา
+        ordering = ('course__code', 'section_number')
         query = request.GET.get('q') # ดึงคำค้นหาจากพารามิเตอร์ 'q' ใน URL
         if query: # ถ้ามีคำค้นหา
-            # กรอง QuerySet เพิ่มเติมโดยใช้ Q object
-            # ค้นหาในฟิลด์ course__code หรือ course__name แบบไม่สนใจตัวพิมพ์เล็ก-ใหญ่
-            sections_queryset = sections_queryset.filter(
-                Q(course__code__icontains=query) | # ค้นหาจากรหัสวิชา
-                Q(course__name__icontains=query)   # ค้นหาจากชื่อวิชา
+            # ค้นหารายวิชา (รหัสวิชา ชื่อวิชา คำอธิบาย) แล้วให้ฐานข้อมูลเรียงกลุ่มเรียนตามอันดับความเกี่ยวข้อง
+            sections_queryset, search_ordering = await sync_to_async(filter_by_search)(
+                sections_queryset, query, prefix='course__'
             )
+            ordering = search_ordering + ordering
         # --- สิ้นสุด Logic การค้นหา ---
 
         # เพิ่มการเลือกข้อมูลที่เกี่ยวข้องเพื่อเพิ่มประสิทธิภาพ
-        sections_queryset = sections_queryset.select_related('course', 'room', 'semester').prefetch_related('instructors', 'students', 'class_times')
-        
+        # ไม่ prefetch 'students' เพราะจะดึงนิสิตทุกคนที่ลงทะเบียนขึ้นมาในหน่วยความจำ
+        # จำนวนที่นั่งคงเหลือคำนวณจาก capacity - enrolled_count ใน SQL แทน
+        # คาบเรียนและผู้สอนไม่ prefetch ที่นี่ แต่ดึงเฉพาะกลุ่มเรียนที่ยังไม่มี HTML ใน cache (courses.fragments)
+        sections_queryset = (
+            sections_queryset.select_related('course', 'room', 'semester')
+            .annotate(
+                seats_left=F('capacity') - F('enrolled_count'),
+                # มีคิวรออยู่ = ที่นั่งที่ว่างสงวนไว้ให้คิวก่อน
+                has_waitlist=Exists(WaitlistEntry.objects.filter(section_id=OuterRef('pk'))),
+            )
+        )
+
+        # แบ่งหน้าแบบ keyset ตามลำดับรหัสวิชา กลุ่มเรียน (ใช้ index ของ unique_together)
+        sections = await apaginate_keyset(request, sections_queryset, ordering)
+        # cache และ render template ของแถวที่ยังไม่มีใน cache ทำงานแบบ sync
+        await sync_to_async(attach_section_cells)(sections)
+
+        # ลำดับคิวรอที่นั่งของผู้ใช้ เฉพาะกลุ่มเรียนในหน้านี้ (คิวรีเดียว)
+        positions = await awaitlist_positions(user, [section.pk for section in sections])
+        for section in sections:
+            section.waitlist_position = positions.get(section.pk)
+
+        # ดึงเฉพาะ id ของ Section ที่ผู้ใช้ลงทะเบียนไว้ในภาคเรียนนี้ (ชุดเล็ก ๆ ชุดเดียว)
+        enrolled_section_ids = {
+            section_id async for section_id in Section.students.through.objects.filter(
+                user_id=user.pk,
+                section__semester=current_semester,
+            ).values_list('section_id', flat=True)
+        }
+
     context = {
-        'sections': sections_queryset, # ส่ง QuerySet ที่ถูกกรองและ Optimize แล้วไปยัง Template
+        'sections': sections, # ส่งหน้าของ Section ที่ถูกกรองและ Optimize แล้วไปยัง Template
         'current_semester': current_semester,
+        'enrolled_section_ids': enrolled_section_ids,
+        'cart_section_ids': set(await request.session.aget(CART_SESSION_KEY, [])),
+        # เปิด EventSource เฉพาะเมื่อรันด้วย ASGI (ดู settings.SEAT_STREAM_ENABLED)
+        'seat_stream_enabled': settings.SEAT_STREAM_ENABLED,
+    }
+    # render ใน thread เพราะ context processor อ่าน request.user แบบ sync
+    return await sync_to_async(render)(request, 'courses/public_section_list.html', context)
+
+# --- ตะกร้าลงทะเบียน: เก็บ id ของกลุ่มเรียนไว้ใน session แล้วลงทะเบียนทีเดียว ---
+CART_SESSION_KEY = 'enrollment_cart'
+CART_MAX_ITEMS = 15
+
+def _get_cart(request):
+    return list(request.session.get(CART_SESSION_KEY, []))
+
+def _set_cart(request, section_ids):
+    request.session[CART_SESSION_KEY] = list(section_ids)
+
+@login_required
+@require_POST
+def cart_add(request, section_pk):
+    """เพิ่มกลุ่มเรียนลงตะกร้า (ยังไม่จองที่นั่ง)"""
+    cart = _get_cart(request)
+    if section_pk in cart:
+        messages.info(request, "กลุ่มเรียนนี้อยู่ในตะกร้าแล้ว")
+    elif len(cart) >= CART_MAX_ITEMS:
+        messages.warning(request, f"ตะกร้าลงทะเบียนใส่ได้ไม่เกิน {CART_MAX_ITEMS} กลุ่มเรียน")
+    elif not Section.objects.filter(pk=section_pk).exists():
+        raise Http404("ไม่พบกลุ่มเรียนที่ต้องการเพิ่มลงตะกร้า")
+    else:
+        _set_cart(request, cart + [section_pk])
+        messages.success(request, "เพิ่มลงตะกร้าลงทะเบียนแล้ว")
+    return redirect('courses:public-section-list')
+
+@login_required
+@require_POST
+def cart_remove(request, section_pk):
+    """นำกลุ่มเรียนออกจากตะกร้า"""
+    _set_cart(request, [pk for pk in _get_cart(request) if pk != section_pk])
+    return redirect('courses:cart')
+
+@login_required
+def cart_detail(request):
+    """หน้าตะกร้าลงทะเบียน"""
+    cart = _get_cart(request)
+    sections = {
+        section.pk: section
+        for section in Section.objects.filter(pk__in=cart)
+        .select_related('course', 'room')
+        .prefetch_related('class_times')
+        .annotate(seats_left=F('capacity') - F('enrolled_count'))
+    }
+    items = [sections[pk] for pk in cart if pk in sections]
+    context = {
+        'items': items,
+        'total_credits': sum(section.course.credits for section in items),
     }
-    return render(request, 'courses/public_section_list.html', context)
+    return render(request, 'courses/cart.html', context)
+
+@login_required
+@require_POST
+@admission_control('enroll')
+def cart_checkout(request):
+    """ลงทะเบียนทุกกลุ่มเรียนในตะกร้าใน transaction เดียว"""
+    cart = _get_cart(request)
+    if not cart:
+        messages.warning(request, "ยังไม่มีกลุ่มเรียนในตะกร้า")
+        return redirect('courses:cart')
+
+    all_or_nothing = request.POST.get('mode') != 'partial'
+    result = enroll_many(request.user, cart, all_or_nothing=all_or_nothing)
+    if result.status == EnrollmentStatus.BUSY:
+        # ยังไม่ได้ตรวจรายการใด คงตะกร้าไว้ให้กดลงทะเบียนใหม่
+        messages.warning(request, result.status.label)
+        return redirect('courses:cart')
+
+    for item in result.failed:
+        if item.section is None:
+            messages.error(request, "ไม่พบกลุ่มเรียนบางรายการในตะกร้า")
+            continue
+        label = f"วิชา {item.section.course.name} (Sec {item.section.section_number})"
+        if item.status == EnrollmentStatus.TIME_CLASH:
+            clash = item.clash_with
+            messages.error(request, f"{label}: เวลาเรียนชนกับวิชา {clash.course.name} (Sec {clash.section_number})")
+        else:
+            messages.error(request, f"{label}: {item.status.label}")
+
+    if result.committed:
+        names = ", ".join(section.course.name for section in result.enrolled)
+        messages.success(request, f"ลงทะเบียนสำเร็จ {len(result.enrolled)} กลุ่มเรียน: {names}")
+    elif all_or_nothing and result.failed:
+        messages.warning(request, "ยังไม่ได้ลงทะเบียนรายการใด เนื่องจากมีบางรายการไม่ผ่านการตรวจสอบ")
+
+    # นำออกจากตะกร้า: รายการที่ลงทะเบียนแล้ว และรายการที่ไม่มีทางลงทะเบียนได้อีก
+    found = {item.section.pk for item in result.items if item.section is not None}
+    done = {section.pk for section in result.enrolled} | {
+        item.section.pk for item in result.items if item.status == EnrollmentStatus.ALREADY_ENROLLED
+    }
+    remaining = [pk for pk in cart if pk in found and pk not in done]
+    _set_cart(request, remaining)
+    if not remaining:
+        return redirect('courses:my-schedule')
+    return redirect('courses:cart')
 
 @login_required
 @require_POST # บังคับให้ view นี้รับเฉพาะ POST request เพื่อความปลอดภัย
+@admission_control('enroll') # จำกัดจำนวน transaction ลงทะเบียนพร้อมกัน ที่เหลือเข้าห้องรอคิว
 def enroll_section(request, section_pk):
-    
-    #จัดการการลงทะเบียน
+    """จัดการการลงทะเบียน โดยให้ enrollment service จองที่นั่งแบบ atomic"""
+    try:
+        result = enroll_student(request.user, section_pk)
+    except Section.DoesNotExist:
+        raise Http404("ไม่พบกลุ่มเรียนที่ต้องการลงทะเบียน")
 
-    section = get_object_or_404(Section, pk=section_pk)
-    student = request.user
-
-    # ดึงรายวิชา (Course) ที่นักศึกษากำลังพยายามลงทะเบียน
-    course_to_enroll = section.course
-    # ค้นหากลุ่มเรียน (Sections) ทั้งหมดที่นักศึกษาลงทะเบียนไว้ในปัจจุบัน
-    # และตรวจสอบว่ามีกลุ่มเรียนใดที่อยู่ในรายวิชาเดียวกันหรือไม่
-    if student.enrolled_sections.filter(course=course_to_enroll).exists():
-        messages.warning(request, f"คุณได้ลงทะเบียนวิชา {course_to_enroll.name} ไปแล้ว")
-        return redirect('courses:public-section-list')
-
-    # ตรวจสอบว่าเต็มหรือยัง
-    if section.is_full():
-        messages.error(request, f"ไม่สามารถลงทะเบียนได้: วิชา {section.course.name} (Sec {section.section_number}) เต็มแล้ว")
-        return redirect('courses:public-section-list')
-
-    # ตรวจสอบว่าลงทะเบียนไปแล้วหรือยัง (สำหรับกลุ่มเรียนนี้โดยเฉพาะ)
-    if student in section.students.all():
+    section = result.section
+    if result.status == EnrollmentStatus.OK:
+        messages.success(request, f"ลงทะเบียนวิชา {section.course.name} (Sec {section.section_number}) สำเร็จ!")
+    elif result.status == EnrollmentStatus.FULL:
+        messages.error(
+            request,
+            f"ไม่สามารถลงทะเบียนได้: วิชา {section.course.name} (Sec {section.section_number}) เต็มแล้ว "
+            "สามารถกดเข้าคิวรอที่นั่งได้ ระบบจะลงทะเบียนให้อัตโนมัติเมื่อมีที่นั่งว่าง"
+        )
+    elif result.status == EnrollmentStatus.ALREADY_ENROLLED:
         messages.warning(request, f"คุณได้ลงทะเบียนวิชา {section.course.name} (Sec {section.section_number}) ไปแล้ว")
-        return redirect('courses:public-section-list')
+    elif result.status == EnrollmentStatus.TIME_CLASH:
+        clash = result.clash_with
+        messages.error(
+            request,
+            f"ไม่สามารถลงทะเบียนได้: เวลาเรียนของวิชา {section.course.name} (Sec {section.section_number}) "
+            f"ชนกับวิชา {clash.course.name} (Sec {clash.section_number})"
+        )
+    else:
+        messages.warning(request, f"คุณได้ลงทะเบียนวิชา {section.course.name} ไปแล้ว")
+    return redirect('courses:public-section-list')
+
+@login_required
+@require_POST
+def join_waitlist_view(request, section_pk):
+    """เข้าคิวรอที่นั่งของกลุ่มเรียนที่เต็มแล้ว"""
+    try:
+        result = join_waitlist(request.user, section_pk)
+    except Section.DoesNotExist:
+        raise Http404("ไม่พบกลุ่มเรียนที่ต้องการเข้าคิว")
 
-    # ถ้าผ่านทุกเงื่อนไข ให้ทำการลงทะเบียน
-    section.students.add(student)
-    messages.success(request, f"ลงทะเบียนวิชา {section.course.name} (Sec {section.section_number}) สำเร็จ!")
+    section = result.section
+    label = f"วิชา {section.course.name} (Sec {section.section_number})"
+    if result.status == WaitlistStatus.JOINED:
+        messages.success(request, f"เข้าคิวรอที่นั่ง{label} แล้ว คุณอยู่ลำดับที่ {result.position}")
+    elif result.status == WaitlistStatus.ALREADY_WAITLISTED:
+        messages.info(request, f"คุณอยู่ในคิวรอที่นั่ง{label} ลำดับที่ {result.position}")
+    elif result.status == WaitlistStatus.NOT_FULL:
+        messages.info(request, f"{label} ยังมีที่นั่งว่าง สามารถลงทะเบียนได้ทันที")
+    else:
+        messages.warning(request, f"ไม่สามารถเข้าคิวได้: {result.status.label}")
+    return redirect('courses:public-section-list')
+
+@login_required
+@require_POST
+def leave_waitlist_view(request, section_pk):
+    """ออกจากคิวรอที่นั่ง"""
+    if leave_waitlist(request.user, section_pk):
+        messages.success(request, "ออกจากคิวรอที่นั่งแล้ว")
     return redirect('courses:public-section-list')
 
+@login_required
+@staff_required
+def admission_metrics(request):
+    """สถิติของห้องรอคิว: ความยาวคิว (รวมทุก worker) และเวลารอ/จำนวนที่เข้าได้ (ของ worker นี้)"""
+    return JsonResponse({'gates': all_gate_metrics()})
+
+@login_required
+@staff_required
+def fragment_metrics(request):
+    """สถิติ cache ของแถวกลุ่มเรียนในหน้าลงทะเบียน (ของ worker นี้): hit ratio และเวลา render ที่ประหยัดได้"""
+    return JsonResponse({'section_rows': fragment_stats()})
+
 @login_required
 @staff_required
 def time_list(request, section_pk):
@@ -222,23 +476,12 @@ def time_add(request, section_pk):
     section = get_object_or_404(Section, pk=section_pk)
     
     if request.method == 'POST':
-        form = ClassTimeForm(request.POST)
+        # ผูกคาบเรียนกับ section ก่อน validate เพื่อให้ ClassTime.clean ตรวจการชนกันได้
+        form = ClassTimeForm(request.POST, instance=ClassTime(section=section))
         if form.is_valid():
-            class_time = form.save(commit=False)
-            class_time.section = section
-            
-            # ตรวจสอบการซ้ำซ้อนของเวลา
-            if ClassTime.objects.filter(
-                section=section,
-                day=form.cleaned_data['day'],
-                start_time__lt=form.cleaned_data['end_time'],
-                end_time__gt=form.cleaned_data['start_time']
-            ).exists():
-                form.add_error(None, 'คาบเรียนนี้ซ้ำซ้อนกับคาบเรียนที่มีอยู่แล้ว')
-            else:
-                class_time.save()
-                messages.success(request, 'เพิ่มคาบเรียนสำเร็จ')
-                return redirect('courses:time-list', section_pk=section.pk)
+            form.save()
+            messages.success(request, 'เพิ่มคาบเรียนสำเร็จ')
+            return redirect('courses:time-list', section_pk=section.pk)
     else:
         form = ClassTimeForm()
     
@@ -258,18 +501,9 @@ def time_edit(request, pk):
     if request.method == 'POST':
         form = ClassTimeForm(request.POST, instance=class_time)
         if form.is_valid():
-            # ตรวจสอบการซ้ำซ้อนของเวลา (ไม่นับตัวเอง)
-            if ClassTime.objects.filter(
-                section=section,
-                day=form.cleaned_data['day'],
-                start_time__lt=form.cleaned_data['end_time'],
-                end_time__gt=form.cleaned_data['start_time']
-            ).exclude(pk=pk).exists():
-                form.add_error(None, 'คาบเรียนนี้ซ้ำซ้อนกับคาบเรียนที่มีอยู่แล้ว')
-            else:
-                form.save()
-                messages.success(request, 'แก้ไขคาบเรียนสำเร็จ')
-                return redirect('courses:time-list', section_pk=section.pk)
+            form.save()
+            messages.success(request, 'แก้ไขคาบเรียนสำเร็จ')
+            return redirect('courses:time-list', section_pk=section.pk)
     else:
         form = ClassTimeForm(instance=class_time)
     
@@ -280,6 +514,52 @@ def time_edit(request, pk):
     }
     return render(request, 'courses/time_form.html', context)
 
+@login_required
+@staff_required
+def free_rooms(request):
+    """API ค้นหาห้องว่างในวันและช่วงเวลาที่ระบุ (ค่าเริ่มต้นคือภาคเรียนปัจจุบัน)"""
+    form = FreeRoomQueryForm(request.GET)
+    if not form.is_valid():
+        return JsonResponse({'errors': form.errors}, status=400)
+    semester = form.cleaned_data['semester'] or get_current_semester()
+    if semester is None:
+        return JsonResponse({'errors': {'semester': ['ไม่พบภาคเรียนปัจจุบัน']}}, status=400)
+    rooms = find_free_rooms(
+        semester.pk,
+        form.cleaned_data['day'],
+        form.cleaned_data['start_time'],
+        form.cleaned_data['end_time'],
+        ignore_section_id=form.cleaned_data['section'],
+    )
+    return JsonResponse({
+        'semester': semester.pk,
+        'rooms': [
+            {'id': room.pk, 'building': room.building, 'room_number': room.room_number, 'label': str(room)}
+            for room in rooms
+        ],
+    })
+
+@login_required
+@staff_required
+def instructor_autocomplete(request):
+    """API ค้นหาอาจารย์ผู้สอนสำหรับ select2 ในฟอร์มกลุ่มเรียน (?q=คำค้น&page=หน้า)"""
+    return JsonResponse(search_instructors(request.GET.get('q', ''), request.GET.get('page')))
+
+@login_required
+@staff_required
+def room_autocomplete(request):
+    """API ค้นหาห้องเรียนสำหรับ select2 ถ้าระบุ ?section= จะทำเครื่องหมายห้องที่ไม่ว่างในเวลาเรียนของกลุ่มนั้น"""
+    busy_room_ids = ()
+    section_id = request.GET.get('section', '')
+    if section_id.isdigit():
+        semester_id = Section.objects.filter(pk=section_id).values_list('semester_id', flat=True).first()
+        if semester_id:
+            busy_room_ids = get_room_index(semester_id).busy_room_ids_for_section(int(section_id))
+    return JsonResponse(search_rooms(
+        request.GET.get('q', ''), request.GET.get('page'),
+        busy_room_ids=busy_room_ids, busy_label=RoomAvailabilitySelect.busy_label,
+    ))
+
 @login_required
 @staff_required
 def time_delete(request, pk):
@@ -299,17 +579,21 @@ def time_delete(request, pk):
     return render(request, 'courses/time_confirm_delete.html', context)
 
 @login_required
-def my_schedule(request):
+async def my_schedule(request):
     """หน้าสำหรับดูตารางเรียนของฉัน"""
-    current_date = timezone.now().date()
-    current_semester = Semester.objects.filter(start_date__lte=current_date, end_date__gte=current_date).first() # ดึงภาคเรียนปัจจุบัน
+    user = await _auser(request)
+    current_semester = await aget_current_semester() # ดึงภาคเรียนปัจจุบัน (แคชไว้ในหน่วยความจำ)
     
     enrolled_sections = []
     if current_semester:
-        enrolled_sections = request.user.enrolled_sections.filter(semester=current_semester) # ดึง Section ที่นิสิตลงทะเบียนในภาคเรียนปัจจุบัน
+        enrolled_sections = [
+            section async for section in user.enrolled_sections.filter(semester=current_semester) # ดึง Section ที่นิสิตลงทะเบียนในภาคเรียนปัจจุบัน
+            .select_related('course', 'room')
+            .prefetch_related('class_times', instructors_prefetch())
+        ]
 
     context = {
         'enrolled_sections': enrolled_sections,
         'current_semester': current_semester,
     }
-    return render(request, 'courses/my_schedule.html', context)
\ No newline at end of file
+    return await sync_to_async(render)(request, 'courses/my_schedule.html', context)
@@ -0,0 +1,189 @@
+"""
+คิวรอที่นั่ง (waitlist) ของกลุ่มเรียนที่เต็มแล้ว
+
+นิสิตเข้าคิวได้เฉพาะกลุ่มเรียนที่เต็ม และลำดับคิวคือลำดับ id ของ WaitlistEntry (มาก่อนได้ก่อน)
+ลำดับในคิวไม่ได้เก็บไว้ แต่นับจาก index (section, id) ตอนอ่าน การลบคิวจึงไม่ต้องเขียนแถวอื่น
+การออกจากคิวและการเลื่อนคิวล็อกแถวของกลุ่มเรียนก่อนเสมอ
+
+เมื่อมีที่นั่งว่าง (นิสิตถอน หรือเพิ่มจำนวนที่รับ) จะเลื่อนนิสิตคนถัดไปเข้าเรียนหลัง commit ทันที
+(schedule_promotion) และ worker เบื้องหลัง (manage.py process_waitlists) เก็บตกส่วนที่เหลือ
+ระหว่างที่ยังมีคิวอยู่ การลงทะเบียนปกติจะไม่แซงคิว
+"""
+from dataclasses import dataclass
+from functools import partial
+
+from django.db import IntegrityError, models, transaction
+from django.db.models import Count, Exists, F, OuterRef, Subquery
+
+from .enrollment import EnrollmentStatus, _claim_seat
+from .models import Section, WaitlistEntry
+
+DEFAULT_BATCH_SIZE = 100
+
+
+class WaitlistStatus(models.TextChoices):
+    JOINED = 'JOINED', 'เข้าคิวรอที่นั่งแล้ว'
+    ALREADY_WAITLISTED = 'ALREADY_WAITLISTED', 'อยู่ในคิวรอที่นั่งของกลุ่มเรียนนี้แล้ว'
+    NOT_FULL = 'NOT_FULL', 'กลุ่มเรียนยังมีที่นั่งว่าง'
+    ALREADY_ENROLLED = 'ALREADY_ENROLLED', 'ลงทะเบียนกลุ่มเรียนนี้ไปแล้ว'
+    DUPLICATE_COURSE = 'DUPLICATE_COURSE', 'ลงทะเบียนรายวิชานี้ในกลุ่มเรียนอื่นไปแล้ว'
+
+
+@dataclass(frozen=True)
+class WaitlistResult:
+    status: WaitlistStatus
+    section: Section
+    position: int = None
+
+    @property
+    def ok(self):
+        return self.status in (WaitlistStatus.JOINED, WaitlistStatus.ALREADY_WAITLISTED)
+
+
+@dataclass
+class PromotionSummary:
+    """ผลการเลื่อนคิว: promoted คือจำนวนที่ลงทะเบียนสำเร็จ removed คือคิวที่เลื่อนไม่ได้และถูกนำออก"""
+    promoted: int = 0
+    removed: int = 0
+
+
+def lock_section(section_pk):
+    """
+    ล็อกแถวของกลุ่มเรียน (SELECT ... FOR UPDATE) จนจบ transaction ที่เปิดอยู่
+    คืนค่า None ถ้ากลุ่มเรียนถูกลบไปแล้ว
+    """
+    return Section.objects.select_for_update().filter(pk=section_pk).values_list('pk', flat=True).first()
+
+
+def _position_subquery():
+    """ลำดับในคิว = จำนวนคิวของกลุ่มเรียนเดียวกันที่ id ไม่มากกว่า (นับบน index section, id)"""
+    ahead = (
+        WaitlistEntry.objects.filter(section_id=OuterRef('section_id'), pk__lte=OuterRef('pk'))
+        .order_by()
+        .values('section_id')
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    return Subquery(ahead)
+
+
+def _positions(student, section_ids):
+    entries = WaitlistEntry.objects.filter(student_id=student.pk)
+    if section_ids is not None:
+        entries = entries.filter(section_id__in=section_ids)
+    return entries.annotate(position=_position_subquery()).values_list('section_id', 'position')
+
+
+def waitlist_positions(student, section_ids=None):
+    """คืนค่า {section_id: ลำดับในคิว} ของนิสิต ในคิวรีเดียว"""
+    return dict(_positions(student, section_ids))
+
+
+async def awaitlist_positions(student, section_ids=None):
+    """waitlist_positions สำหรับ async view"""
+    return {section_id: position async for section_id, position in _positions(student, section_ids)}
+
+
+def join_waitlist(student, section_pk):
+    """
+    เข้าคิวรอที่นั่งของกลุ่มเรียนที่เต็มแล้ว
+    จะ raise Section.DoesNotExist ถ้าไม่พบกลุ่มเรียน
+    """
+    section = Section.objects.select_related('course').get(pk=section_pk)
+    enrolled_in_course = set(
+        Section.students.through.objects.filter(
+            user_id=student.pk,
+            section__course_id=section.course_id,
+        ).values_list('section_id', flat=True)
+    )
+    if section.pk in enrolled_in_course:
+        return WaitlistResult(WaitlistStatus.ALREADY_ENROLLED, section)
+    if enrolled_in_course:
+        return WaitlistResult(WaitlistStatus.DUPLICATE_COURSE, section)
+    if section.enrolled_count < section.capacity and not section.waitlist_entries.exists():
+        return WaitlistResult(WaitlistStatus.NOT_FULL, section)
+
+    try:
+        with transaction.atomic():
+            entry, created = WaitlistEntry.objects.get_or_create(section=section, student_id=student.pk)
+    except IntegrityError:
+        # กดเข้าคิวซ้ำพร้อมกัน อีกคำขอบันทึกไปแล้ว
+        entry, created = WaitlistEntry.objects.get(section=section, student_id=student.pk), False
+    position = waitlist_positions(student, [section.pk]).get(section.pk)
+    status = WaitlistStatus.JOINED if created else WaitlistStatus.ALREADY_WAITLISTED
+    return WaitlistResult(status, section, position)
+
+
+def leave_waitlist(student, section_pk):
+    """ออกจากคิว คืนค่า True ถ้ามีคิวอยู่และถูกลบ"""
+    with transaction.atomic():
+        # ล็อกกลุ่มเรียนก่อนล็อกแถวของคิว (ลำดับเดียวกับการเลื่อนคิว) เพื่อไม่ให้ deadlock
+        lock_section(section_pk)
+        deleted, _ = WaitlistEntry.objects.filter(section_id=section_pk, student_id=student.pk).delete()
+    return bool(deleted)
+
+
+def sections_to_promote(section_ids=None):
+    """id ของกลุ่มเรียนที่มีที่นั่งว่างและมีคิวรออยู่ (เฉพาะใน section_ids ถ้าระบุ)"""
+    sections = Section.objects.all() if section_ids is None else Section.objects.filter(pk__in=section_ids)
+    return sections.filter(
+        Exists(WaitlistEntry.objects.filter(section_id=OuterRef('pk'))),
+        enrolled_count__lt=F('capacity'),
+    ).values_list('pk', flat=True)
+
+
+def promote_section(section_pk, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    เลื่อนคิวของกลุ่มเรียน 1 กลุ่มตามที่นั่งที่ว่าง (ไม่เกิน batch_size คิวต่อครั้ง)
+
+    ทั้งชุดอยู่ใน transaction เดียวที่ล็อกแถวของกลุ่มเรียนไว้ worker อื่นที่เลื่อนคิวของกลุ่มเรียนเดียวกัน
+    จะรอจนชุดนี้เสร็จ แล้วจึงดึงคิวถัดไปตามลำดับ id (ไม่ข้ามคิวที่ถูกล็อก ลำดับจึงไม่สลับกัน)
+    คิวที่ลงทะเบียนไม่ได้อย่างถาวร (ลงรายวิชานี้แล้ว หรือเวลาเรียนชน) จะถูกนำออกจากคิว
+    คิวที่เลื่อนแล้วทั้งชุดถูกลบด้วยคิวรีเดียวตอนท้าย กลุ่มเรียนที่ถูกลบไประหว่างนั้นจะถูกข้ามไป
+    """
+    summary = PromotionSummary()
+    with transaction.atomic():
+        if lock_section(section_pk) is None:
+            return summary
+        entries = list(
+            WaitlistEntry.objects.filter(section_id=section_pk)
+            .select_related('student')
+            .order_by('pk')[:batch_size]
+        )
+        processed = []
+        for entry in entries:
+            try:
+                with transaction.atomic():
+                    result = _claim_seat(entry.student, section_pk, bypass_waitlist=True)
+            except IntegrityError:
+                result = None  # ลงทะเบียนไปแล้วจากคำขออื่นพร้อมกัน
+            if result is not None and result.status == EnrollmentStatus.FULL:
+                break
+            processed.append(entry.pk)
+            if result is not None and result.ok:
+                summary.promoted += 1
+            else:
+                summary.removed += 1
+        if processed:
+            WaitlistEntry.objects.filter(pk__in=processed).delete()
+    return summary
+
+
+def promote_waitlists(batch_size=DEFAULT_BATCH_SIZE, section_ids=None):
+    """เลื่อนคิวของทุกกลุ่มเรียนที่มีที่นั่งว่าง (หรือเฉพาะ section_ids) คืนค่า PromotionSummary รวม"""
+    total = PromotionSummary()
+    for section_pk in list(sections_to_promote(section_ids)):
+        summary = promote_section(section_pk, batch_size)
+        total.promoted += summary.promoted
+        total.removed += summary.removed
+    return total
+
+
+def schedule_promotion(section_ids):
+    """
+    เลื่อนคิวของกลุ่มเรียนหลัง transaction ปัจจุบัน commit (มีนิสิตถอน หรือจำนวนที่รับเปลี่ยน)
+    ถ้าเลื่อนไม่สำเร็จจะบันทึก log แล้วปล่อยให้ process_waitlists รอบถัดไปทำแทน
+    """
+    section_ids = set(section_ids)
+    if section_ids:
+        transaction.on_commit(partial(promote_waitlists, section_ids=section_ids), robust=True)
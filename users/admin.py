@@ -19,6 +19,8 @@ class UserAdmin(BaseUserAdmin):
     inlines = (ProfileInline,)
     list_display = ('profile__user_type', 'username', 'profile__first_name_th', 'profile__last_name_th', 'is_staff')
     list_filter = ('profile__user_type', 'is_staff', 'is_active')
+    # ใช้กับช่อง autocomplete อาจารย์ผู้สอน/นิสิตในหน้าแก้ไขกลุ่มเรียน
+    search_fields = BaseUserAdmin.search_fields + ('profile__first_name_th', 'profile__last_name_th', 'profile__student_id')
     
 
 # ยกเลิกการลงทะเบียน UserAdmin เดิมและลงทะเบียนใหม่ด้วย UserAdmin ที่เราปรับแต่ง
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.4 on 2026-10-17 03:16
+
+from django.db import migrations, models
+
+
+def populate_display_name(apps, schema_editor):
+    """คำนวณชื่อที่แสดงของโปรไฟล์ที่มีอยู่แล้ว (ตรรกะเดียวกับ Profile.build_display_name)"""
+    Profile = apps.get_model('users', 'Profile')
+    academic_titles = dict(Profile._meta.get_field('acdemic_title').choices)
+    name_titles = dict(Profile._meta.get_field('name_title').choices)
+    profiles = []
+    for profile in Profile.objects.exclude(first_name_th='').exclude(last_name_th='').iterator(chunk_size=2000):
+        parts = (
+            academic_titles.get(profile.acdemic_title, ''),
+            name_titles.get(profile.name_title, ''),
+            profile.first_name_th,
+            profile.last_name_th,
+        )
+        profile.display_name = ' '.join(part for part in parts if part)
+        profiles.append(profile)
+    Profile.objects.bulk_update(profiles, ['display_name'], batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0011_profile_name_title'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='display_name',
+            field=models.CharField(blank=True, editable=False, max_length=255, verbose_name='ชื่อที่แสดง'),
+        ),
+        migrations.RunPython(populate_display_name, migrations.RunPython.noop),
+    ]
@@ -161,6 +161,33 @@ class Profile(models.Model):
         blank=True, 
         verbose_name="ภาควิชา")
 
+    # ชื่อที่ใช้แสดงผล (ตำแหน่งวิชาการ คำนำหน้า ชื่อ นามสกุล) คำนวณใหม่ทุกครั้งที่บันทึก
+    # เพื่อให้หน้าที่แสดงรายชื่ออาจารย์จำนวนมากไม่ต้องประกอบชื่อเองทีละแถว
+    display_name = models.CharField(
+        max_length=255,
+        blank=True,
+        editable=False,
+        verbose_name="ชื่อที่แสดง")
+
+    def build_display_name(self):
+        """ตำแหน่งวิชาการ คำนำหน้า ชื่อ นามสกุล (ภาษาไทย) หรือข้อความว่างถ้ายังไม่มีชื่อภาษาไทย"""
+        if not (self.first_name_th and self.last_name_th):
+            return ''
+        parts = (
+            self.get_acdemic_title_display() if self.acdemic_title else '',
+            self.get_name_title_display() if self.name_title else '',
+            self.first_name_th,
+            self.last_name_th,
+        )
+        return ' '.join(part for part in parts if part)
+
+    def save(self, *args, **kwargs):
+        self.display_name = self.build_display_name()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'display_name' not in update_fields:
+            kwargs['update_fields'] = [*update_fields, 'display_name']
+        super().save(*args, **kwargs)
+
     def clean(self):
         
         super().clean()
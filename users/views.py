@@ -3,6 +3,9 @@ from django.contrib.auth import authenticate, login
 from django.contrib.auth.forms import AuthenticationForm
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.db.models import Prefetch
+from core.pagination import paginate_keyset
+from courses.models import Section
 from courses.views import staff_required
 from .models import User
 
@@ -50,11 +53,16 @@ def staff_login_view(request):
 def student_list(request):
     """แสดงรายการนิสิตทั้งหมด"""
     students = User.objects.filter(profile__user_type='STUDENT').select_related('profile', 'profile__branch') # ใช้ select_related เพื่อเพิ่มประสิทธิภาพการดึงข้อมูล
+    students = paginate_keyset(request, students, ('profile__student_id',)) # แบ่งหน้าตามรหัสนิสิต (มี unique index)
     return render(request, 'users/student_list.html', {'students': students})
 
 @login_required
 @staff_required
 def student_detail(request, pk):
     """แสดงรายละเอียดของนิสิต 1 คน"""
-    student = get_object_or_404(User, pk=pk, profile__user_type='STUDENT')
+    # โหลดคณะ/สาขา และรายวิชาที่ลงทะเบียน (พร้อมภาคเรียนและรายวิชา) ในคิวรีคงที่ ไม่ขึ้นกับจำนวนวิชา
+    students = User.objects.select_related('profile__branch__department__faculty').prefetch_related(
+        Prefetch('enrolled_sections', queryset=Section.objects.select_related('semester', 'course')),
+    )
+    student = get_object_or_404(students, pk=pk, profile__user_type='STUDENT')
     return render(request, 'users/student_detail.html', {'student': student})
\ No newline at end of file